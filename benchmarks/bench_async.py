@@ -0,0 +1,81 @@
+"""
+Runs concurrent async "views" against a backend stand-in that sleeps on
+every call, comparing blocking calls made from the event loop with the
+awaitable methods.
+
+    python benchmarks/bench_async.py [views] [latency_ms]
+"""
+from __future__ import print_function
+import asyncio
+import sys
+import time
+
+from flask import Flask
+from werkzeug.contrib.cache import SimpleCache
+from flask_cache_stats import Cache
+
+LATENCY = 0.005
+
+
+class SlowCache(SimpleCache):
+    def get(self, key):
+        time.sleep(LATENCY)
+        return super(SlowCache, self).get(key)
+
+    def set(self, key, value, timeout=None):
+        time.sleep(LATENCY)
+        return super(SlowCache, self).set(key, value, timeout)
+
+
+def slow_cache(app, config, args, kwargs):
+    return SlowCache(*args, **kwargs)
+
+
+def make_cache(workers):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = '__main__.slow_cache'
+    app.config['CACHE_STATS_ASYNC_WORKERS'] = workers
+    return Cache(app)
+
+
+async def blocking_view(cache, idx):
+    key = 'item/{}'.format(idx % 20)
+    if cache.get(key) is None:
+        cache.set(key, idx)
+
+
+async def async_view(cache, idx):
+    key = 'item/{}'.format(idx % 20)
+    if await cache.aget(key) is None:
+        await cache.aset(key, idx)
+
+
+def run(view, cache, views):
+    async def main():
+        await asyncio.gather(*[view(cache, idx) for idx in range(views)])
+
+    loop = asyncio.new_event_loop()
+    start = time.time()
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+    return time.time() - start
+
+
+def main():
+    global LATENCY
+    views = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    if len(sys.argv) > 2:
+        LATENCY = float(sys.argv[2]) / 1000
+
+    print('{} concurrent views, {:.1f} ms backend latency'.format(views, LATENCY * 1000))
+    elapsed = run(blocking_view, make_cache(1), views)
+    print('{:<24} {:>8.3f} s'.format('blocking', elapsed))
+    for workers in (4, 16, 64):
+        elapsed = run(async_view, make_cache(workers), views)
+        print('{:<24} {:>8.3f} s'.format('async, {} workers'.format(workers), elapsed))
+
+
+if __name__ == '__main__':
+    main()
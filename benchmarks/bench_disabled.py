@@ -0,0 +1,59 @@
+"""
+Compares the cost of ``get`` on plain flask_cache with the stats proxy
+enabled and with CACHE_STATS_ENABLED = False, and the time it takes to import
+each package in a fresh interpreter.
+
+    python benchmarks/bench_disabled.py [calls]
+"""
+from __future__ import print_function
+import subprocess
+import sys
+import timeit
+
+from flask import Flask
+from flask_cache import Cache as FlaskCache
+from flask_cache_stats import Cache
+
+
+def make_cache(cache_cls, **config):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config.update(config)
+    cache = cache_cls(app)
+    cache.set('hit', 'value')
+    return cache
+
+
+def get_cost(cache, calls):
+    best = min(timeit.repeat(lambda: cache.get('hit'), number=calls, repeat=5))
+    return best / calls * 1e9
+
+
+def import_cost(module, runs=10):
+    code = ('import time; start = time.time(); import {}; '
+            'print(time.time() - start)'.format(module))
+    return min(float(subprocess.check_output([sys.executable, '-c', code]))
+               for _ in range(runs)) * 1000
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    cases = [
+        ('flask_cache', make_cache(FlaskCache)),
+        ('stats, enabled', make_cache(Cache)),
+        ('stats, disabled', make_cache(Cache, CACHE_STATS_ENABLED=False)),
+    ]
+    baseline = None
+    for name, cache in cases:
+        nsec = get_cost(cache, calls)
+        baseline = baseline or nsec
+        print('{:<20} {:>8.0f} ns/get {:>+7.1f}%'.format(
+            name, nsec, (nsec / baseline - 1) * 100))
+
+    for module in ('flask_cache', 'flask_cache_stats', 'flask_login'):
+        print('import {:<18} {:>7.1f} ms'.format(module, import_cost(module)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Looks up a list of ids against a backend stand-in that sleeps on every call,
+once by looping over a ``memoize``d single-id function and once through
+``memoize_many``, and counts the backend round trips of each.
+
+    python benchmarks/bench_memoize_many.py [ids] [hit_ratio] [latency_ms]
+"""
+from __future__ import print_function
+import random
+import sys
+import time
+
+from flask import Flask
+from werkzeug.contrib.cache import SimpleCache
+from flask_cache_stats import Cache
+
+LATENCY = 0.0005
+
+
+class SlowCache(SimpleCache):
+    round_trips = 0
+
+    def __call(self, name, *args, **kwargs):
+        SlowCache.round_trips += 1
+        time.sleep(LATENCY)
+        return getattr(super(SlowCache, self), name)(*args, **kwargs)
+
+    def get(self, key):
+        return self.__call('get', key)
+
+    def set(self, key, value, timeout=None):
+        return self.__call('set', key, value, timeout)
+
+    def get_many(self, *keys):
+        SlowCache.round_trips += 1
+        time.sleep(LATENCY)
+        return [super(SlowCache, self).get(key) for key in keys]
+
+    def set_many(self, mapping, timeout=None):
+        SlowCache.round_trips += 1
+        time.sleep(LATENCY)
+        for key in mapping:
+            super(SlowCache, self).set(key, mapping[key], timeout)
+        return True
+
+
+def slow_cache(app, config, args, kwargs):
+    return SlowCache(*args, **kwargs)
+
+
+def run(ids, hit_ratio, batched):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = '__main__.slow_cache'
+    app.config['CACHE_THRESHOLD'] = ids * 4
+    cache = Cache(app)
+
+    @cache.memoize(timeout=300)
+    def get_user(user_id):
+        return {'id': user_id}
+
+    @cache.memoize_many(timeout=300)
+    def get_users(user_ids):
+        return dict((user_id, {'id': user_id}) for user_id in user_ids)
+
+    rnd = random.Random(0)
+    user_ids = list(range(ids))
+    with app.app_context():
+        # Warm a share of the ids so the lookup sees the given hit ratio.
+        warm = rnd.sample(user_ids, int(ids * hit_ratio))
+        if batched:
+            get_users(warm)
+        else:
+            for user_id in warm:
+                get_user(user_id)
+
+        SlowCache.round_trips = 0
+        start = time.time()
+        if batched:
+            get_users(user_ids)
+        else:
+            [get_user(user_id) for user_id in user_ids]
+        return SlowCache.round_trips, time.time() - start
+
+
+def main():
+    global LATENCY
+    ids = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    hit_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.8
+    if len(sys.argv) > 3:
+        LATENCY = float(sys.argv[3]) / 1000
+
+    print('{} ids, {:.0%} cached, {:.2f} ms per round trip'.format(
+        ids, hit_ratio, LATENCY * 1000))
+    for batched in (False, True):
+        round_trips, elapsed = run(ids, hit_ratio, batched)
+        print('{:<13} {:>5} round trips {:>9.3f} ms'.format(
+            'memoize_many' if batched else 'memoize loop', round_trips,
+            elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Times cached calls of a ``memoize``d function and a memoized method against
+a backend stand-in that sleeps on every call, with the memoize versions
+fetched from the backend on every call (CACHE_STATS_VERSION_TTL = 0) and kept
+locally (the default), and counts the backend round trips per call.
+
+    python benchmarks/bench_memoize_versions.py [calls] [latency_ms]
+"""
+from __future__ import print_function
+import sys
+import time
+
+from flask import Flask
+from flask_cache_stats import Cache
+
+from bench_memoize_many import SlowCache
+import bench_memoize_many
+
+
+def slow_cache(app, config, args, kwargs):
+    return SlowCache(*args, **kwargs)
+
+
+def run(calls, version_ttl):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = '__main__.slow_cache'
+    app.config['CACHE_STATS_VERSION_TTL'] = version_ttl
+    cache = Cache(app)
+
+    @cache.memoize(timeout=300)
+    def get_user(user_id):
+        return {'id': user_id}
+
+    class Users(object):
+        def __repr__(self):
+            return 'users'
+
+        @cache.memoize(timeout=300)
+        def get(self, user_id):
+            return {'id': user_id}
+
+    users = Users()
+    results = []
+    with app.app_context():
+        for call in (get_user, users.get):
+            call(1)
+            SlowCache.round_trips = 0
+            start = time.time()
+            for _ in range(calls):
+                call(1)
+            results.append((SlowCache.round_trips / float(calls),
+                            (time.time() - start) / calls * 1000))
+    return results
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    if len(sys.argv) > 2:
+        bench_memoize_many.LATENCY = float(sys.argv[2]) / 1000
+
+    print('{} cached calls, {:.2f} ms per round trip'.format(
+        calls, bench_memoize_many.LATENCY * 1000))
+    for name, version_ttl in (('versions fetched', 0), ('versions local', 5)):
+        function, method = run(calls, version_ttl)
+        print('{:<17} function {:>4.1f} round trips {:>7.3f} ms/call   '
+              'method {:>4.1f} round trips {:>7.3f} ms/call'.format(
+                  name, function[0], function[1], method[0], method[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Simulates a periodic job that rewrites a set of keys, only some of which
+changed since the last run, and counts the bytes handed to the backend with
+and without redundant write suppression.
+
+    python benchmarks/bench_redundant_writes.py [keys] [runs] [changed]
+"""
+from __future__ import print_function
+import pickle
+import random
+import sys
+import time
+
+from flask import Flask
+from werkzeug.contrib.cache import SimpleCache
+from flask_cache_stats import Cache
+
+
+class CountingCache(SimpleCache):
+    written = 0
+
+    def set(self, key, value, timeout=None):
+        CountingCache.written += len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        return super(CountingCache, self).set(key, value, timeout)
+
+    def set_many(self, mapping, timeout=None):
+        for key in mapping:
+            self.set(key, mapping[key], timeout)
+        return True
+
+
+def counting_cache(app, config, args, kwargs):
+    return CountingCache(*args, **kwargs)
+
+
+def run(keys, runs, changed, mode, use_set_many):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = '__main__.counting_cache'
+    app.config['CACHE_THRESHOLD'] = keys * 2
+    app.config['CACHE_STATS_REDUNDANT_WRITES'] = mode
+    app.config['CACHE_STATS_SINGLE_WRITER'] = True
+    cache = Cache(app)
+
+    rnd = random.Random(0)
+    values = dict(('report/{}'.format(idx), [rnd.random() for _ in range(100)])
+                  for idx in range(keys))
+    CountingCache.written = 0
+    start = time.time()
+    for _ in range(runs):
+        for key in rnd.sample(sorted(values), int(keys * changed)):
+            values[key] = [rnd.random() for _ in range(100)]
+        if use_set_many:
+            cache.set_many(values)
+        else:
+            for key in values:
+                cache.set(key, values[key])
+    return CountingCache.written, time.time() - start
+
+
+def main():
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    changed = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+
+    print('{} keys, {} runs, {:.0%} changed per run'.format(keys, runs, changed))
+    for use_set_many in (False, True):
+        for mode in (None, 'skip'):
+            written, elapsed = run(keys, runs, changed, mode, use_set_many)
+            print('{:<9} {:<14} {:>10.1f} kb written {:>8.3f} s'.format(
+                'set_many' if use_set_many else 'set',
+                'suppressed' if mode else 'plain', written / 1024.0, elapsed))
+
+
+if __name__ == '__main__':
+    main()
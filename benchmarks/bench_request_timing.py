@@ -0,0 +1,59 @@
+"""
+Measures the per-request cost of the Server-Timing header and the request
+log line, against plain flask_cache and the stats proxy with both disabled.
+
+    python benchmarks/bench_request_timing.py [requests]
+"""
+from __future__ import print_function
+import logging
+import sys
+import timeit
+
+from flask import Flask
+from flask_cache import Cache as FlaskCache
+from flask_cache_stats import Cache
+
+
+def make_app(cache_cls, **config):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config.update(config)
+    cache = cache_cls(app)
+
+    @app.route('/')
+    def view():
+        for idx in range(5):
+            cache.get('key/{}'.format(idx))
+        cache.set('key/0', 'value')
+        return 'ok'
+
+    return app
+
+
+def run(app, requests):
+    client = app.test_client()
+    client.get('/')
+    best = min(timeit.repeat(lambda: client.get('/'), number=requests, repeat=5))
+    return best / requests * 1e6
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    logging.getLogger('flask_cache_stats').addHandler(logging.NullHandler())
+
+    cases = [
+        ('flask_cache', make_app(FlaskCache)),
+        ('stats, disabled', make_app(Cache)),
+        ('stats, server timing', make_app(Cache, CACHE_STATS_SERVER_TIMING=True)),
+        ('stats, request log', make_app(Cache, CACHE_STATS_REQUEST_LOG=True)),
+    ]
+    baseline = None
+    for name, app in cases:
+        usec = run(app, requests)
+        baseline = baseline or usec
+        print('{:<24} {:>9.1f} us/request {:>+7.1f}%'.format(
+            name, usec, (usec / baseline - 1) * 100))
+
+
+if __name__ == '__main__':
+    main()
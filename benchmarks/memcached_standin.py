@@ -0,0 +1,189 @@
+"""
+A memcached stand-in for benchmarks where no memcached server or client
+library is available: a threaded server speaking the subset of the memcached
+text protocol that werkzeug's ``MemcachedCache`` uses, and a client with the
+``memcache.Client`` methods it calls. Every call is a real round trip over
+the loopback interface.
+"""
+import pickle
+import socket
+import threading
+import time
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+#: Expiry times above this many seconds are absolute unix times.
+_RELATIVE_LIMIT = 60 * 60 * 24 * 30
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        server = self.server
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.split()
+            if not parts:
+                continue
+            cmd = parts[0]
+            if cmd in (b'get', b'gets'):
+                out = []
+                for key in parts[1:]:
+                    item = server.lookup(key)
+                    if item is not None:
+                        flags, data = item
+                        out.append(b'VALUE ' + key + b' ' + str(flags).encode() +
+                                   b' ' + str(len(data)).encode() + b'\r\n' +
+                                   data + b'\r\n')
+                out.append(b'END\r\n')
+                self.wfile.write(b''.join(out))
+            elif cmd in (b'set', b'add'):
+                key, flags, exptime, length = parts[1:5]
+                data = self.rfile.read(int(length) + 2)[:-2]
+                stored = server.store(key, int(flags), int(exptime), data,
+                                      only_new=cmd == b'add')
+                if len(parts) < 6:
+                    self.wfile.write(b'STORED\r\n' if stored else b'NOT_STORED\r\n')
+            elif cmd == b'delete':
+                deleted = server.delete(parts[1])
+                if len(parts) < 3:
+                    self.wfile.write(b'DELETED\r\n' if deleted else b'NOT_FOUND\r\n')
+            elif cmd == b'flush_all':
+                server.flush()
+                self.wfile.write(b'OK\r\n')
+            else:
+                self.wfile.write(b'ERROR\r\n')
+            self.wfile.flush()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        socketserver.TCPServer.__init__(self, address, _Handler)
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            flags, expires, data = item
+            if expires and expires <= time.time():
+                del self._items[key]
+                return None
+            return flags, data
+
+    def store(self, key, flags, exptime, data, only_new=False):
+        if exptime and exptime <= _RELATIVE_LIMIT:
+            exptime += time.time()
+        with self._lock:
+            if only_new and key in self._items:
+                return False
+            self._items[key] = (flags, exptime, data)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._items.pop(key, None) is not None
+
+    def flush(self):
+        with self._lock:
+            self._items.clear()
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+class Client(object):
+    """The ``memcache.Client`` methods ``MemcachedCache`` uses. Values are
+       pickled; every thread gets its own connection.
+    """
+    def __init__(self, address):
+        self.address = address
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection(self.address)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = sock.makefile('rwb')
+            self._local.sock = sock
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _store_cmd(cmd, key, value, time):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return ('{} {} 1 {} {}\r\n'.format(cmd, key, int(time or 0), len(data))
+                .encode('utf-8') + data + b'\r\n')
+
+    def _store(self, cmd, key, value, time):
+        conn = self._conn()
+        conn.write(self._store_cmd(cmd, key, value, time))
+        conn.flush()
+        return conn.readline() == b'STORED\r\n'
+
+    def get_multi(self, keys):
+        if not keys:
+            return {}
+        conn = self._conn()
+        conn.write(('get ' + ' '.join(keys) + '\r\n').encode('utf-8'))
+        conn.flush()
+        values = {}
+        while True:
+            line = conn.readline()
+            if line == b'END\r\n':
+                return values
+            _, key, flags, length = line.split()
+            data = conn.read(int(length) + 2)[:-2]
+            values[key.decode('utf-8')] = pickle.loads(data)
+
+    def get(self, key):
+        return self.get_multi([key]).get(key)
+
+    def set(self, key, value, time=0):
+        return self._store('set', key, value, time)
+
+    def add(self, key, value, time=0):
+        return self._store('add', key, value, time)
+
+    def set_multi(self, mapping, time=0):
+        "Pipelines the writes and returns the keys that were not stored."
+        keys = list(mapping)
+        conn = self._conn()
+        conn.write(b''.join(self._store_cmd('set', key, mapping[key], time)
+                            for key in keys))
+        conn.flush()
+        return [key for key in keys if conn.readline() != b'STORED\r\n']
+
+    def delete(self, key):
+        conn = self._conn()
+        conn.write('delete {}\r\n'.format(key).encode('utf-8'))
+        conn.flush()
+        return conn.readline() == b'DELETED\r\n'
+
+    def delete_multi(self, keys):
+        conn = self._conn()
+        conn.write(b''.join('delete {}\r\n'.format(key).encode('utf-8')
+                            for key in keys))
+        conn.flush()
+        return all([conn.readline() == b'DELETED\r\n' for key in keys])
+
+    def flush_all(self):
+        conn = self._conn()
+        conn.write(b'flush_all\r\n')
+        conn.flush()
+        return conn.readline() == b'OK\r\n'
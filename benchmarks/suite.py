@@ -0,0 +1,280 @@
+"""
+Benchmark suite for the stats proxy. Runs get, set, get_many, set_many and
+a ``cached`` function against plain flask_cache, the stats proxy and the
+stats proxy with CACHE_STATS_ENABLED = False, on the simple and filesystem
+backends and a local memcached stand-in (see memcached_standin.py), for
+uniform, Zipfian and scan key distributions, several key cardinalities and
+thread counts. Times are per call, and get_many and set_many calls take
+10 keys each.
+
+Results are written as JSON so runs can be compared between commits:
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --output after.json
+    python benchmarks/suite.py --compare before.json after.json
+
+Every option takes a comma separated list, see --help.
+"""
+from __future__ import print_function
+import argparse
+import bisect
+import json
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from flask_cache import Cache as FlaskCache
+from werkzeug.contrib.cache import MemcachedCache
+from flask_cache_stats import Cache
+
+import memcached_standin
+
+BATCH = 10
+IMPLEMENTATIONS = ('flask_cache', 'stats', 'stats_disabled')
+#: Identifies a case across runs.
+CASE_FIELDS = ('backend', 'cache', 'operation', 'workload', 'keys', 'threads')
+
+_standin = None
+
+
+def memcached(app, config, args, kwargs):
+    global _standin
+    if _standin is None:
+        _standin = memcached_standin.Server().start()
+    return MemcachedCache(memcached_standin.Client(_standin.server_address),
+                          **kwargs)
+
+
+def uniform(rnd, keys, count):
+    return [rnd.randrange(keys) for _ in range(count)]
+
+
+def zipf(rnd, keys, count, s=1.1):
+    total = 0
+    cdf = []
+    for rank in range(keys):
+        total += 1.0 / (rank + 1) ** s
+        cdf.append(total)
+    return [min(bisect.bisect(cdf, rnd.random() * total), keys - 1)
+            for _ in range(count)]
+
+
+def scan(rnd, keys, count):
+    start = rnd.randrange(keys)
+    return [(start + idx) % keys for idx in range(count)]
+
+
+WORKLOADS = dict(uniform=uniform, zipf=zipf, scan=scan)
+
+
+def make_cache(backend, implementation, keys, cache_dir):
+    app = Flask(__name__)
+    app.config['CACHE_THRESHOLD'] = keys * 2
+    if backend == 'filesystem':
+        app.config['CACHE_TYPE'] = 'filesystem'
+        app.config['CACHE_DIR'] = cache_dir
+    elif backend == 'memcached':
+        app.config['CACHE_TYPE'] = '__main__.memcached'
+    else:
+        app.config['CACHE_TYPE'] = backend
+    if implementation == 'flask_cache':
+        cache = FlaskCache(app)
+    else:
+        app.config['CACHE_STATS_ENABLED'] = implementation == 'stats'
+        cache = Cache(app)
+
+    backend = app.extensions['cache'][cache]
+    backend.clear()
+    for start in range(0, keys, 100):
+        backend.set_many(dict(('bench/{}'.format(idx), idx)
+                              for idx in range(start, min(start + 100, keys))))
+
+    current = threading.local()
+
+    @cache.cached(timeout=300, key_prefix=lambda: current.key)
+    def view():
+        return 'value'
+
+    return cache, view, current
+
+
+def operation(name, cache, view, current):
+    "Returns a function running ``name`` on a list of key indexes."
+    keys = lambda indexes: ['bench/{}'.format(idx) for idx in indexes]
+
+    if name == 'get':
+        def run(indexes):
+            for key in keys(indexes):
+                cache.get(key)
+    elif name == 'set':
+        def run(indexes):
+            for key in keys(indexes):
+                cache.set(key, key)
+    elif name == 'get_many':
+        def run(indexes):
+            indexes = keys(indexes)
+            for start in range(0, len(indexes), BATCH):
+                cache.get_many(*indexes[start:start + BATCH])
+    elif name == 'set_many':
+        def run(indexes):
+            indexes = keys(indexes)
+            for start in range(0, len(indexes), BATCH):
+                cache.set_many(dict((key, key) for key in indexes[start:start + BATCH]))
+    else:
+        def run(indexes):
+            for key in keys(indexes):
+                current.key = key
+                view()
+    return run
+
+
+def run_case(run, workload, keys, threads, ops, repeat):
+    """Returns the best wall time of ``repeat`` runs of ``threads`` threads
+       each running ``ops`` operations.
+    """
+    best = None
+    for attempt in range(repeat):
+        indexes = [WORKLOADS[workload](random.Random(attempt * 1000 + thread),
+                                       keys, ops)
+                   for thread in range(threads)]
+        start = threading.Event()
+
+        def worker(indexes):
+            start.wait()
+            run(indexes)
+
+        workers = [threading.Thread(target=worker, args=(indexes[thread],))
+                   for thread in range(threads)]
+        for thread in workers:
+            thread.start()
+        start_time = time.time()
+        start.set()
+        for thread in workers:
+            thread.join()
+        elapsed = time.time() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    results = []
+    cache_dir = tempfile.mkdtemp()
+    try:
+        for backend in args.backends:
+            for keys in args.keys:
+                for implementation in IMPLEMENTATIONS:
+                    cache, view, current = make_cache(backend, implementation,
+                                                      keys, cache_dir)
+                    for name in args.operations:
+                        run = operation(name, cache, view, current)
+                        for workload in args.workloads:
+                            for threads in args.threads:
+                                seconds = run_case(run, workload, keys, threads,
+                                                   args.ops, args.repeat)
+                                ops = args.ops * threads
+                                result = dict(backend=backend, cache=implementation,
+                                              operation=name, workload=workload,
+                                              keys=keys, threads=threads, ops=ops,
+                                              seconds=seconds,
+                                              usec_per_op=seconds / ops * 1e6)
+                                results.append(result)
+                                report(result, results)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def case(result):
+    return tuple(result[field] for field in CASE_FIELDS)
+
+
+def report(result, results):
+    line = '{backend:<10} {cache:<15} {operation:<8} {workload:<7} {keys:>6} keys ' \
+           '{threads:>2} threads {usec_per_op:>9.2f} us/op'.format(**result)
+    if result['cache'] != 'flask_cache':
+        baseline = dict(result, cache='flask_cache')
+        for other in results:
+            if case(other) == case(baseline):
+                line += ' {:>+8.1f}%'.format(
+                    (result['usec_per_op'] / other['usec_per_op'] - 1) * 100)
+    print(line)
+    sys.stdout.flush()
+
+
+def compare(before_path, after_path, threshold):
+    with open(before_path) as f:
+        before = dict((case(result), result) for result in json.load(f)['results'])
+    with open(after_path) as f:
+        after = json.load(f)['results']
+
+    regressions = 0
+    for result in after:
+        old = before.get(case(result))
+        if old is None:
+            continue
+        change = (result['usec_per_op'] / old['usec_per_op'] - 1) * 100
+        flag = ''
+        if change > threshold:
+            flag = ' REGRESSION'
+            regressions += 1
+        print('{backend:<10} {cache:<15} {operation:<8} {workload:<7} {keys:>6} keys '
+              '{threads:>2} threads'.format(**result) +
+              ' {:>9.2f} -> {:>9.2f} us/op {:>+7.1f}%{}'.format(
+                  old['usec_per_op'], result['usec_per_op'], change, flag))
+    return regressions
+
+
+def csv(kind):
+    return lambda value: [kind(item) for item in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--backends', type=csv(str),
+                        default=['simple', 'filesystem', 'memcached'])
+    parser.add_argument('--operations', type=csv(str),
+                        default=['get', 'set', 'get_many', 'set_many', 'cached'])
+    parser.add_argument('--workloads', type=csv(str),
+                        default=['uniform', 'zipf', 'scan'])
+    parser.add_argument('--keys', type=csv(int), default=[100, 10000])
+    parser.add_argument('--threads', type=csv(int), default=[1, 4])
+    parser.add_argument('--ops', type=int, default=1000,
+                        help='operations per thread and run')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per case, the fastest counts')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='slowdown in percent reported as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(args.compare[0], args.compare[1], args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    results = run_suite(args)
+    if args.output:
+        meta = dict(commit=commit(), python=platform.python_version(),
+                    platform=platform.platform(), time=time.time(),
+                    ops=args.ops, repeat=args.repeat)
+        with open(args.output, 'w') as f:
+            json.dump(dict(meta=meta, results=results), f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
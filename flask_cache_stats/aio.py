@@ -0,0 +1,280 @@
+"""
+Asyncio counterparts of the :class:`~flask_cache_stats.Cache` proxy methods.
+
+Backends that provide coroutine methods (``aget``, ``aset``, ...) are awaited
+directly, everything else runs on the cache's bounded thread pool so a slow
+backend never blocks the event loop. Stats are recorded on the calling task,
+exactly as the blocking methods do. Requires Python 3.5+; ``Cache`` imports
+this module lazily.
+"""
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from flask_cache import function_namespace
+
+from .breaker import bypass_value
+from .keys import HashedKeys
+from .stats import NEGATIVE, timeout_arg, view_key_maker
+
+logger = logging.getLogger(__name__)
+
+
+def _executor(cache):
+    if cache._executor is None:
+        cache._executor = ThreadPoolExecutor(max_workers=cache.async_workers)
+    return cache._executor
+
+
+async def _run(cache, func, *args, **kwargs):
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_executor(cache),
+                                      functools.partial(func, *args, **kwargs))
+
+
+async def _call(cache, name, *args, **kwargs):
+    """Calls backend method ``name`` and returns its result along with the
+       time taken in ms.
+    """
+    breaker = cache.breaker
+    if breaker is not None and not breaker.allow(name):
+        return bypass_value(name, args), 0
+
+    backend = cache.cache
+    if isinstance(backend, HashedKeys):
+        # Hashed here so native coroutine methods are used as well.
+        args = backend.args(name, args)
+        backend = backend.backend
+    native = getattr(backend, 'a' + name, None)
+    start_time = time.time()
+    try:
+        if native is not None and asyncio.iscoroutinefunction(native):
+            retval = await native(*args, **kwargs)
+        else:
+            retval = await _run(cache, getattr(backend, name), *args, **kwargs)
+    except Exception:
+        if breaker is not None:
+            breaker.record(name, (time.time() - start_time) * 1000, error=True)
+        raise
+    access_time = (time.time() - start_time) * 1000
+    if breaker is not None:
+        breaker.record(name, access_time)
+    return retval, access_time
+
+
+async def _get(cache, *args, **kwargs):
+    retval, access_time = await _call(cache, 'get', *args, **kwargs)
+    return cache._record_get(args[0], retval, access_time)
+
+
+async def aget(cache, *args, **kwargs):
+    retval = await _get(cache, *args, **kwargs)
+    if retval is NEGATIVE:
+        return None
+    return retval
+
+
+async def _touch(cache, key, value, stored, timeout, tags=(),
+                 fingerprint=None):
+    retval, access_time = await _call(cache, 'touch', key, timeout)
+    if not retval:
+        retval, set_time = await _call(cache, 'set', key, stored, timeout)
+        access_time += set_time
+    cache._record_set(key, value, retval, access_time, timeout, tags,
+                      fingerprint)
+    return retval
+
+
+async def aset(cache, *args, **kwargs):
+    tags = kwargs.pop('tags', ())
+    value = args[1]
+    args = cache._encode_args(args)
+    timeout = timeout_arg(args, kwargs, 2)
+    fingerprint = None
+    if cache.write_fingerprints:
+        action, fingerprint = cache._check_write(args[0], args[1], timeout)
+        if action == 'skip':
+            cache._index.add(args[0], tags)
+            return True
+        if action == 'touch':
+            return await _touch(cache, args[0], value, args[1], timeout, tags,
+                                fingerprint)
+    retval, access_time = await _call(cache, 'set', *args, **kwargs)
+    cache._record_set(args[0], value, retval, access_time, timeout, tags,
+                      fingerprint)
+    return retval
+
+
+async def aadd(cache, *args, **kwargs):
+    tags = kwargs.pop('tags', ())
+    value = args[1]
+    args = cache._encode_args(args)
+    retval, access_time = await _call(cache, 'add', *args, **kwargs)
+    cache._record_set(args[0], value, retval, access_time,
+                      timeout_arg(args, kwargs, 2), tags)
+    return retval
+
+
+async def adelete(cache, *args, **kwargs):
+    retval, access_time = await _call(cache, 'delete', *args, **kwargs)
+    cache._record_delete(args[:1], retval, access_time)
+    etag_keys = cache._etag_keys(args[:1])
+    if etag_keys:
+        await adelete_many(cache, *etag_keys)
+    return retval
+
+
+async def aget_many(cache, *args, **kwargs):
+    retval, access_time = await _call(cache, 'get_many', *args, **kwargs)
+    retval = cache._record_get_many(args, retval, access_time)
+    return [None if value is NEGATIVE else value for value in retval]
+
+
+async def aset_many(cache, *args, **kwargs):
+    tags = kwargs.pop('tags', ())
+    mapping = args[0]
+    args = cache._encode_mapping(args)
+    timeout = timeout_arg(args, kwargs, 1)
+    fingerprints = None
+    if cache.write_fingerprints:
+        changed = {}
+        fingerprints = {}
+        for key in args[0]:
+            action, fingerprint = cache._check_write(key, args[0][key], timeout)
+            if action is None:
+                changed[key] = args[0][key]
+                fingerprints[key] = fingerprint
+            elif action == 'touch':
+                await _touch(cache, key, mapping[key], args[0][key], timeout,
+                             tags, fingerprint)
+            else:
+                cache._index.add(key, tags)
+        if not changed:
+            return True
+        args = (changed,) + args[1:]
+        mapping = dict((key, mapping[key]) for key in changed)
+    retval, access_time = await _call(cache, 'set_many', *args, **kwargs)
+    cache._record_set_many(mapping, retval, access_time, timeout, tags,
+                           fingerprints)
+    return retval
+
+
+async def adelete_many(cache, *args, **kwargs):
+    retval, access_time = await _call(cache, 'delete_many', *args, **kwargs)
+    cache._record_delete(args, retval, access_time)
+    etag_keys = cache._etag_keys(args)
+    if etag_keys:
+        await adelete_many(cache, *etag_keys)
+    return retval
+
+
+async def _set_result(cache, cache_key, rv, decorated_function):
+    if rv is None and decorated_function.negative_timeout is not None:
+        await aset(cache, cache_key, NEGATIVE,
+                   timeout=decorated_function.negative_timeout)
+    else:
+        await aset(cache, cache_key, rv,
+                   timeout=cache._effective_timeout(cache_key, decorated_function))
+
+
+async def _cached_call(cache, decorated_function, f, cache_key, args, kwargs):
+    try:
+        rv = await _get(cache, cache_key)
+    except Exception:
+        if current_app.debug:
+            raise
+        logger.exception("Exception possibly due to cache backend.")
+        return await f(*args, **kwargs)
+
+    if rv is NEGATIVE:
+        return None
+    if rv is None:
+        start_time = time.time()
+        rv = await f(*args, **kwargs)
+        cache._record_recompute(cache_key, (time.time() - start_time) * 1000)
+        try:
+            await _set_result(cache, cache_key, rv, decorated_function)
+        except Exception:
+            if current_app.debug:
+                raise
+            logger.exception("Exception possibly due to cache backend.")
+    return rv
+
+
+def cached(cache, timeout=None, key_prefix='view/%s', unless=None,
+           negative_timeout=None, adaptive_timeout=None):
+    def decorator(f):
+        @functools.wraps(f)
+        async def decorated_function(*args, **kwargs):
+            #: Bypass the cache entirely.
+            if callable(unless) and unless() is True:
+                return await f(*args, **kwargs)
+
+            start_time = time.time()
+            cache_key = decorated_function.make_cache_key(*args, **kwargs)
+            cache._record_key_make(cache_key, (time.time() - start_time) * 1000)
+            return await _cached_call(cache, decorated_function, f, cache_key,
+                                      args, kwargs)
+
+        decorated_function.uncached = f
+        decorated_function.cache_timeout = timeout
+        decorated_function.negative_timeout = negative_timeout
+        decorated_function.adaptive_timeout = adaptive_timeout
+        decorated_function.make_cache_key = view_key_maker(key_prefix)
+
+        return decorated_function
+    return decorator
+
+
+def memoize(cache, timeout=None, make_name=None, unless=None,
+            negative_timeout=None, adaptive_timeout=None):
+    def decorator(f):
+        @functools.wraps(f)
+        async def decorated_function(*args, **kwargs):
+            #: bypass cache
+            if callable(unless) and unless() is True:
+                return await f(*args, **kwargs)
+
+            # Building the key looks up the function's version in the
+            # backend, so it is done on the pool as well.
+            app = cache.app or current_app._get_current_object()
+
+            def make_cache_key():
+                with app.app_context():
+                    start_time = time.time()
+                    version_time = cache._sample.version_time
+                    cache_key = decorated_function.make_cache_key(f, *args,
+                                                                  **kwargs)
+                    return cache_key, cache._key_make_time(start_time,
+                                                           version_time)
+
+            try:
+                cache_key, make_time = await _run(cache, make_cache_key)
+            except Exception:
+                if current_app.debug:
+                    raise
+                logger.exception("Exception possibly due to cache backend.")
+                return await f(*args, **kwargs)
+            cache._set_group(cache_key, decorated_function.cache_group)
+            cache._record_key_make(cache_key, make_time)
+
+            return await _cached_call(cache, decorated_function, f, cache_key,
+                                      args, kwargs)
+
+        decorated_function.uncached = f
+        decorated_function.cache_timeout = timeout
+        decorated_function.negative_timeout = negative_timeout
+        decorated_function.adaptive_timeout = adaptive_timeout
+        decorated_function.cache_group = function_namespace(f)[0]
+        version_timeout = decorated_function
+        if adaptive_timeout is not None:
+            version_timeout = adaptive_timeout[1]
+        decorated_function.make_cache_key = cache._memoize_make_cache_key(
+                                            make_name, version_timeout)
+        decorated_function.delete_memoized = lambda: cache.delete_memoized(f)
+
+        return decorated_function
+    return decorator
@@ -0,0 +1,119 @@
+import threading
+import time
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+
+#: Backend methods whose loss would leave stale values behind, so the open
+#: breaker refuses them rather than skipping them quietly.
+INVALIDATIONS = frozenset(['delete', 'delete_many'])
+
+
+class BreakerOpen(Exception):
+    "Raised for an invalidation the open breaker did not send to the backend."
+
+
+def bypass_value(name, args):
+    """What a backend method returns when the breaker skips it. Raises
+       BreakerOpen for invalidations.
+    """
+    if name in INVALIDATIONS:
+        raise BreakerOpen(name)
+    if name == 'get_many':
+        return [None] * len(args)
+    return None
+
+
+class OperationData(object):
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.slow = 0
+        self.bypassed = 0
+
+    def __repr__(self):
+        return ('calls: {}, errors:{}, slow:{}, bypassed:{}'
+                .format(self.calls, self.errors, self.slow, self.bypassed))
+
+    def data(self):
+        return dict(calls=self.calls, errors=self.errors, slow=self.slow,
+                    bypassed=self.bypassed)
+
+
+class CircuitBreaker(object):
+    """Stops calling an unhealthy backend.
+
+       After ``errors`` consecutive failed calls, where a call that raised or
+       took longer than ``latency`` ms is a failure, the breaker opens and
+       backend calls are skipped for ``cooldown`` seconds. Then a single probe
+       call is let through: if it succeeds the breaker closes, otherwise it
+       stays open for another cool-down period.
+    """
+    def __init__(self, errors=5, latency=None, cooldown=30):
+        self.errors = errors
+        self.latency = latency
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.trips = 0
+        self._failures = 0
+        self._opened_at = 0
+        self._probing = False
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def __operation(self, name):
+        if name in self._operations:
+            return self._operations[name]
+        data = OperationData()
+        self._operations[name] = data
+        return data
+
+    def allow(self, name):
+        """Returns whether backend method ``name`` should be called now.
+           Every ``True`` must be followed by a call to :meth:`record`.
+        """
+        if self.state == CLOSED:
+            return True
+
+        with self._lock:
+            if (self.state == OPEN and not self._probing and
+                    time.time() - self._opened_at >= self.cooldown):
+                self.state = HALF_OPEN
+                self._probing = True
+                return True
+        self.__operation(name).bypassed += 1
+        return False
+
+    def record(self, name, access_time, error=False):
+        "Records the outcome of a backend call that took ``access_time`` ms."
+        data = self.__operation(name)
+        data.calls += 1
+        slow = self.latency is not None and access_time > self.latency
+        if error:
+            data.errors += 1
+        elif slow:
+            data.slow += 1
+
+        with self._lock:
+            if error or slow:
+                self._failures += 1
+                if self.state == HALF_OPEN or self._failures >= self.errors:
+                    self.__trip()
+            else:
+                self._failures = 0
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                    self._probing = False
+
+    def __trip(self):
+        if self.state == CLOSED:
+            self.trips += 1
+        self.state = OPEN
+        self._opened_at = time.time()
+        self._probing = False
+
+    def data(self):
+        operations = {}
+        for name in self._operations:
+            operations[name] = self._operations[name].data()
+        return dict(state=self.state, trips=self.trips, operations=operations)
@@ -0,0 +1,57 @@
+"""
+Change tracking for the live stats dashboard.
+
+Every recorded key gets the version of its last change, and keys are kept in
+the order they last changed in, so the keys changed since a version are read
+off the end without looking at the others. Tracking only starts when the
+dashboard first asks for it, so a cache nobody watches pays nothing.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class ChangeLog(object):
+    "Versions of the keys that changed, most recent last."
+    def __init__(self):
+        # Version 0 asks for every key.
+        self.version = 1
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._waiting = 0
+
+    def touch(self, key):
+        with self._lock:
+            self.version += 1
+            self._keys.pop(key, None)
+            self._keys[key] = self.version
+            if self._waiting:
+                self._changed.notify_all()
+
+    def since(self, version):
+        "Returns the current version and the keys changed after ``version``."
+        keys = []
+        with self._lock:
+            for key in reversed(self._keys):
+                if self._keys[key] <= version:
+                    break
+                keys.append(key)
+            return self.version, keys
+
+    def wait(self, version, timeout):
+        """Waits up to ``timeout`` seconds for a change after ``version``.
+           Returns the current version.
+        """
+        deadline = time.time() + timeout
+        with self._lock:
+            self._waiting += 1
+            try:
+                while self.version <= version:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+            finally:
+                self._waiting -= 1
+            return self.version
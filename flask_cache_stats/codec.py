@@ -0,0 +1,106 @@
+import json
+import marshal
+import pickle
+import struct
+import zlib
+
+#: Prefix marking values written by :class:`ValueCodec`. Anything read back
+#: without it, e.g. values written before the codec was enabled, is
+#: returned untouched.
+MAGIC = b'\x00FCS'
+_header = struct.Struct('BB')
+
+PICKLE, MARSHAL, JSON = 0, 1, 2
+NONE, ZLIB, LZ4 = 0, 1, 2
+
+
+class ValueCodec(object):
+    """Serializes and optionally compresses values before they are handed to
+       the cache backend.
+
+       :param serializer: ``'pickle'``, ``'marshal'`` or ``'json'``. Values
+                          that marshal or json cannot represent fall back to
+                          pickle. json turns tuples into lists, so only use it
+                          for json-native data; marshal data is only readable
+                          by the Python version that wrote it.
+       :param protocol: Pickle protocol.
+       :param compress_threshold: Serialized values of at least this many
+                                  bytes are compressed. ``None`` disables
+                                  compression.
+       :param compressor: ``'zlib'`` or ``'lz4'`` (needs the lz4 package).
+       :param compress_level: zlib compression level.
+    """
+    def __init__(self, serializer='pickle', protocol=pickle.HIGHEST_PROTOCOL,
+                 compress_threshold=1024, compressor='zlib', compress_level=6):
+        if serializer not in ('pickle', 'marshal', 'json'):
+            raise ValueError('Unknown serializer {!r}'.format(serializer))
+        if compressor not in ('zlib', 'lz4'):
+            raise ValueError('Unknown compressor {!r}'.format(compressor))
+
+        self.serializer = serializer
+        self.protocol = protocol
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        if compressor == 'lz4':
+            import lz4.frame
+            self._lz4 = lz4.frame
+            self.compressor = LZ4
+        else:
+            self._lz4 = None
+            self.compressor = ZLIB
+
+    def dumps(self, value):
+        if self.serializer == 'marshal':
+            try:
+                return MARSHAL, marshal.dumps(value)
+            except ValueError:
+                pass
+        elif self.serializer == 'json':
+            try:
+                return JSON, json.dumps(value, separators=(',', ':')).encode('utf-8')
+            except (TypeError, ValueError):
+                pass
+        return PICKLE, pickle.dumps(value, self.protocol)
+
+    def loads(self, serializer, data):
+        if serializer == MARSHAL:
+            return marshal.loads(data)
+        if serializer == JSON:
+            return json.loads(data.decode('utf-8'))
+        return pickle.loads(data)
+
+    def compress(self, data):
+        if self.compressor == LZ4:
+            return self._lz4.compress(data)
+        return zlib.compress(data, self.compress_level)
+
+    def decompress(self, compressor, data):
+        if compressor == LZ4:
+            if self._lz4 is None:
+                import lz4.frame
+                self._lz4 = lz4.frame
+            return self._lz4.decompress(data)
+        return zlib.decompress(data)
+
+    def encode(self, value):
+        """Returns the bytes to store and the serialized size before
+           compression.
+        """
+        serializer, data = self.dumps(value)
+        size = len(data)
+        compressor = NONE
+        if self.compress_threshold is not None and size >= self.compress_threshold:
+            compressed = self.compress(data)
+            if len(compressed) < size:
+                data = compressed
+                compressor = self.compressor
+        return MAGIC + _header.pack(serializer, compressor) + data, size
+
+    def decode(self, data):
+        if not isinstance(data, bytes) or data[:4] != MAGIC:
+            return data
+        serializer, compressor = _header.unpack(data[4:6])
+        data = data[6:]
+        if compressor != NONE:
+            data = self.decompress(compressor, data)
+        return self.loads(serializer, data)
@@ -0,0 +1,59 @@
+"""
+Streaming export of the per-key stats of a :class:`~flask_cache_stats.Cache`
+as NDJSON or CSV, for offline analysis of more keys than the stats page can
+show. Rows are formatted as they are read from ``Cache.iter_log`` and sent in
+chunks of ``BATCH`` rows, so memory use does not grow with the number of keys.
+"""
+import csv
+import json
+
+#: Columns of the CSV export, in order.
+FIELDS = ('key', 'group', 'hot', 'hit', 'miss', 'negative_hit', 'size',
+          'access_time')
+#: Mimetype by export format.
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+BATCH = 1000
+
+
+class _Lines(object):
+    "A file for csv.writer collecting what it writes."
+    def __init__(self):
+        self.lines = []
+
+    def write(self, value):
+        self.lines.append(value)
+
+
+def ndjson(rows, batch=BATCH):
+    "Yields ``(key, data)`` rows as chunks of JSON lines."
+    chunk = []
+    for key, data in rows:
+        data['key'] = key
+        chunk.append(json.dumps(data, sort_keys=True))
+        if len(chunk) >= batch:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def csv_lines(rows, batch=BATCH):
+    "Yields ``(key, data)`` rows as chunks of CSV lines, after a header."
+    out = _Lines()
+    writer = csv.writer(out)
+    writer.writerow(FIELDS)
+    for key, data in rows:
+        data['key'] = key
+        writer.writerow([data[field] for field in FIELDS])
+        if len(out.lines) >= batch:
+            yield ''.join(out.lines)
+            out.lines = []
+    if out.lines:
+        yield ''.join(out.lines)
+
+
+def export(rows, format, batch=BATCH):
+    "Yields ``rows`` in ``format``, one of FORMATS."
+    if format == 'csv':
+        return csv_lines(rows, batch)
+    return ndjson(rows, batch)
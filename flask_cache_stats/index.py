@@ -0,0 +1,95 @@
+"""
+Index of the keys :class:`~flask_cache_stats.Cache` believes are live, used
+for bulk invalidation by tag or key prefix.
+
+Keys are added when written and dropped when deleted or found missing, so
+keys that expired without being read again stay indexed until they are; a
+bulk delete then merely deletes a few keys that are already gone.
+
+Only tagged keys are indexed unless every live key is asked for, which
+prefix lookups need. Those keys are kept in a set and only sorted when a
+prefix is looked up after new keys were added, so writes stay O(1).
+"""
+import bisect
+import threading
+
+
+class KeyIndex(object):
+    """Tagged keys and the tags they were written with, and with ``keys``
+       every live key. Tags accumulate over writes until the key is deleted.
+    """
+    def __init__(self, keys=False):
+        self.track_keys = keys
+        self._keys = set()
+        #: Sorted ``_keys`` as of the last prefix lookup, possibly with keys
+        #: discarded since.
+        self._sorted = []
+        self._key_tags = {}
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys) if self.track_keys else len(self._key_tags)
+
+    def __contains__(self, key):
+        return key in self._keys or key in self._key_tags
+
+    def add(self, key, tags=()):
+        if not tags and not self.track_keys:
+            return
+        with self._lock:
+            if self.track_keys and key not in self._keys:
+                self._keys.add(key)
+                self._sorted = None
+            if tags:
+                key_tags = self._key_tags.setdefault(key, set())
+                for tag in tags:
+                    key_tags.add(tag)
+                    self._tags.setdefault(tag, set()).add(key)
+
+    def discard(self, key):
+        # Most keys are neither tagged nor, by default, tracked.
+        if key not in self._keys and key not in self._key_tags:
+            return
+        with self._lock:
+            self._keys.discard(key)
+            key_tags = self._key_tags.pop(key, None)
+            if key_tags is None:
+                return
+            for tag in key_tags:
+                keys = self._tags[tag]
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def clear(self):
+        with self._lock:
+            self._keys = set()
+            self._sorted = []
+            self._key_tags = {}
+            self._tags = {}
+
+    def keys(self):
+        "Returns the live keys as a frozenset, if they are tracked."
+        with self._lock:
+            return frozenset(self._keys)
+
+    def tagged(self, tag):
+        "Returns the live keys tagged ``tag``, sorted."
+        with self._lock:
+            return sorted(self._tags.get(tag, ()))
+
+    def prefixed(self, prefix):
+        "Returns the live keys starting with ``prefix``, sorted."
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._keys)
+            keys = self._sorted
+            live = self._keys
+            found = []
+            for idx in range(bisect.bisect_left(keys, prefix), len(keys)):
+                if not keys[idx].startswith(prefix):
+                    break
+                if keys[idx] in live:
+                    found.append(keys[idx])
+            return found
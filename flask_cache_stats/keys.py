@@ -0,0 +1,124 @@
+"""
+Key hashing for :class:`~flask_cache_stats.Cache`.
+
+:class:`HashedKeys` stands in for the backend and stores keys under a fixed
+length digest, which saves backend memory and network bytes on long keys and
+keeps them within memcached's 250 byte limit. Everything above the backend,
+the stats included, keeps using the readable keys; a bounded map from recent
+digests back to their keys answers lookups by digest, e.g. of keys seen in
+the backend.
+"""
+from collections import OrderedDict
+import functools
+import hashlib
+import threading
+
+#: Backend methods taking a key first.
+_KEY_METHODS = frozenset(['get', 'set', 'add', 'delete', 'touch', 'has',
+                          'inc', 'dec'])
+#: Backend methods taking keys as their arguments.
+_KEYS_METHODS = frozenset(['get_many', 'delete_many', 'get_dict'])
+
+
+def key_length(key):
+    "Length of ``key`` in bytes."
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+    return len(key)
+
+
+def digest(key):
+    "The 40 character digest a hashed ``key`` is stored under."
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+    return hashlib.sha1(key).hexdigest()
+
+
+class HashedKeys(object):
+    """Backend proxy storing keys longer than ``min_length`` bytes, or every
+       key with the default of 0, under their digest. The keys of the
+       ``max_keys`` most recently used digests are remembered.
+    """
+    def __init__(self, backend, min_length=0, max_keys=10000):
+        self.backend = backend
+        self.min_length = min_length
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == 'backend':
+            raise AttributeError(name)
+        attr = getattr(self.backend, name)
+        if name in _KEY_METHODS or name in _KEYS_METHODS:
+            return functools.partial(self.call, name)
+        return attr
+
+    def hashes(self, length):
+        "Returns whether a key of ``length`` bytes is hashed."
+        return length > self.min_length
+
+    def backend_key(self, key):
+        "Returns the key ``key`` is stored under."
+        if self.min_length and key_length(key) <= self.min_length:
+            return key
+        hashed = digest(key)
+        if self.max_keys:
+            with self._lock:
+                self._keys.pop(hashed, None)
+                self._keys[hashed] = key
+                if len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+        return hashed
+
+    def readable_key(self, key):
+        """Returns the key stored under digest ``key``, or ``key`` itself if
+           it is not a recent digest.
+        """
+        return self._keys.get(key, key)
+
+    def args(self, name, args):
+        "Returns the arguments of backend method ``name`` with keys hashed."
+        if name == 'set_many':
+            mapping = args[0]
+            return (dict((self.backend_key(key), mapping[key])
+                         for key in mapping),) + args[1:]
+        if name in _KEYS_METHODS:
+            return tuple(self.backend_key(key) for key in args)
+        if name in _KEY_METHODS:
+            return (self.backend_key(args[0]),) + args[1:]
+        return args
+
+    def call(self, name, *args, **kwargs):
+        "Calls backend method ``name`` with keys hashed."
+        backend_args = self.args(name, args)
+        retval = getattr(self.backend, name)(*backend_args, **kwargs)
+        if name == 'get_dict':
+            return dict((key, retval.get(backend_key))
+                        for key, backend_key in zip(args, backend_args))
+        return retval
+
+    def get(self, *args, **kwargs):
+        return self.call('get', *args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        return self.call('set', *args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        return self.call('add', *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self.call('delete', *args, **kwargs)
+
+    def get_many(self, *args, **kwargs):
+        return self.call('get_many', *args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        return self.call('set_many', *args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        return self.call('delete_many', *args, **kwargs)
+
+    def data(self):
+        return dict(min_length=self.min_length, mapped=len(self._keys),
+                    max_keys=self.max_keys)
@@ -0,0 +1,70 @@
+"""
+Snapshots of the stats of a :class:`~flask_cache_stats.Cache`, to measure a
+window such as a load test: take one before and one after, and diff them.
+
+A snapshot copies the running totals, which are few, and counts the live
+keys, so it never formats the per-key log; the diff of the totals is
+computed from the two snapshots alone.
+"""
+import time
+
+#: Upper bounds in ms of the access time histogram buckets; one more bucket
+#: takes everything slower.
+LATENCY_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50,
+                   100, 200, 500, 1000)
+
+#: Counters of :class:`~flask_cache_stats.stats.TotalsData` compared by diff.
+FIELDS = ('hit', 'miss', 'negative_hit', 'writes', 'deletes', 'written',
+          'size')
+
+
+class Snapshot(object):
+    """Totals of a cache and its namespaces, and its number of live keys, at
+       one time. ``totals`` and ``namespaces`` are copies the cache no longer
+       updates.
+    """
+    def __init__(self, id, totals, namespaces, keys):
+        self.id = id
+        self.time = time.time()
+        self.totals = totals
+        self.namespaces = namespaces
+        self.keys = keys
+
+    def __repr__(self):
+        return 'id: {}, time:{}, keys:{}'.format(self.id, self.time,
+                                                 self.keys)
+
+    def data(self):
+        return dict(id=self.id, time='{:.3f}'.format(self.time),
+                    keys=self.keys)
+
+
+def delta(before, after):
+    "Returns what happened between two copies of the same totals."
+    data = {}
+    for field in FIELDS:
+        data[field] = getattr(after, field) - getattr(before, field)
+    data['size'] = '{:.3f}'.format(data['size'])
+    data['written'] = '{:.3f}'.format(data['written'])
+    reads = data['hit'] + data['miss'] + data['negative_hit']
+    data['hit_ratio'] = '{:.3f}'.format(
+        (data['hit'] + data['negative_hit']) / float(reads or 1))
+    data['latency'] = [count - before.latency[idx]
+                       for idx, count in enumerate(after.latency)]
+    return data
+
+
+def diff(before, after):
+    """Returns the difference between Snapshot ``before`` and the later
+       ``after``: totals and namespace deltas.
+    """
+    namespaces = {}
+    for name in after.namespaces:
+        if name in before.namespaces:
+            namespaces[name] = delta(before.namespaces[name],
+                                     after.namespaces[name])
+    return dict(start=before.id, end=after.id,
+                duration='{:.3f}'.format(after.time - before.time),
+                latency_buckets=list(LATENCY_BUCKETS),
+                totals=delta(before.totals, after.totals),
+                namespaces=namespaces)
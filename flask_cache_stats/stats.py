@@ -1,45 +1,713 @@
-from flask_cache import Cache as FlaskCache
-from flask_login import login_required
+from flask_cache import Cache as FlaskCache, function_namespace
 from flask import Blueprint, render_template, jsonify, abort
-from flask import request, current_app
+from flask import request, current_app, has_request_context, _request_ctx_stack
+from collections import Counter, OrderedDict
 from sys import getsizeof
+import base64
+import bisect
+import copy
+import hashlib
+import json
+import math
+import pickle
+from .codec import ValueCodec
+from .breaker import CircuitBreaker, BreakerOpen, bypass_value, CLOSED
+from .statsd import StatsdExporter
+from .index import KeyIndex
+from .keys import HashedKeys, key_length
+from .changes import ChangeLog
+from .snapshot import Snapshot, LATENCY_BUCKETS, diff as diff_snapshots
+from . import export, ttl, warmup
+import atexit
+import re
+import threading
 import time
 import functools
+import itertools
 import logging
 
 logger = logging.getLogger(__name__)
 
+#: Runs of digits are treated as the variable part of a key when grouping.
+_key_group_re = re.compile(r'\d+')
+
+
+class _NegativeResult(object):
+    """Stored by ``cached``/``memoize`` in place of a ``None`` result when
+       ``negative_timeout`` is set, so that "no result" can be told apart
+       from a miss.
+    """
+    def __reduce__(self):
+        return 'NEGATIVE'
+
+    def __repr__(self):
+        return 'NEGATIVE'
+
+
+NEGATIVE = _NegativeResult()
+
+#: Appended to the key of a ``cached(etag=True)`` view for the key holding
+#: its ``(etag, size)``.
+ETAG_SUFFIX = ':etag'
+
+#: Calls recorded for warm-up per call saved, the least recently made
+#: dropped beyond that.
+CALLS_PER_SAVED = 10
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def _unrecorded(keys, retval, access_time):
+    return retval
+
+
+def _without_tags(method):
+    "Drops the ``tags`` only the proxy methods understand."
+    def proxy(*args, **kwargs):
+        kwargs.pop('tags', None)
+        return method(*args, **kwargs)
+    return proxy
+
+
+def view_key_maker(key_prefix):
+    "Returns the make_cache_key of a ``cached`` view with ``key_prefix``."
+    def make_cache_key(*args, **kwargs):
+        if callable(key_prefix):
+            cache_key = key_prefix()
+        elif '%s' in key_prefix:
+            cache_key = key_prefix % request.path
+        else:
+            cache_key = key_prefix
+
+        return cache_key
+    return make_cache_key
+
+
+def _without_negative(get):
+    "Returns ``None`` rather than the ``NEGATIVE`` markers ``get`` finds."
+    def proxy(*args, **kwargs):
+        retval = get(*args, **kwargs)
+        return None if retval is NEGATIVE else retval
+    return proxy
+
+
+def _without_negatives(get_many):
+    "Returns ``None`` rather than the ``NEGATIVE`` markers ``get_many`` finds."
+    def proxy(*args, **kwargs):
+        return [None if value is NEGATIVE else value
+                for value in get_many(*args, **kwargs)]
+    return proxy
+
+
+def _sampled(name):
+    """Measures how much of every CACHE_STATS_OVERHEAD_SAMPLE-th call of a
+       proxy method is spent outside the backend.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def proxy(self, *args, **kwargs):
+            self._proxy_calls += 1
+            sample_every = self.overhead_sample
+            if not sample_every or self._proxy_calls % sample_every:
+                return method(self, *args, **kwargs)
+
+            sample = self._sample
+            if sample.backend_time is not None:
+                # Called from a sampled call, which includes it.
+                return method(self, *args, **kwargs)
+            sample.backend_time = 0
+            start_time = time.time()
+            try:
+                retval = method(self, *args, **kwargs)
+            finally:
+                backend_time = sample.backend_time
+                sample.backend_time = None
+            self._record_overhead(name, (time.time() - start_time) * 1000,
+                                  backend_time)
+            return retval
+        return proxy
+    return decorator
+
+
+class _Sample(threading.local):
+    #: Backend time of the sampled call in progress on this thread, ``None``
+    #: when not sampling.
+    backend_time = None
+    #: Time spent on memoize version round trips on this thread, which key
+    #: build times leave out.
+    version_time = 0
+
+
+def timeout_arg(args, kwargs, idx):
+    "Picks the ``timeout`` out of proxy arguments where it is at ``idx``."
+    if 'timeout' in kwargs:
+        return kwargs['timeout']
+    if len(args) > idx:
+        return args[idx]
+    return None
+
 
 class LogData(object):
-    def __init__(self, hot=False, hit=0, miss=0, size=0, access_time=0):
+    def __init__(self, hot=False, hit=0, miss=0, size=0, access_time=0,
+                 negative_hit=0, group=None):
         self.hot = hot
         self.hit = hit
         self.miss = miss
+        self.negative_hit = negative_hit
         self.size = size
         self.access_time = access_time
+        self.group = group
+        #: When the current value was written, ``None`` if it is gone.
+        self.set_time = None
+        #: Timeout of the current value in seconds, ``None`` for no expiry.
+        self.timeout = None
+        #: Whether the current value has been read.
+        self.read = False
+        self.last_access = None
+        #: Digest of the last value written, if fingerprinting is enabled.
+        self.fingerprint = None
+        #: Totals the key counts towards, ``None`` until looked up.
+        self.totals = None
+        #: Id of the last snapshot taken before the key last became live,
+        #: and before it last stopped being live.
+        self.born = None
+        self.died = None
+
+    def expired(self, now):
+        return (self.set_time is not None and self.timeout is not None and
+                now >= self.set_time + self.timeout)
 
     def __repr__(self):
-        return ('hot: {}, hit:{}, miss:{}, size:{}, access_time:{}'
-                .format(self.hot, self.hit, self.miss, self.size, self.access_time))
+        return ('hot: {}, hit:{}, miss:{}, negative_hit:{}, size:{}, access_time:{}'
+                .format(self.hot, self.hit, self.miss, self.negative_hit,
+                        self.size, self.access_time))
 
     def data(self):
-        return dict(hot=self.hot, hit=self.hit, miss=self.miss,
+        # The backend drops expired values without telling us.
+        return dict(hot=self.hot and not self.expired(time.time()),
+                    hit=self.hit, miss=self.miss,
+                    negative_hit=self.negative_hit,
                     size='{:.3f}'.format(self.size),
                     access_time='{:.5f}'.format(self.access_time))
 
 
+class TTLData(object):
+    """Expiry lifecycle of the values written to one key group."""
+    def __init__(self):
+        self.writes = 0
+        self.timeout = 0
+        self.size = 0
+        self.reads = 0
+        self.intervals = 0
+        self.interval = 0
+        self.recomputes = 0
+        self.recompute_time = 0
+        self.hits = 0
+        self.age = 0
+        self.first_hits = 0
+        self.time_to_first_hit = 0
+        self.wasted_writes = 0
+        self.expired_misses = 0
+        self.evicted_misses = 0
+        self.cold_misses = 0
+
+    def __repr__(self):
+        return ('writes: {}, hits:{}, wasted_writes:{}, expired_misses:{}'
+                .format(self.writes, self.hits, self.wasted_writes,
+                        self.expired_misses))
+
+    @property
+    def misses(self):
+        return self.expired_misses + self.evicted_misses + self.cold_misses
+
+    @property
+    def rate(self):
+        "Reads per key per second."
+        if not self.interval:
+            return None
+        return self.intervals / self.interval
+
+    def data(self, pending_wasted=0):
+        return dict(writes=self.writes,
+                    timeout='{:.1f}'.format(self.timeout / float(self.writes or 1)),
+                    reads=self.reads,
+                    hit_ratio='{:.3f}'.format(
+                        (self.reads - self.misses) / float(self.reads or 1)),
+                    interval='{:.3f}'.format(self.interval / (self.intervals or 1)),
+                    recompute_time='{:.5f}'.format(
+                        self.recompute_time / (self.recomputes or 1)),
+                    hits=self.hits,
+                    age='{:.3f}'.format(self.age / (self.hits or 1)),
+                    time_to_first_hit='{:.3f}'.format(
+                        self.time_to_first_hit / (self.first_hits or 1)),
+                    wasted_writes=self.wasted_writes + pending_wasted,
+                    expired_misses=self.expired_misses,
+                    evicted_misses=self.evicted_misses,
+                    cold_misses=self.cold_misses)
+
+
+class RequestData(object):
+    """Cache usage accumulated over a single request."""
+    def __init__(self):
+        self.round_trips = 0
+        self.hit = 0
+        self.miss = 0
+        self.access_time = 0
+        self.keys = Counter()
+        self.not_modified = 0
+        self.bytes_saved = 0
+
+    def data(self):
+        return dict(round_trips=self.round_trips, hit=self.hit, miss=self.miss,
+                    access_time='{:.5f}'.format(self.access_time))
+
+    def server_timing(self, name='cache'):
+        return '{};dur={:.3f};desc="{} ops, {} hits, {} misses"'.format(
+            name, self.access_time, self.round_trips, self.hit, self.miss)
+
+
+class EndpointData(object):
+    def __init__(self):
+        self.requests = 0
+        self.round_trips = 0
+        self.max_round_trips = 0
+        self.access_time = 0
+        self.flagged = 0
+        self.patterns = Counter()
+        self.not_modified = 0
+        self.bytes_saved = 0
+
+    def __repr__(self):
+        return ('requests: {}, round_trips:{}, max_round_trips:{}, flagged:{}, '
+                'not_modified:{}'.format(self.requests, self.round_trips,
+                                         self.max_round_trips, self.flagged,
+                                         self.not_modified))
+
+    def data(self):
+        requests = self.requests or 1
+        return dict(requests=self.requests,
+                    round_trips='{:.2f}'.format(self.round_trips / float(requests)),
+                    max_round_trips=self.max_round_trips,
+                    access_time='{:.5f}'.format(self.access_time / requests),
+                    flagged=self.flagged,
+                    patterns=[key for key, _ in self.patterns.most_common(5)],
+                    not_modified=self.not_modified,
+                    bytes_saved='{:.3f}'.format(self.bytes_saved / 1024.0))
+
+
+class WriteData(object):
+    def __init__(self):
+        self.writes = 0
+        self.redundant = 0
+        self.skipped = 0
+        self.touched = 0
+        self.bytes_written = 0
+        self.bytes_saved = 0
+
+    def __repr__(self):
+        return ('writes: {}, redundant:{}, skipped:{}, touched:{}'
+                .format(self.writes, self.redundant, self.skipped, self.touched))
+
+    def data(self):
+        return dict(writes=self.writes, redundant=self.redundant,
+                    skipped=self.skipped, touched=self.touched,
+                    bytes_written='{:.3f}'.format(self.bytes_written / 1024.0),
+                    bytes_saved='{:.3f}'.format(self.bytes_saved / 1024.0))
+
+
+class InvalidationData(object):
+    def __init__(self):
+        self.invalidations = 0
+        self.keys = 0
+        self.max_keys = 0
+        self.round_trips = 0
+        self.time = 0
+
+    def __repr__(self):
+        return ('invalidations: {}, keys:{}, max_keys:{}, round_trips:{}'
+                .format(self.invalidations, self.keys, self.max_keys,
+                        self.round_trips))
+
+    def data(self):
+        invalidations = self.invalidations or 1
+        return dict(invalidations=self.invalidations,
+                    fan_out='{:.1f}'.format(self.keys / float(invalidations)),
+                    max_fan_out=self.max_keys,
+                    round_trips=self.round_trips,
+                    time='{:.5f}'.format(self.time / invalidations))
+
+
+class VersionData(object):
+    """Lookups of the version keys of one memoized function."""
+    def __init__(self):
+        self.lookups = 0
+        self.local_hits = 0
+        self.resets = 0
+        self.round_trips = 0
+        self.time = 0
+
+    def __repr__(self):
+        return ('lookups: {}, local_hits:{}, resets:{}, round_trips:{}'
+                .format(self.lookups, self.local_hits, self.resets,
+                        self.round_trips))
+
+    def data(self):
+        return dict(lookups=self.lookups, local_hits=self.local_hits,
+                    local_hit_ratio='{:.3f}'.format(
+                        self.local_hits / float(self.lookups or 1)),
+                    resets=self.resets, round_trips=self.round_trips,
+                    time='{:.5f}'.format(self.time / (self.round_trips or 1)))
+
+
+class KeyData(object):
+    """Lengths of the keys of one key group, and the time decorators took
+       to build them."""
+    def __init__(self):
+        self.keys = 0
+        self.length = 0
+        self.max_length = 0
+        self.long_keys = 0
+        self.hashed = 0
+        self.makes = 0
+        self.make_time = 0
+
+    def __repr__(self):
+        return ('keys: {}, length:{}, long_keys:{}, makes:{}'
+                .format(self.keys, self.length, self.long_keys, self.makes))
+
+    def data(self):
+        return dict(keys=self.keys,
+                    length='{:.1f}'.format(self.length / float(self.keys or 1)),
+                    max_length=self.max_length, long_keys=self.long_keys,
+                    hashed=self.hashed, makes=self.makes,
+                    make_time='{:.5f}'.format(self.make_time / (self.makes or 1)))
+
+
+class OverheadData(object):
+    def __init__(self):
+        self.samples = 0
+        self.time = 0
+        self.backend_time = 0
+
+    def __repr__(self):
+        return ('samples: {}, time:{}, backend_time:{}'
+                .format(self.samples, self.time, self.backend_time))
+
+    def data(self):
+        samples = self.samples or 1
+        overhead = self.time - self.backend_time
+        return dict(samples=self.samples,
+                    time='{:.5f}'.format(self.time / samples),
+                    backend_time='{:.5f}'.format(self.backend_time / samples),
+                    overhead='{:.5f}'.format(overhead / samples),
+                    relative='{:.3f}'.format(overhead / (self.backend_time or 1)))
+
+
+class TotalsData(object):
+    """Running totals of a cache or a namespace in it, kept up to date as
+       operations are recorded so the overview never walks the key log.
+    """
+    def __init__(self):
+        self.start_time = time.time()
+        self.hit = 0
+        self.miss = 0
+        self.negative_hit = 0
+        self.writes = 0
+        self.deletes = 0
+        self.accesses = 0
+        self.access_time = 0
+        #: Accesses by LATENCY_BUCKETS bucket.
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        #: Size in kb of the values written.
+        self.written = 0
+        #: Size in kb of the values believed live.
+        self.size = 0
+
+    def __repr__(self):
+        return ('hit:{}, miss:{}, negative_hit:{}, writes:{}, deletes:{}, '
+                'size:{}'.format(self.hit, self.miss, self.negative_hit,
+                                 self.writes, self.deletes, self.size))
+
+    def data(self):
+        reads = self.hit + self.miss + self.negative_hit
+        operations = reads + self.writes + self.deletes
+        elapsed = time.time() - self.start_time
+        return dict(hit=self.hit, miss=self.miss,
+                    negative_hit=self.negative_hit,
+                    writes=self.writes, deletes=self.deletes,
+                    hit_ratio='{:.3f}'.format(
+                        (self.hit + self.negative_hit) / float(reads or 1)),
+                    throughput='{:.3f}'.format(operations / (elapsed or 1)),
+                    access_time='{:.5f}'.format(
+                        self.access_time / (self.accesses or 1)),
+                    size='{:.3f}'.format(self.size))
+
+    def copy(self):
+        totals = copy.copy(self)
+        totals.latency = list(self.latency)
+        return totals
+
+
+class CodecData(object):
+    def __init__(self):
+        self.encoded = 0
+        self.decoded = 0
+        self.raw_size = 0
+        self.stored_size = 0
+        self.encode_time = 0
+        self.decode_time = 0
+
+    def __repr__(self):
+        return ('encoded: {}, decoded:{}, raw_size:{}, stored_size:{}'
+                .format(self.encoded, self.decoded, self.raw_size,
+                        self.stored_size))
+
+    def data(self):
+        return dict(encoded=self.encoded, decoded=self.decoded,
+                    raw_size='{:.3f}'.format(self.raw_size / 1024.0),
+                    stored_size='{:.3f}'.format(self.stored_size / 1024.0),
+                    ratio='{:.3f}'.format(self.stored_size / float(self.raw_size or 1)),
+                    encode_time='{:.5f}'.format(self.encode_time / (self.encoded or 1)),
+                    decode_time='{:.5f}'.format(self.decode_time / (self.decoded or 1)))
+
+
 class Cache(FlaskCache):
     def __init__(self, *args, **kwargs):
         self._log = {}
+        #: Keys of ``_log`` in the order they were added, which export walks
+        #: by index so keys added meanwhile do not break it.
+        self._log_keys = []
+        self._endpoints = {}
+        self._codec_log = {}
+        self._ttl_log = {}
+        self._write_log = {}
+        self._invalidation_log = {}
+        self._key_log = {}
+        self.key_length_limit = 250
+        #: The backend proxy hashing keys, if CACHE_STATS_HASH_KEYS is set.
+        self.hashed_keys = None
+        self._totals = TotalsData()
+        #: Namespace name by key prefix.
+        self.namespaces = {}
+        self._namespace_totals = {}
+        #: Key prefixes, longest first, and the totals their keys count
+        #: towards.
+        self._prefix_totals = []
+        #: Tagged keys, and every live key with CACHE_STATS_KEY_INDEX.
+        self._index = KeyIndex()
+        self.key_index = False
+        #: Memoize versions by version key, with when they go stale, the
+        #: first to go stale first.
+        self._versions = OrderedDict()
+        self._versions_lock = threading.Lock()
+        self._version_log = {}
+        #: Key prefixes of the ``cached(etag=True)`` views, whose keys have
+        #: their ETag deleted along with them.
+        self._etag_prefixes = ()
+        #: Keys of etag views with a callable ``key_prefix`` this process
+        #: wrote an ETag for.
+        self._etag_written = set()
+        #: Whether ETags are cached, which needs delete to delete them too.
+        self._cache_etags = True
+        self.version_ttl = 5
+        self._snapshots = OrderedDict()
+        self._snapshot_ids = itertools.count(1)
+        #: Id of the last snapshot taken, key births and deaths are recorded
+        #: against it.
+        self._snapshot_id = 0
+        self._live_keys = 0
+        self.max_snapshots = 10
+        self.snapshot_keys = 1000
+        #: Created by the first get_log_changes call.
+        self._changes = None
+        self.delete_chunk_size = 100
+        #: Recorded memoize/cached calls by key, least recently made first,
+        #: ``None`` unless warm-up is enabled.
+        self._calls = None
+        self._calls_lock = threading.Lock()
+        self._warm_functions = {}
+        self._warmup_log = None
+        self.warmup_file = None
+        self.warmup_calls = 100
+        self.warmup_workers = 4
+        self.warmup_rate = None
+        self.write_fingerprints = False
+        self.redundant_writes = None
+        self.single_writer = False
+        self.default_timeout = 300
+        self.ttl_target_hit_ratio = 0.9
+        self.ttl_memory_budget = None
+        self.ttl_min_samples = 10
+        self.codec = None
+        self.breaker = None
+        self.exporter = None
+        self._request_attr = '_cache_stats_{}'.format(id(self))
+        self.round_trip_threshold = 10
+        self.request_log = False
+        self.async_workers = 4
+        self._executor = None
+        self.enabled = True
+        self._overhead_log = {}
+        self._proxy_calls = 0
+        self._sample = _Sample()
+        self.overhead_sample = 100
         super(Cache, self).__init__(*args, **kwargs)
 
+    def init_app(self, app, config=None):
+        super(Cache, self).init_app(app, config)
+
+        stats_config = app.config.copy()
+        if self.config:
+            stats_config.update(self.config)
+        if config:
+            stats_config.update(config)
+
+        self.round_trip_threshold = stats_config.get(
+            'CACHE_STATS_ROUND_TRIP_THRESHOLD', 10)
+        self.request_log = stats_config.get('CACHE_STATS_REQUEST_LOG', False)
+        self.default_timeout = stats_config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        self.ttl_target_hit_ratio = stats_config.get(
+            'CACHE_STATS_TTL_TARGET_HIT_RATIO', 0.9)
+        self.ttl_memory_budget = stats_config.get('CACHE_STATS_TTL_MEMORY_BUDGET')
+        self.ttl_min_samples = stats_config.get('CACHE_STATS_TTL_MIN_SAMPLES', 10)
+
+        self.async_workers = stats_config.get('CACHE_STATS_ASYNC_WORKERS', 4)
+        self.overhead_sample = stats_config.get('CACHE_STATS_OVERHEAD_SAMPLE', 100)
+        self.delete_chunk_size = stats_config.get(
+            'CACHE_STATS_DELETE_CHUNK_SIZE', 100)
+        self.max_snapshots = stats_config.get('CACHE_STATS_SNAPSHOTS', 10)
+        self.snapshot_keys = stats_config.get('CACHE_STATS_SNAPSHOT_KEYS', 1000)
+        self.key_index = stats_config.get('CACHE_STATS_KEY_INDEX', False)
+        self._index = KeyIndex(keys=self.key_index)
+        self.key_length_limit = stats_config.get(
+            'CACHE_STATS_KEY_LENGTH_LIMIT', 250)
+        self.version_ttl = stats_config.get('CACHE_STATS_VERSION_TTL', 5)
+
+        self.warmup_calls = stats_config.get('CACHE_STATS_WARMUP_CALLS', 100)
+        self.warmup_workers = stats_config.get('CACHE_STATS_WARMUP_WORKERS', 4)
+        self.warmup_rate = stats_config.get('CACHE_STATS_WARMUP_RATE')
+        self.redundant_writes = stats_config.get('CACHE_STATS_REDUNDANT_WRITES')
+        self.single_writer = stats_config.get('CACHE_STATS_SINGLE_WRITER', False)
+        if self.redundant_writes == 'skip' and not self.single_writer:
+            logger.warning("CACHE_STATS_REDUNDANT_WRITES = 'skip' needs "
+                           "CACHE_STATS_SINGLE_WRITER, touching instead.")
+            self.redundant_writes = 'touch'
+        self.write_fingerprints = bool(
+            stats_config.get('CACHE_STATS_WRITE_FINGERPRINTS', False) or
+            self.redundant_writes)
+
+        codec = stats_config.get('CACHE_STATS_CODEC')
+        if codec is True:
+            self.codec = ValueCodec()
+        elif isinstance(codec, dict):
+            self.codec = ValueCodec(**codec)
+        elif codec is not None:
+            self.codec = codec
+
+        namespaces = stats_config.get('CACHE_STATS_NAMESPACES') or {}
+        if not isinstance(namespaces, dict):
+            namespaces = dict((prefix, prefix) for prefix in namespaces)
+        self.namespaces = dict((namespaces[name], name) for name in namespaces)
+        self._namespace_totals = dict((name, TotalsData()) for name in namespaces)
+        self._prefix_totals = [
+            (prefix, (self._totals,
+                      self._namespace_totals[self.namespaces[prefix]]))
+            for prefix in sorted(self.namespaces, key=len, reverse=True)]
+        for data in list(self._log.values()):
+            data.totals = None
+
+        # Installed as the backend, so every path to it hashes keys, even
+        # with stats disabled.
+        hash_keys = stats_config.get('CACHE_STATS_HASH_KEYS', False)
+        backend = app.extensions['cache'][self]
+        self.hashed_keys = None
+        if hash_keys is True:
+            self.hashed_keys = HashedKeys(backend)
+        elif isinstance(hash_keys, dict):
+            self.hashed_keys = HashedKeys(backend, **hash_keys)
+        elif hash_keys:
+            self.hashed_keys = HashedKeys(backend, min_length=hash_keys)
+        if self.hashed_keys is not None:
+            app.extensions['cache'][self] = self.hashed_keys
+
+        self.enabled = stats_config.get('CACHE_STATS_ENABLED', True)
+        if not self.enabled:
+            if self.codec is None:
+                self.__bind_backend(app.extensions['cache'][self])
+                return
+            logger.warning("CACHE_STATS_ENABLED is ignored with "
+                           "CACHE_STATS_CODEC set, values have to be decoded.")
+
+        breaker = stats_config.get('CACHE_STATS_BREAKER')
+        if breaker is True:
+            self.breaker = CircuitBreaker()
+        elif isinstance(breaker, dict):
+            self.breaker = CircuitBreaker(**breaker)
+        elif breaker is not None:
+            self.breaker = breaker
+
+        exporter = stats_config.get('CACHE_STATS_STATSD')
+        if exporter is True:
+            self.exporter = StatsdExporter()
+        elif isinstance(exporter, dict):
+            self.exporter = StatsdExporter(**exporter)
+        elif exporter is not None:
+            self.exporter = exporter
+        if self.exporter is not None:
+            if self.exporter.gauges is None:
+                self.exporter.gauges = self._gauges
+            self.exporter.start()
+
+        self.warmup_file = stats_config.get('CACHE_STATS_WARMUP_FILE')
+        if self.warmup_file is not None and self._calls is None:
+            self._calls = OrderedDict()
+            atexit.register(self._save_at_exit)
+
+        if self._teardown_request not in app.teardown_request_funcs.get(None, ()):
+            app.teardown_request(self._teardown_request)
+
+        # Only hooked up when asked for, so disabled costs nothing per request.
+        if (stats_config.get('CACHE_STATS_SERVER_TIMING', False) and
+                self._add_server_timing not in app.after_request_funcs.get(None, ())):
+            app.after_request(self._add_server_timing)
+
+    def __bind_backend(self, backend):
+        """Replaces the proxy methods with the backend's own, and the hooks
+           the decorators and async methods record stats through with no-ops,
+           so that nothing is recorded and a call costs what it does on the
+           backend. get and get_many only map negative results to ``None``.
+        """
+        self.write_fingerprints = False
+        self.breaker = None
+        self._cache_etags = False
+        for name in ('delete', 'delete_many'):
+            setattr(self, name, getattr(backend, name))
+        self.get = _without_negative(backend.get)
+        self.get_many = _without_negatives(backend.get_many)
+        for name in ('set', 'add', 'set_many'):
+            setattr(self, name, _without_tags(getattr(backend, name)))
+        self.__get = backend.get
+        self.__get_many = backend.get_many
+        self._record_get = self._record_get_many = _unrecorded
+        for name in ('_record_set', '_record_set_many', '_record_delete',
+                     '_record_recompute', '_record_key_make', '_record_call',
+                     '_set_group'):
+            setattr(self, name, _noop)
+
+    def key_group(self, key):
+        """Returns the pattern shared by related keys, e.g. ``user/*`` for
+           ``user/1`` and ``user/2``.
+        """
+        return _key_group_re.sub('*', key)
+
     def __add_log(self, key, hot=False, cold=False, hit=False, miss=False,
-                  size=None, access_time=None):
-        if key in self._log:
-            data = self._log[key]
-        else:
-            data = LogData()
-            self._log[key] = data
+                  negative_hit=False, size=None, access_time=None,
+                  written=False, timeout=None):
+        data = self.__log_data(key)
+        live = data.set_time is not None
+        old_size = data.size
 
         if hot:
             data.hot = True
@@ -50,75 +718,812 @@ class Cache(FlaskCache):
             data.hit += 1
         if miss:
             data.miss += 1
+        if negative_hit:
+            data.negative_hit += 1
         if size:
             data.size = size
         if access_time:
             data.access_time = access_time
 
-    def get(self, *args, **kwargs):
-        "Proxy function for internal cache object."
+        if written:
+            self.__add_ttl_log(data, written=True, timeout=timeout, size=size)
+        elif hit or negative_hit or miss:
+            self.__add_ttl_log(data, hit=not miss)
+        elif cold:
+            # Deleted.
+            data.set_time = None
+
+        if (data.set_time is not None) != live:
+            if live:
+                data.died = self._snapshot_id
+                self._live_keys -= 1
+            else:
+                data.born = self._snapshot_id
+                self._live_keys += 1
+
+        if access_time:
+            bucket = bisect.bisect_left(LATENCY_BUCKETS, access_time)
+        for totals in data.totals or self.__totals(key, data):
+            if hit:
+                totals.hit += 1
+            elif negative_hit:
+                totals.negative_hit += 1
+            elif miss:
+                totals.miss += 1
+            elif written:
+                totals.writes += 1
+            elif cold:
+                totals.deletes += 1
+            if access_time:
+                totals.accesses += 1
+                totals.access_time += access_time
+                totals.latency[bucket] += 1
+            if written:
+                totals.written += size or 0
+                totals.size += (size or 0) - (old_size if live else 0)
+            elif (miss or cold) and live:
+                totals.size -= old_size
+
+        changes = self._changes
+        if changes is not None:
+            changes.touch(key)
+
+        exporter = self.exporter
+        if exporter is not None:
+            if hit:
+                exporter.incr(data.group, 'hit')
+            elif negative_hit:
+                exporter.incr(data.group, 'negative_hit')
+            elif miss:
+                exporter.incr(data.group, 'miss')
+            elif written:
+                exporter.incr(data.group, 'write')
+            elif cold:
+                exporter.incr(data.group, 'delete')
+            if access_time:
+                exporter.timing(data.group, 'access_time', access_time)
+
+    def __totals(self, key, data):
+        "Looks up the totals ``key`` counts towards and keeps them in ``data``."
+        totals = (self._totals,)
+        # The longest prefix of the key or its group wins, memoized keys only
+        # share the function name in their group.
+        for prefix, prefix_totals in self._prefix_totals:
+            if key.startswith(prefix) or data.group.startswith(prefix):
+                totals = prefix_totals
+                break
+        data.totals = totals
+        return totals
+
+    def _gauges(self):
+        "Gauges the StatsD exporter sends with every flush."
+        gauges = dict(keys=len(self._log), indexed_keys=len(self._index))
+        if self.breaker is not None:
+            gauges['breaker_open'] = int(self.breaker.state != CLOSED)
+        return gauges
+
+    def __log_data(self, key, group=None):
+        if key in self._log:
+            data = self._log[key]
+            if group is not None and group != data.group:
+                data.group = group
+                data.totals = None
+        else:
+            new = LogData(group=group or self.key_group(key))
+            data = self._log.setdefault(key, new)
+            if data is new:
+                self._log_keys.append(key)
+                self.__add_key_log(key, new.group)
+        return data
+
+    def __key_data(self, group):
+        if group in self._key_log:
+            return self._key_log[group]
+        key_data = KeyData()
+        self._key_log[group] = key_data
+        return key_data
+
+    def __add_key_log(self, key, group):
+        "Records the length of a key seen for the first time."
+        key_data = self.__key_data(group)
+        length = key_length(key)
+        key_data.keys += 1
+        key_data.length += length
+        key_data.max_length = max(key_data.max_length, length)
+        if length > self.key_length_limit:
+            key_data.long_keys += 1
+        if self.hashed_keys is not None and self.hashed_keys.hashes(length):
+            key_data.hashed += 1
+
+    def _record_key_make(self, key, make_time, keys=1):
+        """Records that a decorator spent ``make_time`` ms building ``keys``
+           keys of the key group of ``key``.
+        """
+        key_data = self.__key_data(self.__log_data(key).group)
+        key_data.makes += keys
+        key_data.make_time += make_time
+
+    def _key_make_time(self, start_time, version_time):
+        """Returns the ms since ``start_time`` less the version round trips
+           made on this thread since it was ``version_time``.
+        """
+        return ((time.time() - start_time) * 1000 -
+                (self._sample.version_time - version_time))
+
+    def _set_group(self, key, group):
+        "Puts ``key`` in key ``group`` rather than the one key_group picks."
+        self.__log_data(key, group)
+
+    def __ttl_data(self, group):
+        if group in self._ttl_log:
+            return self._ttl_log[group]
+        ttl_data = TTLData()
+        self._ttl_log[group] = ttl_data
+        return ttl_data
+
+    def _record_recompute(self, key, recompute_time):
+        "Records that a decorator spent ``recompute_time`` ms producing a value."
+        ttl_data = self.__ttl_data(self.__log_data(key).group)
+        ttl_data.recomputes += 1
+        ttl_data.recompute_time += recompute_time
+
+    def __add_ttl_log(self, data, written=False, hit=False, timeout=None,
+                      size=None):
+        ttl_data = self.__ttl_data(data.group)
+
+        now = time.time()
+        if not written:
+            ttl_data.reads += 1
+            if data.last_access is not None:
+                ttl_data.intervals += 1
+                ttl_data.interval += now - data.last_access
+            data.last_access = now
+
+        if written:
+            if data.expired(now) and not data.read:
+                ttl_data.wasted_writes += 1
+            if timeout is None:
+                timeout = self.default_timeout
+            data.set_time = now
+            data.timeout = timeout or None
+            data.read = False
+            ttl_data.writes += 1
+            ttl_data.timeout += timeout or 0
+            ttl_data.size += size or 0
+        elif hit:
+            if data.set_time is None:
+                return
+            age = now - data.set_time
+            ttl_data.hits += 1
+            ttl_data.age += age
+            if not data.read:
+                data.read = True
+                ttl_data.first_hits += 1
+                ttl_data.time_to_first_hit += age
+        elif data.set_time is None:
+            ttl_data.cold_misses += 1
+        else:
+            if data.expired(now):
+                ttl_data.expired_misses += 1
+                if not data.read:
+                    ttl_data.wasted_writes += 1
+            else:
+                ttl_data.evicted_misses += 1
+            data.set_time = None
+
+    def __codec_data(self, key):
+        group = self.__log_data(key).group
+        if group in self._codec_log:
+            return self._codec_log[group]
+        data = CodecData()
+        self._codec_log[group] = data
+        return data
+
+    def __encode(self, key, value):
         start_time = time.time()
-        retval = self.cache.get(*args, **kwargs)
-        end_time = (time.time() - start_time) * 1000
-        if retval:
-            size = getsizeof(retval, 0) / 1024.0
-            self.__add_log(args[0], hot=True, hit=True, size=size, access_time=end_time)
+        value, size = self.codec.encode(value)
+        data = self.__codec_data(key)
+        data.encode_time += (time.time() - start_time) * 1000
+        data.encoded += 1
+        data.raw_size += size
+        data.stored_size += len(value)
+        return value
+
+    def __decode(self, key, value):
+        if value is None:
+            return value
+        start_time = time.time()
+        value = self.codec.decode(value)
+        data = self.__codec_data(key)
+        data.decode_time += (time.time() - start_time) * 1000
+        data.decoded += 1
+        return value
+
+    def __add_request_log(self, key=None, hit=0, miss=0, access_time=0):
+        """Attributes one backend round trip to the current request."""
+        sample = self._sample
+        if sample.backend_time is not None:
+            sample.backend_time += access_time
+
+        ctx = _request_ctx_stack.top
+        if ctx is None:
+            return
+
+        data = getattr(ctx, self._request_attr, None)
+        if data is None:
+            data = RequestData()
+            setattr(ctx, self._request_attr, data)
+
+        data.round_trips += 1
+        data.hit += hit
+        data.miss += miss
+        data.access_time += access_time
+        if key is not None:
+            data.keys[self.__log_data(key).group] += 1
+
+    def _record_overhead(self, name, call_time, backend_time):
+        if name in self._overhead_log:
+            data = self._overhead_log[name]
+        else:
+            data = OverheadData()
+            self._overhead_log[name] = data
+        data.samples += 1
+        data.time += call_time
+        data.backend_time += backend_time
+
+    def _add_server_timing(self, response):
+        data = getattr(_request_ctx_stack.top, self._request_attr, None)
+        if data is not None:
+            response.headers.add('Server-Timing', data.server_timing())
+        return response
+
+    def _teardown_request(self, exc=None):
+        ctx = _request_ctx_stack.top
+        data = getattr(ctx, self._request_attr, None)
+        if data is None:
+            return
+
+        endpoint = ctx.request.endpoint
+        if self.request_log:
+            logger.info('cache endpoint=%s round_trips=%d hit=%d miss=%d '
+                        'access_time=%.3fms', endpoint, data.round_trips,
+                        data.hit, data.miss, data.access_time,
+                        extra={'cache_stats': dict(data.data(), endpoint=endpoint)})
+
+        if endpoint is None:
+            return
+
+        if endpoint in self._endpoints:
+            endpoint_data = self._endpoints[endpoint]
         else:
-            self.__add_log(args[0], cold=True, miss=True, access_time=end_time)
+            endpoint_data = EndpointData()
+            self._endpoints[endpoint] = endpoint_data
+
+        endpoint_data.requests += 1
+        endpoint_data.round_trips += data.round_trips
+        endpoint_data.max_round_trips = max(endpoint_data.max_round_trips,
+                                            data.round_trips)
+        endpoint_data.access_time += data.access_time
+        endpoint_data.not_modified += data.not_modified
+        endpoint_data.bytes_saved += data.bytes_saved
+        if data.round_trips > self.round_trip_threshold:
+            endpoint_data.flagged += 1
+            for pattern, count in data.keys.items():
+                if count > 1:
+                    endpoint_data.patterns[pattern] += count
+
+    def __backend(self, name, *args, **kwargs):
+        "Calls backend method ``name`` through the circuit breaker."
+        breaker = self.breaker
+        if breaker is None:
+            return getattr(self.cache, name)(*args, **kwargs)
+        if not breaker.allow(name):
+            return bypass_value(name, args)
+
+        start_time = time.time()
+        try:
+            retval = getattr(self.cache, name)(*args, **kwargs)
+        except Exception:
+            breaker.record(name, (time.time() - start_time) * 1000, error=True)
+            raise
+        breaker.record(name, (time.time() - start_time) * 1000)
         return retval
 
-    def set(self, *args, **kwargs):
-        "Proxy function for internal cache object."
-        retval = self.cache.set(*args, **kwargs)
-        print(retval)
+    def _check_write(self, key, stored, timeout=None):
+        """Fingerprints the value about to be stored under ``key``. Returns
+           ``(action, fingerprint)``, with action ``'skip'`` or ``'touch'``
+           when it matches the live value and CACHE_STATS_REDUNDANT_WRITES
+           asks to avoid such writes, otherwise ``None`` and the value has to
+           be written. Only a write with the live value's timeout is skipped.
+           The fingerprint is kept by _record_set once the write succeeded.
+        """
+        if self.codec is not None and isinstance(stored, bytes):
+            blob = stored
+        else:
+            try:
+                blob = pickle.dumps(stored, pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                self.__log_data(key).fingerprint = None
+                return None, None
+        fingerprint = hashlib.md5(blob).digest()[:8]
+
+        data = self.__log_data(key)
+        if data.group in self._write_log:
+            write_data = self._write_log[data.group]
+        else:
+            write_data = WriteData()
+            self._write_log[data.group] = write_data
+
+        write_data.writes += 1
+        action = None
+        if (data.fingerprint == fingerprint and data.set_time is not None and
+                not data.expired(time.time())):
+            write_data.redundant += 1
+            if timeout is None:
+                timeout = self.default_timeout
+            if (self.redundant_writes == 'skip' and
+                    (timeout or None) == data.timeout):
+                action = 'skip'
+                write_data.skipped += 1
+            elif self.redundant_writes == 'touch' and hasattr(self.cache, 'touch'):
+                action = 'touch'
+                write_data.touched += 1
+
+        if action is None:
+            # Unknown until the write succeeds.
+            data.fingerprint = None
+            write_data.bytes_written += len(blob)
+        else:
+            write_data.bytes_saved += len(blob)
+        return action, fingerprint
+
+    def __touch(self, key, value, stored, timeout, tags=(), fingerprint=None):
+        """Refreshes the timeout of an unchanged value, or writes ``stored``
+           if the backend no longer has it.
+        """
+        start_time = time.time()
+        retval = self.__backend('touch', key, timeout)
+        if not retval:
+            retval = self.__backend('set', key, stored, timeout)
+        self._record_set(key, value, retval, (time.time() - start_time) * 1000,
+                         timeout, tags, fingerprint)
+        return retval
+
+    def _encode_args(self, args):
+        "Encodes the value in ``(key, value, ...)`` proxy arguments."
+        if self.codec is None:
+            return args
+        return (args[0], self.__encode(args[0], args[1])) + args[2:]
+
+    def _encode_mapping(self, args):
+        "Encodes the values in ``(mapping, ...)`` proxy arguments."
+        if self.codec is None:
+            return args
+        mapping = args[0]
+        encoded = dict((key, self.__encode(key, mapping[key])) for key in mapping)
+        return (encoded,) + args[1:]
+
+    def _record_get(self, key, retval, access_time):
+        "Decodes and logs the result of a backend get."
+        if self.codec is not None:
+            retval = self.__decode(key, retval)
+        if retval is None:
+            self._index.discard(key)
+            self.__add_log(key, cold=True, miss=True, access_time=access_time)
+            self.__add_request_log(key, miss=1, access_time=access_time)
+        elif retval is NEGATIVE:
+            self.__add_log(key, hot=True, negative_hit=True, access_time=access_time)
+            self.__add_request_log(key, hit=1, access_time=access_time)
+        else:
+            size = getsizeof(retval, 0) / 1024.0
+            self.__add_log(key, hot=True, hit=True, size=size, access_time=access_time)
+            self.__add_request_log(key, hit=1, access_time=access_time)
+        return retval
+
+    def _record_set(self, key, value, retval, access_time, timeout=None,
+                    tags=(), fingerprint=None):
+        """Logs a backend write of ``value``. ``fingerprint`` is that of the
+           written value as returned by _check_write, ``None`` for writes
+           that may not have stored ``value`` such as ``add``.
+        """
+        self.__add_request_log(access_time=access_time)
+        if retval:
+            self._index.add(key, tags)
+            size = getsizeof(value, 0) / 1024.0
+            self.__add_log(key, hot=True, size=size, written=True,
+                           timeout=timeout)
+        if self.write_fingerprints:
+            # A failed or bypassed write leaves the backend value unknown.
+            self.__log_data(key).fingerprint = fingerprint if retval else None
+
+    def _etag_keys(self, keys):
+        "Returns the ETag keys to delete along with ``keys``."
+        prefixes = self._etag_prefixes
+        written = self._etag_written
+        if not prefixes and not written:
+            return []
+        etag_keys = []
+        for key in keys:
+            if key in written:
+                written.discard(key)
+            elif key.endswith(ETAG_SUFFIX) or not key.startswith(prefixes):
+                continue
+            etag_keys.append(key + ETAG_SUFFIX)
+        return etag_keys
+
+    def __delete_etags(self, etag_keys):
+        "Deletes the ETags of deleted views as part of the delete call."
+        start_time = time.time()
+        retval = self.__backend('delete_many', *etag_keys)
+        self._record_delete(etag_keys, retval, (time.time() - start_time) * 1000)
+
+    def _record_delete(self, keys, retval, access_time):
+        self.__add_request_log(access_time=access_time)
+        # Whether or not the backend had them, the keys are gone now.
+        for key in keys:
+            self._index.discard(key)
         if retval:
-            size = getsizeof(args[1], 0) / 1024.0
-            self.__add_log(args[0], hot=True, size=size)
+            for key in keys:
+                self.__add_log(key, cold=True)
+
+    def _record_get_many(self, keys, retval, access_time):
+        """Decodes and logs the result of a backend get_many. Negative results
+           are left as ``NEGATIVE``.
+        """
+        retval = list(retval)
+        if self.codec is not None:
+            retval = [self.__decode(key, value) for key, value in zip(keys, retval)]
+        hits = 0
+        for idx, key in enumerate(keys):
+            value = retval[idx]
+            if value is None:
+                self._index.discard(key)
+                self.__add_log(key, cold=True, miss=True)
+            elif value is NEGATIVE:
+                hits += 1
+                self.__add_log(key, hot=True, negative_hit=True)
+            else:
+                hits += 1
+                size = getsizeof(value, 0) / 1024.0
+                self.__add_log(key, hot=True, hit=True, size=size)
+        self.__add_request_log(hit=hits, miss=len(keys) - hits,
+                               access_time=access_time)
         return retval
 
-    def add(self, *args, **kwargs):
-        "Proxy function for internal cache object."
-        retval = self.cache.add(*args, **kwargs)
+    def _record_set_many(self, mapping, retval, access_time, timeout=None,
+                         tags=(), fingerprints=None):
+        "Logs a backend set_many, with ``fingerprints`` by key as _record_set."
+        self.__add_request_log(access_time=access_time)
         if retval:
-            size = getsizeof(args[1], 0) / 1024.0
-            self.__add_log(args[0], hot=True, size=size)
+            for key in mapping:
+                self._index.add(key, tags)
+                val = mapping[key]
+                size = getsizeof(val, 0) / 1024.0
+                self.__add_log(key, hot=True, size=size, written=True,
+                               timeout=timeout)
+        if self.write_fingerprints:
+            for key in mapping:
+                self.__log_data(key).fingerprint = (
+                    (fingerprints or {}).get(key) if retval else None)
+
+    @_sampled('get')
+    def __get(self, *args, **kwargs):
+        """Like get, but returns ``NEGATIVE`` for cached "no result" markers
+           rather than ``None``.
+        """
+        start_time = time.time()
+        retval = self.__backend('get', *args, **kwargs)
+        return self._record_get(args[0], retval, (time.time() - start_time) * 1000)
+
+    def get(self, *args, **kwargs):
+        "Proxy function for internal cache object."
+        retval = self.__get(*args, **kwargs)
+        if retval is NEGATIVE:
+            return None
         return retval
 
+    @_sampled('set')
+    def set(self, *args, **kwargs):
+        """Proxy function for internal cache object. ``tags`` are indexed for
+           :meth:`delete_by_tag` rather than passed on.
+        """
+        tags = kwargs.pop('tags', ())
+        value = args[1]
+        args = self._encode_args(args)
+        timeout = timeout_arg(args, kwargs, 2)
+        fingerprint = None
+        if self.write_fingerprints:
+            action, fingerprint = self._check_write(args[0], args[1], timeout)
+            if action == 'skip':
+                self._index.add(args[0], tags)
+                return True
+            if action == 'touch':
+                return self.__touch(args[0], value, args[1], timeout, tags,
+                                    fingerprint)
+        start_time = time.time()
+        retval = self.__backend('set', *args, **kwargs)
+        self._record_set(args[0], value, retval, (time.time() - start_time) * 1000,
+                         timeout, tags, fingerprint)
+        return retval
+
+    @_sampled('add')
+    def add(self, *args, **kwargs):
+        "Proxy function for internal cache object. Takes ``tags`` as set does."
+        tags = kwargs.pop('tags', ())
+        value = args[1]
+        args = self._encode_args(args)
+        start_time = time.time()
+        retval = self.__backend('add', *args, **kwargs)
+        self._record_set(args[0], value, retval, (time.time() - start_time) * 1000,
+                         timeout_arg(args, kwargs, 2), tags)
+        return retval
+
+    @_sampled('delete')
     def delete(self, *args, **kwargs):
         "Proxy function for internal cache object."
-        retval = self.cache.delete(*args, **kwargs)
-        if retval:
-            self.__add_log(args[0], cold=True)
+        start_time = time.time()
+        retval = self.__backend('delete', *args, **kwargs)
+        self._record_delete(args[:1], retval, (time.time() - start_time) * 1000)
+        etag_keys = self._etag_keys(args[:1])
+        if etag_keys:
+            self.__delete_etags(etag_keys)
         return retval
 
+    @_sampled('get_many')
+    def __get_many(self, *args, **kwargs):
+        "Like get_many, but leaves negative results as ``NEGATIVE``."
+        start_time = time.time()
+        retval = self.__backend('get_many', *args, **kwargs)
+        return self._record_get_many(args, retval, (time.time() - start_time) * 1000)
+
     def get_many(self, *args, **kwargs):
         "Proxy function for internal cache object."
-        retval = self.cache.get_many(*args, **kwargs)
-        retval = list(retval)
-        for idx, key in enumerate(args):
-            if retval[idx]:
-                size = getsizeof(retval, 0) / 1024.0
-                self.__add_log(key, hot=True, hit=True, size=size)
-            else:
-                self.__add_log(key, cold=True, miss=True)
-        return retval
+        retval = self.__get_many(*args, **kwargs)
+        return [None if value is NEGATIVE else value for value in retval]
 
+    @_sampled('delete_many')
     def delete_many(self, *args, **kwargs):
-        retval = self.cache.delete_many(*args, **kwargs)
-        if retval:
-            for key in args:
-                self.__add_log(key, cold=True)
+        start_time = time.time()
+        retval = self.__backend('delete_many', *args, **kwargs)
+        self._record_delete(args, retval, (time.time() - start_time) * 1000)
+        etag_keys = self._etag_keys(args)
+        if etag_keys:
+            self.__delete_etags(etag_keys)
         return retval
 
+    @_sampled('set_many')
     def set_many(self, *args, **kwargs):
-        retval = self.cache.set_many(*args, **kwargs)
-        if retval:
+        "Takes ``tags`` as set does, applying them to every key."
+        tags = kwargs.pop('tags', ())
+        mapping = args[0]
+        args = self._encode_mapping(args)
+        timeout = timeout_arg(args, kwargs, 1)
+        fingerprints = None
+        if self.write_fingerprints:
+            changed = {}
+            fingerprints = {}
             for key in args[0]:
-                val = args[0][key]
-                size = getsizeof(val, 0) / 1024.0
-                self.__add_log(key, hot=True, size=size)
+                action, fingerprint = self._check_write(key, args[0][key],
+                                                        timeout)
+                if action is None:
+                    changed[key] = args[0][key]
+                    fingerprints[key] = fingerprint
+                elif action == 'touch':
+                    self.__touch(key, mapping[key], args[0][key], timeout, tags,
+                                 fingerprint)
+                else:
+                    self._index.add(key, tags)
+            if not changed:
+                return True
+            args = (changed,) + args[1:]
+            mapping = dict((key, mapping[key]) for key in changed)
+        start_time = time.time()
+        retval = self.__backend('set_many', *args, **kwargs)
+        self._record_set_many(mapping, retval, (time.time() - start_time) * 1000,
+                              timeout, tags, fingerprints)
         return retval
 
+    def clear(self):
+        self._index.clear()
+        self._versions = OrderedDict()
+        return super(Cache, self).clear()
+
+    def delete_by_tag(self, tag):
+        """Deletes every live key written with ``tag``, in chunks of
+           CACHE_STATS_DELETE_CHUNK_SIZE keys. Returns the number of keys.
+        """
+        return self.__delete_keys('tag', tag, self._index.tagged(tag))
+
+    def delete_by_prefix(self, prefix):
+        """Deletes every live key starting with ``prefix``, as delete_by_tag.
+           Needs CACHE_STATS_KEY_INDEX.
+        """
+        if not self.key_index:
+            raise RuntimeError('delete_by_prefix needs CACHE_STATS_KEY_INDEX')
+        return self.__delete_keys('prefix', prefix, self._index.prefixed(prefix))
+
+    def __delete_keys(self, kind, name, keys):
+        start_time = time.time()
+        chunk_size = self.delete_chunk_size
+        round_trips = 0
+        for idx in range(0, len(keys), chunk_size):
+            self.delete_many(*keys[idx:idx + chunk_size])
+            round_trips += 1
+
+        group = '{} {}'.format(kind, self.key_group(name))
+        if group in self._invalidation_log:
+            data = self._invalidation_log[group]
+        else:
+            data = InvalidationData()
+            self._invalidation_log[group] = data
+        data.invalidations += 1
+        data.keys += len(keys)
+        data.max_keys = max(data.max_keys, len(keys))
+        data.round_trips += round_trips
+        data.time += (time.time() - start_time) * 1000
+        return len(keys)
+
+    def aget(self, *args, **kwargs):
+        "Awaitable version of get. See :mod:`flask_cache_stats.aio`."
+        from . import aio
+        return aio.aget(self, *args, **kwargs)
+
+    def aset(self, *args, **kwargs):
+        "Awaitable version of set."
+        from . import aio
+        return aio.aset(self, *args, **kwargs)
+
+    def aadd(self, *args, **kwargs):
+        "Awaitable version of add."
+        from . import aio
+        return aio.aadd(self, *args, **kwargs)
+
+    def adelete(self, *args, **kwargs):
+        "Awaitable version of delete."
+        from . import aio
+        return aio.adelete(self, *args, **kwargs)
+
+    def aget_many(self, *args, **kwargs):
+        "Awaitable version of get_many."
+        from . import aio
+        return aio.aget_many(self, *args, **kwargs)
+
+    def aset_many(self, *args, **kwargs):
+        "Awaitable version of set_many."
+        from . import aio
+        return aio.aset_many(self, *args, **kwargs)
+
+    def adelete_many(self, *args, **kwargs):
+        "Awaitable version of delete_many."
+        from . import aio
+        return aio.adelete_many(self, *args, **kwargs)
+
+    def _record_call(self, cache_key, name, args, kwargs, path=None):
+        """Remembers how to recompute ``cache_key`` for warm-up. Arguments
+           are copied as plain JSON data, so no references to them are kept;
+           calls whose arguments are not JSON-serializable, e.g. memoized
+           methods, are recorded as ``None`` and not saved.
+        """
+        if self._calls is None:
+            return
+        with self._calls_lock:
+            call = self._calls.pop(cache_key, False)
+            if call is not False:
+                self._calls[cache_key] = call
+                return
+        try:
+            args, kwargs = json.loads(json.dumps([list(args), kwargs]))
+            call = (name, args, kwargs, path)
+        except (TypeError, ValueError):
+            call = None
+        with self._calls_lock:
+            self._calls[cache_key] = call
+            while len(self._calls) > self.warmup_calls * CALLS_PER_SAVED:
+                self._calls.popitem(last=False)
+
+    def hot_calls(self, limit=None):
+        """Returns the recorded memoize/cached calls, the ones with the most
+           hits times recompute time first.
+        """
+        with self._calls_lock:
+            recorded = list((self._calls or {}).items())
+        calls = []
+        for key, call in recorded:
+            if call is None:
+                continue
+            name, args, kwargs, path = call
+            data = self.__log_data(key)
+            ttl_data = self._ttl_log.get(data.group)
+            cost = 0
+            if ttl_data is not None:
+                cost = ttl_data.recompute_time / (ttl_data.recomputes or 1)
+            calls.append(dict(function=name, args=args, kwargs=kwargs,
+                              path=path, hits=data.hit + data.negative_hit,
+                              cost=cost))
+        calls.sort(key=lambda call: (call['hits'] * call['cost'], call['hits']),
+                   reverse=True)
+        return calls[:limit]
+
+    def save_hot_calls(self, path=None):
+        """Saves the CACHE_STATS_WARMUP_CALLS hottest calls to ``path`` or
+           CACHE_STATS_WARMUP_FILE. Returns the number saved.
+        """
+        return warmup.save(path or self.warmup_file,
+                           self.hot_calls(self.warmup_calls))
+
+    def _save_at_exit(self):
+        try:
+            self.save_hot_calls()
+        except Exception:
+            logger.exception("Could not save the calls for warm-up.")
+
+    def warm_up(self, calls=None, workers=None, rate=None):
+        """Recomputes ``calls``, by default the ones saved in
+           CACHE_STATS_WARMUP_FILE, whose values are not in the cache. Runs
+           on CACHE_STATS_WARMUP_WORKERS threads starting at most
+           CACHE_STATS_WARMUP_RATE calls a second. Only functions decorated
+           by the time it runs can be warmed up.
+        """
+        if calls is None:
+            calls = warmup.load(self.warmup_file)
+        if workers is None:
+            workers = self.warmup_workers
+        if rate is None:
+            rate = self.warmup_rate
+        app = self.app or current_app._get_current_object()
+
+        # The first call of a memoized function creates its version key on a
+        # cold cache; concurrent first calls would each create their own.
+        first, rest, seen = [], [], set()
+        for call in calls:
+            if call['function'] in seen:
+                rest.append(functools.partial(self.__warm, app, call))
+            else:
+                seen.add(call['function'])
+                first.append(functools.partial(self.__warm, app, call))
+
+        data = warmup.WarmUpData()
+        data.calls = len(calls)
+        start_time = time.time()
+        results = warmup.run(first, 1, rate) + warmup.run(rest, workers, rate)
+        data.duration = time.time() - start_time
+        for result in results:
+            setattr(data, result, getattr(data, result) + 1)
+        self._warmup_log = data
+        return data.data()
+
+    def __warm(self, app, call):
+        decorated_function = self._warm_functions.get(call['function'])
+        if decorated_function is None:
+            return warmup.SKIPPED
+
+        if call.get('path') is not None:
+            ctx = app.test_request_context(call['path'])
+        else:
+            ctx = app.app_context()
+        try:
+            with ctx:
+                return decorated_function.warm(*call.get('args', ()),
+                                               **call.get('kwargs', {}))
+        except Exception:
+            logger.exception("Warming up %s failed.", call['function'])
+            return warmup.FAILED
+
+    def __warm_key(self, cache_key, decorated_function, f, args, kwargs):
+        # Whatever survived the restart is left alone.
+        if self.__backend('get', cache_key) is not None:
+            return warmup.PRESENT
+        start_time = time.time()
+        rv = f(*args, **kwargs)
+        self._record_recompute(cache_key, (time.time() - start_time) * 1000)
+        self.__set_result(cache_key, rv, decorated_function)
+        return warmup.WARMED
+
+    def get_warmup_log(self):
+        if self._warmup_log is None:
+            return None
+        return self._warmup_log.data()
+
     def get_log(self):
         data = {}
         for key in self._log:
@@ -126,10 +1531,245 @@ class Cache(FlaskCache):
 
         return data
 
-    def cached(self, timeout=None, key_prefix='view/%s', unless=None):
+    def iter_log(self):
+        """Yields ``(key, data)`` for every key, with ``data`` as in get_log
+           plus the key group, without copying the log. Keys added meanwhile
+           are included.
+        """
+        keys = self._log_keys
+        log = self._log
+        idx = 0
+        while idx < len(keys):
+            key = keys[idx]
+            idx += 1
+            data = log[key]
+            row = data.data()
+            row['group'] = data.group
+            yield key, row
+
+    def get_totals(self):
+        """Returns the totals of the cache, with ``keys`` and the totals of
+           each of CACHE_STATS_NAMESPACES under ``namespaces``.
+        """
+        data = self._totals.data()
+        data['keys'] = len(self._log)
+        data['namespaces'] = {}
+        for name in self._namespace_totals:
+            data['namespaces'][name] = self._namespace_totals[name].data()
+
+        return data
+
+    def snapshot(self):
+        """Returns a Snapshot of the totals and the number of live keys, and
+           keeps the last CACHE_STATS_SNAPSHOTS of them for get_snapshot.
+        """
+        namespaces = {}
+        for name in self._namespace_totals:
+            namespaces[name] = self._namespace_totals[name].copy()
+        data = Snapshot(next(self._snapshot_ids), self._totals.copy(),
+                        namespaces, self._live_keys)
+        self._snapshot_id = data.id
+
+        self._snapshots[data.id] = data
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return data
+
+    def get_snapshot(self, id):
+        "Returns the kept Snapshot ``id``, or ``None``."
+        return self._snapshots.get(id)
+
+    def diff(self, start, end=None):
+        """Returns what happened between Snapshot ``start`` and ``end``, a
+           new snapshot if not given, see ``snapshot.diff``. Adds the first
+           CACHE_STATS_SNAPSHOT_KEYS keys, sorted, whose last change in
+           between made them live, under ``new_keys``, and stopped the ones
+           live at ``start`` being live, under ``evicted_keys``, and how many
+           there were in all.
+        """
+        if end is None:
+            end = self.snapshot()
+        data = diff_snapshots(start, end)
+        new_keys, evicted_keys = [], []
+        keys = self._log_keys
+        idx = 0
+        # Without copying the log, as iter_log.
+        while idx < len(keys):
+            key = keys[idx]
+            idx += 1
+            log_data = self._log[key]
+            if log_data.set_time is not None:
+                if (log_data.born is not None and
+                        start.id <= log_data.born < end.id and
+                        (log_data.died is None or log_data.died < start.id)):
+                    new_keys.append(key)
+            elif (log_data.died is not None and
+                  start.id <= log_data.died < end.id and
+                  log_data.born < start.id):
+                evicted_keys.append(key)
+        data.update(new_keys=sorted(new_keys)[:self.snapshot_keys],
+                    new_key_count=len(new_keys),
+                    evicted_keys=sorted(evicted_keys)[:self.snapshot_keys],
+                    evicted_key_count=len(evicted_keys))
+        return data
+
+    def get_log_changes(self, since=0, wait=0):
+        """Returns the rows of ``get_log`` that changed after version
+           ``since``, and the version to ask from next time, waiting up to
+           ``wait`` seconds for a change. Every row is returned, with
+           ``reset`` set, for version 0 or a version this cache never had.
+        """
+        if self._changes is None:
+            self._changes = ChangeLog()
+        changes = self._changes
+
+        reset = not 0 < since <= changes.version
+        if reset:
+            version = changes.version
+            keys = list(self._log)
+        else:
+            if wait:
+                changes.wait(since, wait)
+            version, keys = changes.since(since)
+        log = {}
+        for key in keys:
+            log[key] = self._log[key].data()
+
+        return dict(version=version, reset=reset, log=log)
+
+    def get_codec_log(self):
+        data = {}
+        for group in self._codec_log:
+            data[group] = self._codec_log[group].data()
+
+        return data
+
+    def get_invalidation_log(self):
+        data = {}
+        for group in self._invalidation_log:
+            data[group] = self._invalidation_log[group].data()
+
+        return data
+
+    def get_key_log(self):
+        data = {}
+        for group in self._key_log:
+            data[group] = self._key_log[group].data()
+
+        return data
+
+    def readable_key(self, key):
+        """Returns the key stored under ``key`` if it is the digest of a
+           recently used key, otherwise ``key``.
+        """
+        if self.hashed_keys is None:
+            return key
+        return self.hashed_keys.readable_key(key)
+
+    def get_overhead_log(self):
+        """Time spent in the proxy methods outside the backend, from the
+           sampled calls, in total and per operation.
+        """
+        total = OverheadData()
+        operations = {}
+        for name in self._overhead_log:
+            data = self._overhead_log[name]
+            total.samples += data.samples
+            total.time += data.time
+            total.backend_time += data.backend_time
+            operations[name] = data.data()
+        return dict(total.data(), calls=self._proxy_calls,
+                    sample=self.overhead_sample, operations=operations)
+
+    def get_breaker_log(self):
+        if self.breaker is None:
+            return None
+        return self.breaker.data()
+
+    def get_write_log(self):
+        data = {}
+        for group in self._write_log:
+            data[group] = self._write_log[group].data()
+
+        return data
+
+    def get_ttl_log(self):
+        # Values that expired unread but were not looked up since.
+        now = time.time()
+        pending = Counter()
+        for key in self._log:
+            data = self._log[key]
+            if not data.read and data.expired(now):
+                pending[data.group] += 1
+
+        data = {}
+        for group in self._ttl_log:
+            data[group] = self._ttl_log[group].data(pending[group])
+
+        return data
+
+    def recommend_timeouts(self, min_timeout=1, max_timeout=86400):
+        """Recommends a timeout per key group from the recorded reads, see
+           :mod:`flask_cache_stats.ttl`. Groups with fewer than
+           ``CACHE_STATS_TTL_MIN_SAMPLES`` repeated reads get ``None``.
+        """
+        keys = Counter(self._log[key].group for key in self._log)
+        profiles = {}
+        for group in self._ttl_log:
+            ttl_data = self._ttl_log[group]
+            rate = None
+            if ttl_data.intervals >= self.ttl_min_samples:
+                rate = ttl_data.rate
+            profiles[group] = ttl.Profile(
+                keys=keys[group] or 1, rate=rate,
+                cost=ttl_data.recompute_time / (ttl_data.recomputes or 1),
+                size=ttl_data.size * 1024.0 / (ttl_data.writes or 1))
+
+        timeouts = ttl.recommend(profiles, min_timeout, max_timeout,
+                                 self.ttl_target_hit_ratio,
+                                 self.ttl_memory_budget)
+        data = {}
+        for group in profiles:
+            ttl_data = self._ttl_log[group]
+            timeout = timeouts.get(group)
+            predicted = None
+            if timeout is not None:
+                timeout = int(timeout)
+                predicted = '{:.3f}'.format(ttl.hit_ratio(profiles[group].rate, timeout))
+            data[group] = dict(
+                timeout=timeout,
+                current_timeout='{:.1f}'.format(ttl_data.timeout / float(ttl_data.writes or 1)),
+                hit_ratio='{:.3f}'.format(
+                    (ttl_data.reads - ttl_data.misses) / float(ttl_data.reads or 1)),
+                predicted_hit_ratio=predicted,
+                saved_per_byte='{:.6f}'.format(profiles[group].saved_per_byte))
+
+        return data
+
+    def get_endpoint_log(self):
+        data = {}
+        for endpoint in self._endpoints:
+            data[endpoint] = self._endpoints[endpoint].data()
+
+        return data
+
+    def cached(self, timeout=None, key_prefix='view/%s', unless=None,
+               negative_timeout=None, adaptive_timeout=None, etag=False):
         """This is a copy of the flask cache version of cached. This one to one
            copy is not ideal, but a necessasity as the the decorator calls
            self.cache.get() rather than self.get().
+
+           If ``negative_timeout`` is set, a ``None`` result is cached for that
+           many seconds instead of being recomputed on every call.
+
+           If ``adaptive_timeout`` is a ``(min, max)`` tuple, values are stored
+           with the timeout recommended for their key group from the recorded
+           reads, within those bounds, once enough reads have been seen.
+
+           If ``etag`` is set, the view returns a response with an ETag, the
+           hash of its body. The ETag and the body size are cached next to
+           the view, so a request whose ``If-None-Match`` matches is answered
+           with ``304 Not Modified`` without loading the body.
         """
         def decorator(f):
             @functools.wraps(f)
@@ -138,77 +1778,634 @@ class Cache(FlaskCache):
                 if callable(unless) and unless() is True:
                     return f(*args, **kwargs)
 
+                meta = None
                 try:
+                    start_time = time.time()
                     cache_key = decorated_function.make_cache_key(*args, **kwargs)
-                    rv = self.get(cache_key)
+                    self._record_key_make(cache_key,
+                                          (time.time() - start_time) * 1000)
+                    if self._calls is not None:
+                        self._record_call(cache_key, name, args, kwargs,
+                                          request.path if has_request_context()
+                                          else None)
+                    if not etag or not self._cache_etags:
+                        rv = self.__get(cache_key)
+                    elif request.if_none_match:
+                        meta = self.__get(cache_key + ETAG_SUFFIX)
+                        if (meta is not None and
+                                request.if_none_match.contains(meta[0])):
+                            return self.__not_modified(*meta)
+                        rv = self.__get(cache_key)
+                    else:
+                        rv, meta = self.__get_many(cache_key,
+                                                   cache_key + ETAG_SUFFIX)
                 except Exception:
                     if current_app.debug:
                         raise
                     logger.exception("Exception possibly due to cache backend.")
                     return f(*args, **kwargs)
 
+                if rv is NEGATIVE:
+                    return None
                 if rv is None:
+                    start_time = time.time()
                     rv = f(*args, **kwargs)
+                    self._record_recompute(cache_key, (time.time() - start_time) * 1000)
+                    meta = None
                     try:
-                        self.set(cache_key, rv,
-                                   timeout=decorated_function.cache_timeout)
+                        if etag and self._cache_etags and rv is not None:
+                            meta = self.__etag(rv)
+                            self.set_many({cache_key: rv,
+                                           cache_key + ETAG_SUFFIX: meta},
+                                          timeout=self._effective_timeout(
+                                              cache_key, decorated_function))
+                            if callable(key_prefix):
+                                self._etag_written.add(cache_key)
+                        else:
+                            self.__set_result(cache_key, rv, decorated_function)
                     except Exception:
                         if current_app.debug:
                             raise
                         logger.exception("Exception possibly due to cache backend.")
-                        return f(*args, **kwargs)
+                if etag and rv is not None:
+                    if meta is None:
+                        meta = self.__etag(rv)
+                        if self._cache_etags:
+                            self.__set_etag(cache_key, meta, decorated_function)
+                            if callable(key_prefix):
+                                self._etag_written.add(cache_key)
+                    return self.__etag_response(rv, *meta)
                 return rv
 
-            def make_cache_key(*args, **kwargs):
-                if callable(key_prefix):
-                    cache_key = key_prefix()
-                elif '%s' in key_prefix:
-                    cache_key = key_prefix % request.path
-                else:
-                    cache_key = key_prefix
+            make_cache_key = view_key_maker(key_prefix)
 
-                return cache_key
+            def warm(*args, **kwargs):
+                cache_key = make_cache_key(*args, **kwargs)
+                return self.__warm_key(cache_key, decorated_function, f,
+                                       args, kwargs)
 
+            name = function_namespace(f)[0]
             decorated_function.uncached = f
             decorated_function.cache_timeout = timeout
+            decorated_function.negative_timeout = negative_timeout
+            decorated_function.adaptive_timeout = adaptive_timeout
             decorated_function.make_cache_key = make_cache_key
+            decorated_function.warm = warm
+            self._warm_functions[name] = decorated_function
+            if etag and not callable(key_prefix):
+                # Every key the view makes starts with this.
+                prefix = key_prefix.split('%s')[0]
+                if prefix not in self._etag_prefixes:
+                    self._etag_prefixes += (prefix,)
 
             return decorated_function
         return decorator
 
+    def __set_etag(self, cache_key, meta, decorated_function):
+        try:
+            self.set(cache_key + ETAG_SUFFIX, meta,
+                     timeout=self._effective_timeout(cache_key, decorated_function))
+        except Exception:
+            if current_app.debug:
+                raise
+            logger.exception("Exception possibly due to cache backend.")
+
+    @staticmethod
+    def __etag(rv):
+        "Returns the ``(etag, size)`` of the body of view result ``rv``."
+        body = current_app.make_response(rv).get_data()
+        return hashlib.md5(body).hexdigest(), len(body)
+
+    def __etag_response(self, rv, tag, size):
+        response = current_app.make_response(rv)
+        response.set_etag(tag)
+        response.make_conditional(request)
+        if response.status_code == 304:
+            self.__add_not_modified(size)
+        return response
+
+    def __not_modified(self, tag, size):
+        response = current_app.response_class(status=304)
+        response.set_etag(tag)
+        self.__add_not_modified(size)
+        return response
+
+    def __add_not_modified(self, size):
+        data = getattr(_request_ctx_stack.top, self._request_attr, None)
+        if data is not None:
+            data.not_modified += 1
+            data.bytes_saved += size
+
+    def _memoize_version(self, f, args=None, reset=False, delete=False,
+                         timeout=None):
+        """This is a copy of the flask cache version that keeps the versions
+           it reads and writes for CACHE_STATS_VERSION_TTL seconds, so most
+           memoized calls do not fetch them from the backend. Resets and
+           deletes replace the local copy at once; other processes see them
+           within CACHE_STATS_VERSION_TTL seconds.
+        """
+        fname, instance_fname = function_namespace(f, args=args)
+        fetch_keys = [self._memvname(fname)]
+        if instance_fname:
+            fetch_keys.append(self._memvname(instance_fname))
+        data = self.__version_data(fname)
+
+        # Only delete or reset the per-instance version or the per-function
+        # version but not both.
+        if delete:
+            data.resets += 1
+            self.__version_backend(data, 'delete_many', fetch_keys[-1])
+            with self._versions_lock:
+                self._versions.pop(fetch_keys[-1], None)
+            return fname, None
+
+        if reset:
+            breaker = self.breaker
+            if breaker is not None and breaker.state != CLOSED:
+                # Kept only here, other processes would go on using the old
+                # version.
+                raise BreakerOpen('reset')
+            data.resets += 1
+            fetch_keys = fetch_keys[-1:]
+            version_data_list = [self._memoize_make_version_hash()]
+            self.__version_backend(data, 'set_many',
+                                   dict(zip(fetch_keys, version_data_list)),
+                                   timeout=timeout)
+            self.__keep_versions(fetch_keys, version_data_list)
+            return fname, ''.join(version_data_list)
+
+        data.lookups += 1
+        now = time.time()
+        versions = self._versions
+        version_data_list = []
+        for key in fetch_keys:
+            version = versions.get(key)
+            if version is None or version[0] <= now:
+                break
+            version_data_list.append(version[1])
+        else:
+            data.local_hits += 1
+            return fname, ''.join(version_data_list)
+
+        version_data_list = list(self.__version_backend(data, 'get_many',
+                                                        *fetch_keys))
+        dirty = False
+        for idx, version in enumerate(version_data_list):
+            if version is None:
+                version_data_list[idx] = self._memoize_make_version_hash()
+                dirty = True
+
+        if dirty:
+            self.__version_backend(data, 'set_many',
+                                   dict(zip(fetch_keys, version_data_list)),
+                                   timeout=timeout)
+        self.__keep_versions(fetch_keys, version_data_list)
+        return fname, ''.join(version_data_list)
+
+    def __keep_versions(self, keys, versions):
+        if not self.version_ttl:
+            return
+        now = time.time()
+        expires = now + self.version_ttl
+        with self._versions_lock:
+            kept = self._versions
+            for key, version in zip(keys, versions):
+                kept.pop(key, None)
+                kept[key] = (expires, version)
+            # Every version is kept as long, so the stale ones come first;
+            # per-instance versions of memoized methods would pile up.
+            while kept:
+                key = next(iter(kept))
+                if kept[key][0] > now:
+                    break
+                del kept[key]
+
+    def __version_backend(self, data, name, *args, **kwargs):
+        start_time = time.time()
+        retval = self.__backend(name, *args, **kwargs)
+        access_time = (time.time() - start_time) * 1000
+        data.round_trips += 1
+        data.time += access_time
+        self._sample.version_time += access_time
+        return retval
+
+    def __version_data(self, group):
+        if group in self._version_log:
+            return self._version_log[group]
+        data = VersionData()
+        self._version_log[group] = data
+        return data
+
+    def get_version_log(self):
+        data = {}
+        for group in self._version_log:
+            data[group] = self._version_log[group].data()
+
+        return data
+
+    def memoize(self, timeout=None, make_name=None, unless=None,
+                negative_timeout=None, adaptive_timeout=None):
+        """This is a copy of the flask cache version of memoize, for the same
+           reason as cached. ``negative_timeout`` and ``adaptive_timeout``
+           behave as they do there. All keys of one function form one key
+           group.
+        """
+        def memoize(f):
+            @functools.wraps(f)
+            def decorated_function(*args, **kwargs):
+                #: bypass cache
+                if callable(unless) and unless() is True:
+                    return f(*args, **kwargs)
+
+                try:
+                    start_time = time.time()
+                    version_time = self._sample.version_time
+                    cache_key = decorated_function.make_cache_key(f, *args, **kwargs)
+                    make_time = self._key_make_time(start_time, version_time)
+                    self._set_group(cache_key, decorated_function.cache_group)
+                    self._record_key_make(cache_key, make_time)
+                    self._record_call(cache_key, decorated_function.cache_group,
+                                      args, kwargs)
+                    rv = self.__get(cache_key)
+                except Exception:
+                    if current_app.debug:
+                        raise
+                    logger.exception("Exception possibly due to cache backend.")
+                    return f(*args, **kwargs)
+
+                if rv is NEGATIVE:
+                    return None
+                if rv is None:
+                    start_time = time.time()
+                    rv = f(*args, **kwargs)
+                    self._record_recompute(cache_key, (time.time() - start_time) * 1000)
+                    try:
+                        self.__set_result(cache_key, rv, decorated_function)
+                    except Exception:
+                        if current_app.debug:
+                            raise
+                        logger.exception("Exception possibly due to cache backend.")
+                return rv
+
+            decorated_function.uncached = f
+            decorated_function.cache_timeout = timeout
+            decorated_function.negative_timeout = negative_timeout
+            decorated_function.adaptive_timeout = adaptive_timeout
+            decorated_function.cache_group = function_namespace(f)[0]
+            # The version key has to outlive the longest adaptive timeout.
+            version_timeout = decorated_function
+            if adaptive_timeout is not None:
+                version_timeout = adaptive_timeout[1]
+            decorated_function.make_cache_key = self._memoize_make_cache_key(
+                                                make_name, version_timeout)
+            decorated_function.delete_memoized = lambda: self.delete_memoized(f)
+
+            def warm(*args, **kwargs):
+                cache_key = decorated_function.make_cache_key(f, *args, **kwargs)
+                self._set_group(cache_key, decorated_function.cache_group)
+                return self.__warm_key(cache_key, decorated_function, f,
+                                       args, kwargs)
+
+            decorated_function.warm = warm
+            self._warm_functions[decorated_function.cache_group] = decorated_function
+
+            return decorated_function
+        return memoize
+
+    def memoize_many(self, timeout=None, unless=None, negative_timeout=None,
+                     adaptive_timeout=None):
+        """Memoizes a function taking a list of ids and returning a dict of
+           the values it found, by id. Each id is cached under its own key:
+           the cached ones are fetched with one get_many, the function is
+           called with the missing ids only and its results are written with
+           one set_many. ``negative_timeout`` caches ids the function returns
+           nothing for. Takes the other arguments as memoize does.
+           ``delete_memoized(f)`` invalidates every id and
+           ``delete_memoized(f, id)`` a single one.
+        """
+        def memoize_many(f):
+            @functools.wraps(f)
+            def decorated_function(ids):
+                #: bypass cache
+                if callable(unless) and unless() is True:
+                    return f(ids)
+
+                ids = list(ids)
+                try:
+                    start_time = time.time()
+                    version_time = self._sample.version_time
+                    keys = decorated_function.make_cache_keys(ids)
+                    make_time = self._key_make_time(start_time, version_time)
+                    for key in keys:
+                        self._set_group(key, decorated_function.cache_group)
+                    if keys:
+                        self._record_key_make(keys[0], make_time, len(keys))
+                    values = self.__get_many(*keys)
+                except Exception:
+                    if current_app.debug:
+                        raise
+                    logger.exception("Exception possibly due to cache backend.")
+                    return f(ids)
+
+                result = {}
+                missing = {}
+                for idx, value in enumerate(values):
+                    if value is None:
+                        missing.setdefault(ids[idx], keys[idx])
+                    elif value is not NEGATIVE:
+                        result[ids[idx]] = value
+                if not missing:
+                    return result
+
+                start_time = time.time()
+                found = f(list(missing))
+                recompute_time = (time.time() - start_time) * 1000 / len(missing)
+                mapping = {}
+                negative = {}
+                for item_id in missing:
+                    key = missing[item_id]
+                    self._record_recompute(key, recompute_time)
+                    value = found.get(item_id)
+                    if value is not None:
+                        result[item_id] = value
+                        mapping[key] = value
+                    elif negative_timeout is not None:
+                        negative[key] = NEGATIVE
+
+                try:
+                    if mapping:
+                        self.set_many(mapping, timeout=self._effective_timeout(
+                            keys[0], decorated_function))
+                    if negative:
+                        self.set_many(negative, timeout=negative_timeout)
+                except Exception:
+                    if current_app.debug:
+                        raise
+                    logger.exception("Exception possibly due to cache backend.")
+                return result
+
+            def make_cache_keys(ids):
+                fname, version_data = self._memoize_version(
+                    f, timeout=version_timeout)
+                keys = []
+                for item_id in ids:
+                    key = hashlib.md5(u'{}{!r}'.format(fname, item_id).encode('utf-8'))
+                    keys.append(base64.b64encode(key.digest())[:16].decode('utf-8') +
+                                version_data)
+                return keys
+
+            def make_cache_key(f, item_id):
+                "The key of one id, for ``delete_memoized(f, id)``."
+                return make_cache_keys([item_id])[0]
+
+            decorated_function.uncached = f
+            decorated_function.cache_timeout = timeout
+            decorated_function.negative_timeout = negative_timeout
+            decorated_function.adaptive_timeout = adaptive_timeout
+            decorated_function.cache_group = function_namespace(f)[0]
+            version_timeout = timeout
+            if adaptive_timeout is not None:
+                version_timeout = adaptive_timeout[1]
+            decorated_function.make_cache_keys = make_cache_keys
+            decorated_function.make_cache_key = make_cache_key
+            decorated_function.delete_memoized = lambda: self.delete_memoized(f)
+
+            return decorated_function
+        return memoize_many
+
+    def acached(self, timeout=None, key_prefix='view/%s', unless=None,
+                negative_timeout=None, adaptive_timeout=None):
+        "Same as cached, for ``async def`` functions."
+        from . import aio
+        return aio.cached(self, timeout, key_prefix, unless, negative_timeout,
+                          adaptive_timeout)
+
+    def amemoize(self, timeout=None, make_name=None, unless=None,
+                 negative_timeout=None, adaptive_timeout=None):
+        "Same as memoize, for ``async def`` functions."
+        from . import aio
+        return aio.memoize(self, timeout, make_name, unless, negative_timeout,
+                           adaptive_timeout)
+
+    def _effective_timeout(self, cache_key, decorated_function):
+        "Timeout for a value produced by a cached or memoized function."
+        timeout = decorated_function.cache_timeout
+        bounds = decorated_function.adaptive_timeout
+        if bounds is None:
+            return timeout
+
+        if timeout is None:
+            timeout = self.default_timeout
+        ttl_data = self._ttl_log.get(self.__log_data(cache_key).group)
+        if ttl_data is not None and ttl_data.intervals >= self.ttl_min_samples:
+            timeout = ttl.timeout_for(ttl_data.rate, self.ttl_target_hit_ratio)
+        return int(ttl.clamp(timeout, bounds[0], bounds[1]))
+
+    def __set_result(self, cache_key, rv, decorated_function):
+        if rv is None and decorated_function.negative_timeout is not None:
+            self.set(cache_key, NEGATIVE,
+                     timeout=decorated_function.negative_timeout)
+        else:
+            self.set(cache_key, rv,
+                     timeout=self._effective_timeout(cache_key, decorated_function))
+
 
 class CacheStats(Blueprint):
     def __init__(self, cache_obj, base_template="base.html",
                  enable_clear_api=False, protect_api=True,
                  cache_template="stats_view.html",
-                 url_prefix='/cache_stats'):
-        self.cache = cache_obj
+                 url_prefix='/cache_stats', max_wait=0):
+        #: Registered caches by name; the first one is shown by default.
+        self.caches = OrderedDict()
+        self.cache = None
+        if isinstance(cache_obj, dict):
+            for name in sorted(cache_obj):
+                self.add_cache(name, cache_obj[name])
+        else:
+            self.add_cache('default', cache_obj)
+        self.max_wait = max_wait
         self.base_template = base_template
         self.cache_template = cache_template
         self.api_enabled = enable_clear_api
+        self._stats_url = url_prefix
 
         super(CacheStats, self).__init__("flask_cache_stats", __name__,
                                          template_folder='templates',
                                          static_folder='static',
                                          static_url_path='')
-        self.add_url_rule(url_prefix, 'flask_cache_stats', self.stats_view)
+        self.add_url_rule(url_prefix + '/caches', 'flask_cache_caches',
+                          self.caches_view)
+        self.__add_rule('', 'flask_cache_stats', self.stats_view)
+        self.__add_rule('/ttl', 'flask_cache_ttl', self.ttl_view)
+        self.__add_rule('/overhead', 'flask_cache_overhead', self.overhead_view)
+        self.__add_rule('/changes', 'flask_cache_changes', self.changes_view)
+        self.__add_rule('/export.<format>', 'flask_cache_export',
+                        self.export_view)
+        self.__add_rule('/snapshots', 'flask_cache_snapshot',
+                        self.snapshot_view, methods=['POST'])
+        self.__add_rule('/snapshots/<int:start>', 'flask_cache_diff',
+                        self.diff_view)
         if self.api_enabled:
-            url = url_prefix + '/<key>'
             if protect_api:
+                from flask_login import login_required
                 api = login_required(self.clear_key)
             else:
                 api = self.clear_key
 
-            self.add_url_rule(url, 'flask_cache_clear_key',
-                              api, methods=['DELETE'])
+            self.__add_rule('/<key>', 'flask_cache_clear_key',
+                            api, methods=['DELETE'])
 
-    def stats_view(self):
-        return render_template(self.cache_template, log=self.cache.get_log(),
+            clear_tag, clear_prefix = self.clear_tag, self.clear_prefix
+            if protect_api:
+                clear_tag = login_required(clear_tag)
+                clear_prefix = login_required(clear_prefix)
+            self.__add_rule('/tag/<path:tag>', 'flask_cache_clear_tag',
+                            clear_tag, methods=['DELETE'])
+            self.__add_rule('/prefix/<path:prefix>', 'flask_cache_clear_prefix',
+                            clear_prefix, methods=['DELETE'])
+
+    def __add_rule(self, url, endpoint, view, **options):
+        """Adds ``url`` for the default cache, and for every registered cache
+           under ``cache/<name>``.
+        """
+        self.add_url_rule(self._stats_url + url, endpoint, view,
+                          defaults={'name': None}, **options)
+        self.add_url_rule(self._stats_url + '/cache/<name>' + url, endpoint,
+                          view, **options)
+
+    def add_cache(self, name, cache_obj):
+        "Shows the stats of ``cache_obj`` under ``name``."
+        if self.cache is None:
+            self.cache = cache_obj
+        self.caches[name] = cache_obj
+
+    def __cache(self, name):
+        if name is None:
+            return self.cache
+        if name not in self.caches:
+            abort(404)
+        return self.caches[name]
+
+    def overview(self):
+        "Returns the totals of every registered cache by name."
+        data = OrderedDict()
+        for name in self.caches:
+            data[name] = self.caches[name].get_totals()
+
+        return data
+
+    def stats_view(self, name):
+        cache = self.__cache(name)
+        if name is None:
+            name = next(iter(self.caches))
+        changes = cache.get_log_changes()
+        return render_template(self.cache_template, log=changes['log'],
+                               version=changes['version'],
+                               cache_name=name,
+                               caches=self.overview(),
+                               endpoints=cache.get_endpoint_log(),
+                               codec_log=cache.get_codec_log(),
+                               breaker=cache.get_breaker_log(),
+                               overhead=cache.get_overhead_log(),
+                               ttl_log=cache.get_ttl_log(),
+                               write_log=cache.get_write_log(),
+                               invalidation_log=cache.get_invalidation_log(),
+                               version_log=cache.get_version_log(),
+                               key_log=cache.get_key_log(),
+                               key_length_limit=cache.key_length_limit,
+                               hashed_keys=(cache.hashed_keys.data()
+                                            if cache.hashed_keys else None),
+                               warmup=cache.get_warmup_log(),
+                               ttl_recommendations=cache.recommend_timeouts(),
+                               round_trip_threshold=cache.round_trip_threshold,
                                base_template=self.base_template,
+                               max_wait=self.max_wait,
                                api_enabled=self.api_enabled)
 
-    def clear_key(self, key):
-        if self.cache.delete(key):
+    def caches_view(self):
+        return jsonify(self.overview())
+
+    def ttl_view(self, name):
+        return jsonify(self.__cache(name).recommend_timeouts())
+
+    def overhead_view(self, name):
+        return jsonify(self.__cache(name).get_overhead_log())
+
+    def changes_view(self, name):
+        since = request.args.get('since', 0, type=int)
+        wait = min(request.args.get('wait', 0, type=float), self.max_wait)
+        return jsonify(self.__cache(name).get_log_changes(since, wait))
+
+    def export_view(self, format, name):
+        cache = self.__cache(name)
+        if format not in export.FORMATS:
+            abort(404)
+        return current_app.response_class(
+            export.export(cache.iter_log(), format),
+            mimetype=export.FORMATS[format],
+            headers={'Content-Disposition':
+                     'attachment; filename=cache_stats.{}'.format(format)})
+
+    def snapshot_view(self, name):
+        return jsonify(self.__cache(name).snapshot().data())
+
+    def diff_view(self, start, name):
+        cache = self.__cache(name)
+        start = cache.get_snapshot(start)
+        end = request.args.get('end', type=int)
+        if end is not None:
+            end = cache.get_snapshot(end)
+            if end is None:
+                abort(404)
+        if start is None:
+            abort(404)
+        return jsonify(cache.diff(start, end))
+
+    def clear_key(self, key, name):
+        cache = self.__cache(name)
+        try:
+            deleted = cache.delete(cache.readable_key(key))
+        except BreakerOpen:
+            return self.__breaker_open(cache)
+        if deleted:
             return jsonify(status='success')
         else:
             abort(404)
+
+    def clear_tag(self, tag, name):
+        cache = self.__cache(name)
+        try:
+            deleted = cache.delete_by_tag(tag)
+        except BreakerOpen:
+            return self.__breaker_open(cache)
+        if deleted:
+            return jsonify(status='success', deleted=deleted)
+        else:
+            abort(404)
+
+    def clear_prefix(self, prefix, name):
+        cache = self.__cache(name)
+        if not cache.key_index:
+            abort(404)
+        try:
+            deleted = cache.delete_by_prefix(prefix)
+        except BreakerOpen:
+            return self.__breaker_open(cache)
+        if deleted:
+            return jsonify(status='success', deleted=deleted)
+        else:
+            abort(404)
+
+    def __breaker_open(self, cache):
+        """The response to a clear the open circuit breaker refused, which
+           can be retried once it closes.
+        """
+        retry_after = int(math.ceil(cache.breaker.cooldown))
+        return (jsonify(status='unavailable', reason='circuit breaker open',
+                        retry_after=retry_after),
+                503, {'Retry-After': str(retry_after)})
+        deleted = cache.delete_by_prefix(prefix)
+        if deleted:
+            return jsonify(status='success', deleted=deleted)
+        else:
+            abort(404)
@@ -0,0 +1,153 @@
+"""
+StatsD exporter for :class:`~flask_cache_stats.Cache`.
+
+Metrics are aggregated in-process per key group and sent every ``interval``
+seconds from a background thread, packed into as few UDP packets as fit, so
+cache operations never touch the network. Timers are sent as their mean
+with a ``1/count`` sample rate, which StatsD counts as ``count`` samples.
+"""
+import atexit
+import re
+import socket
+import threading
+
+_name_re = re.compile(r'[^\w.-]')
+
+
+def metric_name(*parts):
+    "Joins ``parts`` with dots, replacing characters StatsD cannot take."
+    return '.'.join(_name_re.sub('_', part) for part in parts if part)
+
+
+class StatsdExporter(object):
+    """Aggregates counters, timers and gauges and flushes them to StatsD.
+
+       :param host: StatsD host.
+       :param port: StatsD port.
+       :param prefix: Prefix of every metric name.
+       :param interval: Seconds between flushes.
+       :param max_metrics: Distinct metrics buffered between flushes; updates
+                           of further metrics are dropped and counted.
+       :param max_packet: Maximum UDP payload in bytes.
+    """
+    def __init__(self, host='127.0.0.1', port=8125, prefix='flask_cache',
+                 interval=10, max_metrics=1000, max_packet=1432):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.interval = interval
+        self.max_metrics = max_metrics
+        self.max_packet = max_packet
+        #: Called on flush for a ``{name: value}`` dict of gauges.
+        self.gauges = None
+        self.packets = 0
+        self.sent = 0
+        self.dropped = 0
+        self._counters = {}
+        self._timers = {}
+        self._lock = threading.Lock()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __buffered(self):
+        return len(self._counters) + len(self._timers)
+
+    def incr(self, group, name, value=1):
+        key = (group, name)
+        with self._lock:
+            if key in self._counters:
+                self._counters[key] += value
+            elif self.__buffered() < self.max_metrics:
+                self._counters[key] = value
+            else:
+                self.dropped += 1
+
+    def timing(self, group, name, ms):
+        key = (group, name)
+        with self._lock:
+            if key in self._timers:
+                timer = self._timers[key]
+                timer[0] += 1
+                timer[1] += ms
+            elif self.__buffered() < self.max_metrics:
+                self._timers[key] = [1, ms]
+            else:
+                self.dropped += 1
+
+    def start(self):
+        """Starts flushing every ``interval`` seconds, and once more when the
+           interpreter exits.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.__run)
+            self._thread.daemon = True
+            self._thread.start()
+            atexit.register(self.close)
+
+    def __run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def close(self):
+        "Stops the flush thread and sends what is left."
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def lines(self):
+        "Takes the aggregated metrics, as StatsD lines."
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            timers, self._timers = self._timers, {}
+            dropped, self.dropped = self.dropped, 0
+
+        lines = []
+        for group, name in counters:
+            lines.append('{}:{}|c'.format(metric_name(self.prefix, group, name),
+                                          counters[(group, name)]))
+        for group, name in timers:
+            count, total = timers[(group, name)]
+            line = '{}:{:.3f}|ms'.format(metric_name(self.prefix, group, name),
+                                         total / count)
+            if count > 1:
+                line += '|@{:.6g}'.format(1.0 / count)
+            lines.append(line)
+        if self.gauges is not None:
+            gauges = self.gauges()
+            for name in gauges:
+                lines.append('{}:{}|g'.format(metric_name(self.prefix, name),
+                                              gauges[name]))
+        if dropped:
+            lines.append('{}:{}|c'.format(
+                metric_name(self.prefix, 'exporter', 'dropped'), dropped))
+        return lines
+
+    def flush(self):
+        "Sends the aggregated metrics in packets of up to ``max_packet`` bytes."
+        packet = []
+        size = 0
+        for line in self.lines():
+            line = line.encode('utf-8')
+            if packet and size + 1 + len(line) > self.max_packet:
+                self.__send(packet)
+                packet = []
+                size = 0
+            size += len(line) + (1 if packet else 0)
+            packet.append(line)
+        if packet:
+            self.__send(packet)
+
+    def __send(self, lines):
+        try:
+            self._socket.sendto(b'\n'.join(lines), self.address)
+        except (socket.error, OSError):
+            # Reported with the next flush.
+            with self._lock:
+                self.dropped += len(lines)
+            return
+        self.packets += 1
+        self.sent += len(lines)
+
+    def data(self):
+        return dict(packets=self.packets, sent=self.sent, dropped=self.dropped)
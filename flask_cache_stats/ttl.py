@@ -0,0 +1,88 @@
+"""
+Timeout recommendations from the access patterns recorded by
+:class:`~flask_cache_stats.Cache`.
+
+Reads of a key are modelled as a Poisson process with ``rate`` reads per
+second. A value cached for ``timeout`` seconds and recomputed on the first
+read after it expires then serves ``rate * timeout`` reads per
+recomputation, i.e. has a hit ratio of ``rate * timeout / (1 + rate *
+timeout)``, and is resident for the same fraction of the time.
+"""
+
+
+def hit_ratio(rate, timeout):
+    "Expected hit ratio of a key read ``rate`` times a second."
+    return rate * timeout / (1.0 + rate * timeout)
+
+
+def timeout_for(rate, target_hit_ratio):
+    "Timeout needed to reach ``target_hit_ratio`` at ``rate`` reads a second."
+    return target_hit_ratio / ((1.0 - target_hit_ratio) * rate)
+
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class Profile(object):
+    """What is known about one key group.
+
+       :param keys: Number of distinct keys.
+       :param rate: Reads per key per second, ``None`` if unknown.
+       :param cost: Time to recompute a value in ms.
+       :param size: Average value size in bytes.
+    """
+    def __init__(self, keys, rate, cost, size):
+        self.keys = keys
+        self.rate = rate
+        self.cost = cost
+        self.size = size
+
+    @property
+    def saved_per_byte(self):
+        "ms of recomputation saved per second for every resident byte."
+        if not self.rate or not self.size:
+            return 0
+        return self.rate * self.cost / self.size
+
+    def resident(self, timeout):
+        "Expected bytes held in the cache with ``timeout``."
+        return self.keys * self.size * hit_ratio(self.rate, timeout)
+
+
+def recommend(profiles, min_timeout, max_timeout, target_hit_ratio=0.9,
+              memory_budget=None):
+    """Returns ``{group: timeout}`` for every profile with a known rate.
+
+       Each group gets the timeout reaching ``target_hit_ratio``, within the
+       bounds. If the expected resident size exceeds ``memory_budget`` bytes,
+       the groups saving the least time per byte are shortened first, since
+       every byte they free is worth more to the others.
+    """
+    timeouts = {}
+    for group in profiles:
+        profile = profiles[group]
+        if profile.rate:
+            timeouts[group] = clamp(timeout_for(profile.rate, target_hit_ratio),
+                                    min_timeout, max_timeout)
+
+    if memory_budget is None:
+        return timeouts
+
+    used = sum(profiles[group].resident(timeouts[group]) for group in timeouts)
+    for group in sorted(timeouts, key=lambda g: profiles[g].saved_per_byte):
+        if used <= memory_budget:
+            break
+        profile = profiles[group]
+        others = used - profile.resident(timeouts[group])
+        allowed = memory_budget - others
+        if allowed <= profile.resident(min_timeout):
+            timeout = min_timeout
+        else:
+            ratio = allowed / float(profile.keys * profile.size)
+            timeout = clamp(ratio / ((1.0 - ratio) * profile.rate),
+                            min_timeout, max_timeout)
+        timeouts[group] = timeout
+        used = others + profile.resident(timeout)
+
+    return timeouts
@@ -0,0 +1,103 @@
+"""
+Warm-up of a cold cache from the hot ``memoize``/``cached`` calls recorded by
+:class:`~flask_cache_stats.Cache` in an earlier run.
+
+Calls are saved as JSON, so only calls with JSON-serializable arguments are
+kept; tuples come back as lists.
+"""
+from collections import deque
+import json
+import os
+import threading
+import time
+
+WARMED, PRESENT, FAILED, SKIPPED = 'warmed', 'present', 'failed', 'skipped'
+
+
+class RateLimiter(object):
+    "Spaces out calls to :meth:`wait` to at most ``rate`` a second."
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def run(tasks, workers=4, rate=None):
+    """Calls every task on at most ``workers`` threads, starting at most
+       ``rate`` tasks a second. Returns the results in completion order.
+    """
+    queue = deque(tasks)
+    limiter = RateLimiter(rate)
+    results = []
+
+    def worker():
+        while True:
+            try:
+                task = queue.popleft()
+            except IndexError:
+                return
+            limiter.wait()
+            results.append(task())
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(workers, len(queue)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def save(path, calls):
+    "Writes the JSON-serializable ``calls`` to ``path``, returns how many."
+    kept = []
+    for call in calls:
+        try:
+            json.dumps(call)
+        except (TypeError, ValueError):
+            continue
+        kept.append(call)
+    with open(path, 'w') as f:
+        json.dump(kept, f)
+    return len(kept)
+
+
+def load(path):
+    "Returns the calls saved at ``path``, none if it does not exist yet."
+    if path is None or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+class WarmUpData(object):
+    def __init__(self):
+        self.calls = 0
+        self.warmed = 0
+        self.present = 0
+        self.failed = 0
+        self.skipped = 0
+        self.duration = 0
+
+    def __repr__(self):
+        return ('calls: {}, warmed:{}, present:{}, failed:{}, skipped:{}'
+                .format(self.calls, self.warmed, self.present, self.failed,
+                        self.skipped))
+
+    def data(self):
+        return dict(calls=self.calls, warmed=self.warmed, present=self.present,
+                    failed=self.failed, skipped=self.skipped,
+                    coverage='{:.3f}'.format(
+                        (self.warmed + self.present) / float(self.calls or 1)),
+                    duration='{:.3f}'.format(self.duration))
@@ -22,8 +22,11 @@ setup(
     install_requires=[
         'Flask>=0.9',
         'Flask-Cache>=0.13.1',
-        'Flask-Login>=0.2.11'
     ],
+    extras_require={
+        # Only needed for CacheStats(enable_clear_api=True, protect_api=True).
+        'login': ['Flask-Login>=0.2.11'],
+    },
     test_suite="tests",
     classifiers=[
         'Environment :: Web Environment',
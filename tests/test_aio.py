@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+import pytest
+from flask import Flask
+from flask_cache_stats import Cache
+from flask_cache_stats.keys import digest
+from werkzeug.contrib.cache import SimpleCache
+
+
+class SlowCache(SimpleCache):
+    latency = 0.05
+
+    def get(self, key):
+        time.sleep(self.latency)
+        return super(SlowCache, self).get(key)
+
+
+class NativeCache(SimpleCache):
+    async def aget(self, key):
+        self.last_key = key
+        return 'native'
+
+
+def slow_cache(app, config, args, kwargs):
+    return SlowCache(*args, **kwargs)
+
+
+def native_cache(app, config, args, kwargs):
+    return NativeCache(*args, **kwargs)
+
+
+def make_cache(cache_type='simple', **config):
+    app = Flask(__name__)
+    app.debug = True
+    app.config['CACHE_TYPE'] = cache_type
+    app.config['CACHE_STATS_ASYNC_WORKERS'] = 8
+    app.config.update(config)
+    return Cache(app)
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.yield_fixture()
+def cache():
+    yield make_cache()
+
+
+def test_aget_aset(cache):
+    assert run(cache.aset('hi', 'hello'))
+    assert run(cache.aget('hi')) == 'hello'
+    assert run(cache.aget('tie')) is None
+
+    data = cache._log['hi']
+    assert data.hit == 1
+    assert data.hot is True
+    assert cache._log['tie'].miss == 1
+
+    assert run(cache.aset_many({'a': 1, 'b': 0}))
+    assert run(cache.aget_many('a', 'b', 'c')) == [1, 0, None]
+    assert cache._log['b'].hit == 1
+
+    assert run(cache.adelete('a'))
+    assert cache._log['a'].hot is False
+
+
+def test_atags(cache):
+    assert run(cache.aset('a', 1, tags=['t']))
+    assert run(cache.aadd('b', 2, tags=['t']))
+    assert run(cache.aset_many({'c': 3}, tags=['t']))
+    assert cache.delete_by_tag('t') == 3
+    assert run(cache.aget_many('a', 'b', 'c')) == [None, None, None]
+
+
+def test_native_backend():
+    cache = make_cache(__name__ + '.native_cache')
+    assert run(cache.aget('anything')) == 'native'
+    assert cache._executor is None
+    assert cache._log['anything'].hit == 1
+
+
+def test_hash_keys():
+    cache = make_cache(__name__ + '.native_cache', CACHE_STATS_HASH_KEYS=True)
+    assert run(cache.aget('anything')) == 'native'
+    backend = cache.hashed_keys.backend
+    assert backend.last_key == digest('anything')
+
+    assert run(cache.aset('hi', 'hello'))
+    assert backend.get(digest('hi')) == 'hello'
+    assert 'hi' in cache._log
+
+
+def test_concurrent_slow_backend():
+    cache = make_cache(__name__ + '.slow_cache')
+
+    async def many():
+        return await asyncio.gather(*[cache.aget('key/{}'.format(i))
+                                      for i in range(8)])
+
+    start = time.time()
+    run(many())
+    assert time.time() - start < SlowCache.latency * 4
+
+
+def test_amemoize(cache):
+    calls = []
+
+    @cache.amemoize(negative_timeout=60)
+    async def lookup(a):
+        calls.append(a)
+        return None if a == 0 else a * 2
+
+    assert run(lookup(2)) == 4
+    assert run(lookup(2)) == 4
+    assert run(lookup(0)) is None
+    assert run(lookup(0)) is None
+    assert calls == [2, 0]
+
+
+def test_acached(cache):
+    calls = []
+
+    @cache.acached(key_prefix='answer')
+    async def answer():
+        calls.append(1)
+        return 42
+
+    with cache.app.test_request_context():
+        assert run(answer()) == 42
+        assert run(answer()) == 42
+    assert calls == [1]
+    assert cache._log['answer'].hit == 1
+    # Coroutine functions are not registered for the blocking warm-up.
+    assert answer not in cache._warm_functions.values()
+    assert not any(getattr(f, 'uncached', None) is answer.uncached
+                   for f in cache._warm_functions.values())
+    with cache.app.test_request_context('/page'):
+        assert answer.make_cache_key() == 'answer'
+
+
+class RefusingCache(SimpleCache):
+    refuse = False
+
+    def set(self, key, value, timeout=None):
+        if self.refuse:
+            return False
+        return super(RefusingCache, self).set(key, value, timeout)
+
+
+def refusing_cache(app, config, args, kwargs):
+    return RefusingCache(*args, **kwargs)
+
+
+def test_redundant_writes_not_stored():
+    cache = make_cache(__name__ + '.refusing_cache',
+                       CACHE_STATS_REDUNDANT_WRITES='skip',
+                       CACHE_STATS_SINGLE_WRITER=True,
+                       CACHE_STATS_BREAKER={'errors': 1, 'cooldown': 0.1})
+    backend = cache.cache
+
+    run(cache.aset('k', 'A'))
+    backend.refuse = True
+    assert not run(cache.aset('k', 'B'))
+    backend.refuse = False
+    assert run(cache.aset('k', 'B'))
+    assert backend.get('k') == 'B'
+
+    cache.breaker.record('set', 1, error=True)
+    run(cache.aset_many({'k': 'C'}))
+    time.sleep(0.15)
+    run(cache.aset_many({'k': 'C'}))
+    assert backend.get('k') == 'C'
+
+    run(cache.aset('k', 'A'))
+    backend.delete('k')
+    assert run(cache.aadd('k', 'B'))
+    run(cache.aset('k', 'A'))
+    assert backend.get('k') == 'A'
+    assert cache.get_write_log()['k']['skipped'] == 0
+
+
+def test_disabled():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_ENABLED'] = False
+    cache = Cache(app)
+
+    assert run(cache.aset('a', 1, tags=['t']))
+    assert run(cache.aget('a')) == 1
+    assert run(cache.aget_many('a', 'b')) == [1, None]
+    assert cache._log == {}
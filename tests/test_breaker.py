@@ -0,0 +1,208 @@
+import json
+import time
+
+import pytest
+from flask import Flask
+from flask_cache_stats import Cache, CacheStats
+from flask_cache_stats.breaker import (CircuitBreaker, BreakerOpen, CLOSED,
+                                      OPEN, HALF_OPEN)
+from werkzeug.contrib.cache import SimpleCache
+
+
+class FaultyCache(SimpleCache):
+    """Raises or stalls on demand."""
+    fail = False
+    delay = 0
+    calls = 0
+
+    def _fault(self):
+        FaultyCache.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise IOError('backend down')
+
+    def get(self, key):
+        self._fault()
+        return super(FaultyCache, self).get(key)
+
+    def set(self, key, value, timeout=None):
+        self._fault()
+        return super(FaultyCache, self).set(key, value, timeout)
+
+
+def faulty_cache(app, config, args, kwargs):
+    return FaultyCache(*args, **kwargs)
+
+
+@pytest.yield_fixture()
+def app():
+    FaultyCache.fail = False
+    FaultyCache.delay = 0
+    FaultyCache.calls = 0
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = __name__ + '.faulty_cache'
+    app.config['CACHE_STATS_BREAKER'] = {'errors': 3, 'latency': 50,
+                                         'cooldown': 0.2}
+    yield app
+
+
+def test_breaker_states():
+    breaker = CircuitBreaker(errors=2, cooldown=0.1)
+    assert breaker.allow('get')
+    breaker.record('get', 1, error=True)
+    assert breaker.state == CLOSED
+    breaker.record('get', 1, error=True)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+
+    assert not breaker.allow('get')
+    time.sleep(0.1)
+    assert breaker.allow('get')
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time.
+    assert not breaker.allow('set')
+
+    breaker.record('get', 1, error=True)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+
+    time.sleep(0.1)
+    assert breaker.allow('get')
+    breaker.record('get', 1)
+    assert breaker.state == CLOSED
+
+    data = breaker.data()
+    assert data['operations']['get']['errors'] == 3
+    assert data['operations']['get']['bypassed'] == 1
+    assert data['operations']['set']['bypassed'] == 1
+
+
+def test_breaker_trips_on_errors(app):
+    cache = Cache(app)
+    cache.set('hi', 'hello')
+    FaultyCache.fail = True
+
+    for _ in range(3):
+        with pytest.raises(IOError):
+            cache.get('hi')
+    assert cache.breaker.state == OPEN
+
+    calls = FaultyCache.calls
+    assert cache.get('hi') is None
+    assert cache.set('hi', 'hello') is None
+    assert FaultyCache.calls == calls
+
+    FaultyCache.fail = False
+    time.sleep(0.2)
+    assert cache.get('hi') == 'hello'
+    assert cache.breaker.state == CLOSED
+
+    data = cache.get_breaker_log()
+    assert data['trips'] == 1
+    assert data['operations']['get']['errors'] == 3
+    assert data['operations']['get']['bypassed'] == 1
+    assert data['operations']['set']['bypassed'] == 1
+
+
+def test_breaker_trips_on_latency(app):
+    cache = Cache(app)
+    FaultyCache.delay = 0.06
+    for _ in range(3):
+        cache.get('hi')
+    assert cache.breaker.state == OPEN
+    assert cache.get_breaker_log()['operations']['get']['slow'] == 3
+
+
+def test_breaker_refuses_invalidations(app):
+    cache = Cache(app)
+    cache.set('hi', 'hello', tags=['t'])
+
+    @cache.memoize()
+    def get_user(user_id):
+        return {'id': user_id}
+
+    with app.app_context():
+        get_user(1)
+        versions = dict(cache._versions)
+
+        FaultyCache.fail = True
+        for _ in range(3):
+            with pytest.raises(IOError):
+                cache.get('hi')
+        assert cache.breaker.state == OPEN
+
+        with pytest.raises(BreakerOpen):
+            cache.delete('hi')
+        with pytest.raises(BreakerOpen):
+            cache.delete_by_tag('t')
+        # Logged by delete_memoized, and the version is left alone.
+        cache.delete_memoized(get_user)
+        assert cache._versions == versions
+
+    # Still indexed, so the delete can be retried.
+    assert 'hi' in cache._index
+    assert cache.get_breaker_log()['operations']['delete']['bypassed'] == 1
+
+    FaultyCache.fail = False
+    time.sleep(0.2)
+    assert cache.get('hi') == 'hello'
+    assert cache.delete_by_tag('t') == 1
+    assert cache.get('hi') is None
+
+
+def test_api_breaker_open(app):
+    app.config['CACHE_STATS_KEY_INDEX'] = True
+    cache = Cache(app)
+    app.register_blueprint(CacheStats(cache, enable_clear_api=True,
+                                      protect_api=False))
+    cache.set('hi', 'hello', tags=['t'])
+
+    FaultyCache.fail = True
+    for _ in range(3):
+        with pytest.raises(IOError):
+            cache.get('hi')
+
+    with app.test_client() as c:
+        for url in ['cache_stats/hi', 'cache_stats/tag/t',
+                    'cache_stats/prefix/h']:
+            result = c.delete(url)
+            # Worth retrying once the breaker closes.
+            assert result.status_code == 503
+            assert result.headers['Retry-After'] == '1'
+            data = json.loads(result.data.decode('utf-8'))
+            assert data['status'] == 'unavailable'
+
+        FaultyCache.fail = False
+        time.sleep(0.2)
+        assert c.delete('cache_stats/hi').status_code == 200
+
+
+def test_cached_computes_once(app):
+    cache = Cache(app)
+    calls = []
+
+    @app.route('/')
+    @cache.cached()
+    def view():
+        calls.append(1)
+        return 'view'
+
+    FaultyCache.fail = True
+    with app.test_client() as c:
+        for _ in range(5):
+            assert c.get('/').data == b'view'
+
+    assert len(calls) == 5
+    # Three failed lookups trip the breaker, the rest skip the backend.
+    assert FaultyCache.calls == 3
+
+
+def test_breaker_dashboard(app):
+    cache = Cache(app)
+    app.register_blueprint(CacheStats(cache))
+    cache.get('hi')
+
+    with app.test_client() as c:
+        result = c.get('/cache_stats')
+        assert b'Circuit breaker' in result.data
@@ -10,6 +10,7 @@ import string
 
 from flask import Flask, render_template, render_template_string
 from flask_cache_stats import Cache
+from flask_cache_stats.keys import HashedKeys
 from flask.ext.cache import function_namespace, make_template_fragment_key
 
 if sys.version_info < (2, 7):
@@ -624,6 +625,27 @@ class CacheTestCase(unittest.TestCase):
             assert output == somevar
 
 
+class HashedKeysCacheTestCase(CacheTestCase):
+    def _set_app_config(self, app):
+        app.config['CACHE_TYPE'] = 'simple'
+        app.config['CACHE_STATS_HASH_KEYS'] = True
+
+    def test_18_dict_config_initapp(self):
+        cache = Cache()
+        cache.init_app(self.app, config={'CACHE_TYPE': 'simple'})
+        from werkzeug.contrib.cache import SimpleCache
+        backend = self.app.extensions['cache'][cache]
+        assert isinstance(backend, HashedKeys)
+        assert isinstance(backend.backend, SimpleCache)
+
+    def test_19_dict_config_both(self):
+        cache = Cache(config={'CACHE_TYPE': 'null'})
+        cache.init_app(self.app, config={'CACHE_TYPE': 'simple'})
+        from werkzeug.contrib.cache import SimpleCache
+        assert isinstance(self.app.extensions['cache'][cache].backend,
+                          SimpleCache)
+
+
 # if 'TRAVIS' in os.environ:
 #     try:
 #         import redis
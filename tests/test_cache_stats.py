@@ -1,8 +1,16 @@
 import pytest
 import os
+import logging
+import json
+import subprocess
+import sys
+import threading
+import time
 from flask import Flask
 from flask_cache_stats import Cache, CacheStats
+from flask_cache_stats.stats import NEGATIVE
 from flask_login import LoginManager, UserMixin, login_user
+from werkzeug.contrib.cache import SimpleCache
 
 
 @pytest.yield_fixture()
@@ -184,6 +192,7 @@ def app_login():
     app.config['SESSION_PROTECTION'] = None
     app.config['REMEMBER_COOKIE_NAME'] = 'remember'
     app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_KEY_INDEX'] = True
 
     cache = Cache(app)
     login_manager = LoginManager()
@@ -253,3 +262,961 @@ def test_api_protected(app_login):
             c.get('login-invalid')
             result = c.delete('cache_stats/hi')
             assert result.status_code == 401
+
+
+def test_endpoint_round_trips(cache):
+    app = cache.app
+    app.config['CACHE_STATS_ROUND_TRIP_THRESHOLD'] = 5
+    cache.init_app(app)
+    app.register_blueprint(CacheStats(cache))
+
+    @app.route('/loop')
+    def loop():
+        for idx in range(10):
+            cache.get('user/{}'.format(idx))
+        return 'loop'
+
+    @app.route('/batch')
+    def batch():
+        cache.get_many(*['user/{}'.format(idx) for idx in range(10)])
+        return 'batch'
+
+    with app.test_client() as c:
+        c.get('/loop')
+        c.get('/loop')
+        c.get('/batch')
+
+    endpoints = cache.get_endpoint_log()
+    data = endpoints['loop']
+    assert data['requests'] == 2
+    assert data['max_round_trips'] == 10
+    assert data['flagged'] == 2
+    assert data['patterns'] == ['user/*']
+
+    data = endpoints['batch']
+    assert data['requests'] == 1
+    assert data['max_round_trips'] == 1
+    assert data['flagged'] == 0
+    assert data['patterns'] == []
+
+    with app.test_client() as c:
+        result = c.get('/cache_stats')
+        assert result.status_code == 200
+        assert b'user/*' in result.data
+
+
+@pytest.mark.parametrize('enabled', [False, True])
+def test_server_timing(enabled):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_SERVER_TIMING'] = enabled
+    cache = Cache(app)
+
+    @app.route('/view')
+    def view():
+        cache.set('hi', 'hello')
+        cache.get('hi')
+        cache.get('tie')
+        return 'view'
+
+    with app.test_client() as c:
+        result = c.get('/view')
+
+    if not enabled:
+        assert 'Server-Timing' not in result.headers
+    else:
+        header = result.headers['Server-Timing']
+        assert header.startswith('cache;dur=')
+        assert 'desc="3 ops, 1 hits, 1 misses"' in header
+
+
+def test_request_log(cache, caplog):
+    app = cache.app
+    app.config['CACHE_STATS_REQUEST_LOG'] = True
+    cache.init_app(app)
+
+    @app.route('/view')
+    def view():
+        cache.get('hi')
+        return 'view'
+
+    with caplog.at_level(logging.INFO, logger='flask_cache_stats.stats'):
+        with app.test_client() as c:
+            c.get('/view')
+
+    records = [r for r in caplog.records if hasattr(r, 'cache_stats')]
+    assert len(records) == 1
+    assert records[0].cache_stats['endpoint'] == 'view'
+    assert records[0].cache_stats['round_trips'] == 1
+    assert records[0].cache_stats['miss'] == 1
+
+
+def test_falsy_hit(cache):
+    for key, value in [('zero', 0), ('empty', ''), ('list', []), ('false', False)]:
+        cache.set(key, value)
+        assert cache.get(key) == value
+        data = cache._log[key]
+        assert data.hit == 1
+        assert data.miss == 0
+        assert data.hot is True
+
+    cache.get_many('zero', 'list', 'missing')
+    assert cache._log['zero'].hit == 2
+    assert cache._log['list'].hit == 2
+    assert cache._log['missing'].miss == 1
+
+
+def test_negative_memoize(cache):
+    calls = []
+
+    with cache.app.test_request_context():
+        @cache.memoize(negative_timeout=60)
+        def find(name):
+            calls.append(name)
+            return None
+
+        @cache.memoize()
+        def find_uncached(name):
+            calls.append(name)
+            return None
+
+        assert find('a') is None
+        assert find('a') is None
+        assert calls == ['a']
+
+        find_uncached('b')
+        find_uncached('b')
+        assert calls == ['a', 'b', 'b']
+
+        key = find.make_cache_key(find.uncached, 'a')
+        assert cache.get(key) is None
+        data = cache._log[key]
+        assert data.negative_hit == 2
+        assert data.hit == 0
+        assert data.miss == 1
+
+
+def test_negative_cached(cache):
+    calls = []
+
+    with cache.app.test_request_context():
+        @cache.cached(key_prefix='lookup', negative_timeout=60)
+        def lookup():
+            calls.append(1)
+
+        lookup()
+        lookup()
+        assert calls == [1]
+        assert cache.get_many('lookup') == [None]
+        assert cache._log['lookup'].negative_hit == 2
+
+
+def test_cached_etag(cache):
+    app = cache.app
+    pages = ['first']
+
+    @app.route('/page')
+    @cache.cached(etag=True)
+    def page():
+        return pages[-1]
+
+    with app.test_client() as c:
+        result = c.get('/page')
+        assert result.status_code == 200
+        assert result.data == b'first'
+        tag = result.headers['ETag']
+
+        result = c.get('/page')
+        assert result.headers['ETag'] == tag
+        assert result.data == b'first'
+
+        result = c.get('/page', headers={'If-None-Match': tag})
+        assert result.status_code == 304
+        assert result.data == b''
+        # Answered from the ETag alone.
+        assert cache._log['view//page'].hit == 1
+
+        # Deleting the view deletes its ETag.
+        pages.append('second')
+        cache.delete('view//page')
+        assert cache.get('view//page:etag') is None
+        result = c.get('/page', headers={'If-None-Match': tag})
+        assert result.status_code == 200
+        assert result.data == b'second'
+        assert result.headers['ETag'] != tag
+
+        # The ETag is recomputed if only the body is cached.
+        tag = result.headers['ETag']
+        cache.cache.delete('view//page:etag')
+        result = c.get('/page', headers={'If-None-Match': tag})
+        assert result.status_code == 304
+        assert cache.get('view//page:etag') is not None
+
+    endpoint = cache.get_endpoint_log()['page']
+    assert endpoint['not_modified'] == 2
+    assert endpoint['bytes_saved'] == '{:.3f}'.format((5 + 6) / 1024.0)
+
+
+class CountingCache(SimpleCache):
+    def __init__(self, *args, **kwargs):
+        super(CountingCache, self).__init__(*args, **kwargs)
+        self.deleted = []
+
+    def delete_many(self, *keys):
+        self.deleted.append(keys)
+        return super(CountingCache, self).delete_many(*keys)
+
+
+def counting_cache(app, config, args, kwargs):
+    return CountingCache(*args, **kwargs)
+
+
+def test_etag_deletes():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = __name__ + '.counting_cache'
+    app.config['CACHE_STATS_OVERHEAD_SAMPLE'] = 1
+    cache = Cache(app)
+    backend = cache.cache
+
+    @app.route('/page')
+    @cache.cached(etag=True)
+    def page():
+        return 'page'
+
+    @app.route('/custom')
+    @cache.cached(key_prefix=lambda: 'custom', etag=True)
+    def custom():
+        return 'custom'
+
+    # Keys no etag view makes cost no extra round trip.
+    cache.set('user/1', 'a')
+    cache.delete('user/1')
+    cache.delete_many('user/1', 'user/2')
+    assert backend.deleted == [('user/1', 'user/2')]
+
+    with app.test_client() as c:
+        c.get('/page')
+        c.get('/custom')
+    del backend.deleted[:]
+    cache.delete('view//page')
+    cache.delete('custom')
+    assert backend.deleted == [('view//page:etag',), ('custom:etag',)]
+    assert backend.get('view//page:etag') is None
+    assert backend.get('custom:etag') is None
+    # Only keys it wrote an ETag for, for a callable key_prefix.
+    cache.delete('custom')
+    assert len(backend.deleted) == 2
+
+    # The ETag deletes are part of the sampled delete.
+    operations = cache.get_overhead_log()['operations']
+    assert operations['delete']['samples'] == 4
+    assert operations['delete_many']['samples'] == 1
+
+
+def test_memoize_many(cache):
+    calls = []
+
+    with cache.app.test_request_context():
+        @cache.memoize_many(timeout=60, negative_timeout=60)
+        def get_users(ids):
+            calls.append(sorted(ids))
+            return dict((user_id, 'user{}'.format(user_id))
+                        for user_id in ids if user_id > 0)
+
+        assert get_users([1, 2]) == {1: 'user1', 2: 'user2'}
+        assert get_users([3, 2, 1, 0, 3]) == {1: 'user1', 2: 'user2', 3: 'user3'}
+        assert get_users([0, 1, 2, 3]) == {1: 'user1', 2: 'user2', 3: 'user3'}
+        assert calls == [[1, 2], [0, 3]]
+
+        keys = get_users.make_cache_keys([0, 1])
+        assert cache._log[keys[0]].negative_hit == 1
+        assert cache._log[keys[1]].hit == 2
+        assert cache._log[keys[1]].group == get_users.cache_group
+
+        get_users.delete_memoized()
+        get_users([1])
+        assert calls[-1] == [1]
+
+        data = cache.get_ttl_log()[get_users.cache_group]
+        assert data['writes'] == 5
+        assert data['cold_misses'] == 6
+
+        # A single id.
+        get_users([1, 2])
+        cache.delete_memoized(get_users, 2)
+        assert get_users([1, 2]) == {1: 'user1', 2: 'user2'}
+        assert calls[-2:] == [[2], [2]]
+
+
+def test_memoize_many_round_trips(cache):
+    app = cache.app
+
+    @cache.memoize_many()
+    def get_users(ids):
+        return dict((user_id, user_id) for user_id in ids)
+
+    @app.route('/users')
+    def users():
+        return str(len(get_users(range(50))))
+
+    with app.test_client() as c:
+        c.get('/users')
+        c.get('/users')
+    data = cache.get_endpoint_log()['users']
+    assert data['max_round_trips'] == 2
+
+
+def test_memoize_versions(cache):
+    calls = []
+
+    @cache.memoize()
+    def find(name):
+        calls.append(name)
+        return name
+
+    with cache.app.test_request_context():
+        for _ in range(3):
+            find('a')
+        group = find.cache_group
+        versions = cache.get_version_log()[group]
+        assert versions['lookups'] == 3
+        assert versions['local_hits'] == 2
+        # The first lookup fetches and writes the version.
+        assert versions['round_trips'] == 2
+        assert calls == ['a']
+
+        # Invalidated locally right away.
+        find.delete_memoized()
+        find('a')
+        assert calls == ['a', 'a']
+        versions = cache.get_version_log()[group]
+        assert versions['resets'] == 1
+        assert versions['local_hits'] == 3
+
+        # Another process resetting the version is seen once it goes stale.
+        cache.cache.set(cache._memvname(group), 'other')
+        find('a')
+        assert calls == ['a', 'a']
+        for version in cache._versions:
+            cache._versions[version] = (0, cache._versions[version][1])
+        find('a')
+        assert calls == ['a', 'a', 'a']
+
+
+def test_memoize_versions_bounded(cache):
+    cache.version_ttl = 0.5
+
+    class User(object):
+        def __init__(self, id):
+            self.id = id
+
+        def __repr__(self):
+            return 'User({})'.format(self.id)
+
+        @cache.memoize()
+        def name(self):
+            return str(self.id)
+
+    with cache.app.test_request_context():
+        for idx in range(200):
+            User(idx).name()
+        # The function's version and one per instance.
+        assert len(cache._versions) == 201
+        time.sleep(0.5)
+        User(0).name()
+    # Stale versions are dropped as new ones are kept.
+    assert len(cache._versions) == 2
+
+
+def test_memoize_versions_off(cache):
+    cache.version_ttl = 0
+
+    @cache.memoize()
+    def find(name):
+        return name
+
+    with cache.app.test_request_context():
+        find('a')
+        find('a')
+        versions = cache.get_version_log()[find.cache_group]
+        assert versions['local_hits'] == 0
+        assert versions['round_trips'] == 3
+
+
+def test_ttl_lifecycle(cache):
+    cache.set('user/1', 'a', timeout=1)
+    cache.set('user/2', 'b', 1)
+    cache.set_many({'user/3': 'c'}, timeout=1)
+    cache.set('user/4', 'd', timeout=60)
+
+    time.sleep(0.2)
+    cache.get('user/1')
+    cache.get('user/1')
+    cache.get('user/5')
+    cache.cache.delete('user/4')
+    cache.get('user/4')
+
+    time.sleep(1)
+    assert cache.get_log()['user/3']['hot'] is False
+    assert cache._log['user/3'].hot is True
+
+    cache.get('user/1')
+    cache.get('user/2')
+
+    data = cache.get_ttl_log()['user/*']
+    assert data['writes'] == 4
+    assert data['timeout'] == '15.8'
+    assert data['hits'] == 2
+    assert 0.2 <= float(data['time_to_first_hit']) < 1
+    # user/2 was looked up after expiring, user/3 was never looked up.
+    assert data['wasted_writes'] == 2
+    assert data['expired_misses'] == 2
+    assert data['evicted_misses'] == 1
+    assert data['cold_misses'] == 1
+
+
+def test_ttl_default_timeout(cache):
+    cache.set('hi', 'hello')
+    assert cache._log['hi'].timeout == 300
+    cache.set('hi', 'hello', timeout=0)
+    assert cache._log['hi'].timeout is None
+    assert cache.get_log()['hi']['hot'] is True
+
+
+class TouchCache(SimpleCache):
+    def __init__(self, *args, **kwargs):
+        super(TouchCache, self).__init__(*args, **kwargs)
+        self.writes = []
+
+    def set(self, key, value, timeout=None):
+        self.writes.append(key)
+        return super(TouchCache, self).set(key, value, timeout)
+
+    def touch(self, key, timeout=None):
+        if not self.has(key):
+            return False
+        return super(TouchCache, self).set(key, self.get(key), timeout)
+
+
+def touch_cache(app, config, args, kwargs):
+    return TouchCache(*args, **kwargs)
+
+
+@pytest.mark.parametrize('mode', [None, 'skip', 'touch'])
+def test_redundant_writes(mode):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = __name__ + '.touch_cache'
+    app.config['CACHE_STATS_WRITE_FINGERPRINTS'] = True
+    app.config['CACHE_STATS_REDUNDANT_WRITES'] = mode
+    app.config['CACHE_STATS_SINGLE_WRITER'] = True
+    cache = Cache(app)
+
+    cache.set('user/1', {'name': 'a'})
+    cache.set('user/1', {'name': 'a'})
+    cache.set('user/1', {'name': 'b'})
+    cache.set_many({'user/1': {'name': 'b'}, 'user/2': 'c'})
+    assert cache.get('user/1') == {'name': 'b'}
+
+    data = cache.get_write_log()['user/*']
+    assert data['writes'] == 5
+    assert data['redundant'] == 2
+    if mode is None:
+        assert cache.cache.writes == ['user/1'] * 4 + ['user/2']
+        assert data['skipped'] == data['touched'] == 0
+        assert data['bytes_saved'] == '0.000'
+    elif mode == 'skip':
+        assert cache.cache.writes == ['user/1', 'user/1', 'user/2']
+        assert data['skipped'] == 2
+        assert float(data['bytes_saved']) > 0
+    else:
+        assert cache.cache.writes == ['user/1', 'user/1', 'user/2']
+        assert data['touched'] == 2
+        assert cache._log['user/1'].set_time is not None
+
+
+def test_redundant_write_after_expiry():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_REDUNDANT_WRITES'] = 'skip'
+    app.config['CACHE_STATS_SINGLE_WRITER'] = True
+    cache = Cache(app)
+
+    cache.set('hi', 'hello', timeout=1)
+    time.sleep(1.1)
+    cache.set('hi', 'hello', timeout=1)
+    assert cache.get('hi') == 'hello'
+    assert cache.get_write_log()['hi']['skipped'] == 0
+
+
+def test_redundant_write_timeout():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = __name__ + '.touch_cache'
+    app.config['CACHE_STATS_REDUNDANT_WRITES'] = 'skip'
+    app.config['CACHE_STATS_SINGLE_WRITER'] = True
+    cache = Cache(app)
+
+    cache.set('hi', 'hello', timeout=10)
+    cache.set('hi', 'hello', timeout=10)
+    # A new timeout has to reach the backend.
+    cache.set('hi', 'hello', timeout=100)
+    assert cache.cache.writes == ['hi', 'hi']
+    assert cache._log['hi'].timeout == 100
+
+
+def test_redundant_writes_other_writers():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = __name__ + '.touch_cache'
+    app.config['CACHE_STATS_REDUNDANT_WRITES'] = 'skip'
+    cache = Cache(app)
+    # Skipping trusts that nobody else writes, which has to be said.
+    assert cache.redundant_writes == 'touch'
+
+    cache.set('hi', 'hello')
+    # Evicted, or deleted by another process.
+    cache.cache.delete('hi')
+    cache.set('hi', 'hello')
+    assert cache.cache.get('hi') == 'hello'
+    assert cache.get_write_log()['hi']['touched'] == 1
+
+
+class RefusingCache(SimpleCache):
+    refuse = False
+
+    def set(self, key, value, timeout=None):
+        if self.refuse:
+            return False
+        return super(RefusingCache, self).set(key, value, timeout)
+
+
+def refusing_cache(app, config, args, kwargs):
+    return RefusingCache(*args, **kwargs)
+
+
+def test_redundant_writes_not_stored():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = __name__ + '.refusing_cache'
+    app.config['CACHE_STATS_REDUNDANT_WRITES'] = 'skip'
+    app.config['CACHE_STATS_SINGLE_WRITER'] = True
+    app.config['CACHE_STATS_BREAKER'] = {'errors': 1, 'cooldown': 0.1}
+    cache = Cache(app)
+    backend = cache.cache
+
+    # A write the backend refused.
+    cache.set('k', 'A')
+    backend.refuse = True
+    assert not cache.set('k', 'B')
+    backend.refuse = False
+    assert cache.set('k', 'B')
+    assert backend.get('k') == 'B'
+
+    # A write the open breaker bypassed.
+    cache.breaker.record('set', 1, error=True)
+    cache.set('k', 'C')
+    time.sleep(0.15)
+    cache.set('k', 'C')
+    assert backend.get('k') == 'C'
+
+    # An add after the key was deleted behind the cache's back, as
+    # flask_cache's delete_memoized does.
+    cache.set('k', 'A')
+    backend.delete('k')
+    assert cache.add('k', 'B')
+    cache.set('k', 'A')
+    assert backend.get('k') == 'A'
+    assert cache.get_write_log()['k']['skipped'] == 0
+
+
+def test_delete_by_tag(cache):
+    cache.delete_chunk_size = 2
+    cache.set('user/1', 'a', tags=['user:1'])
+    cache.add('user/1/posts', 'b', tags=['user:1', 'posts'])
+    cache.set_many({'post/1': 'c', 'post/2': 'd'}, tags=['posts'])
+    cache.set('user/2', 'e', tags=['user:2'])
+
+    assert cache.delete_by_tag('posts') == 3
+    assert cache.get('user/1/posts') is None
+    assert cache.get('post/1') is None
+    assert cache.get('user/1') == 'a'
+    assert cache.delete_by_tag('posts') == 0
+
+    assert cache.delete_by_tag('user:1') == 1
+    assert cache.get('user/1') is None
+    assert cache.get('user/2') == 'e'
+
+    data = cache.get_invalidation_log()
+    assert data['tag posts']['invalidations'] == 2
+    assert data['tag posts']['max_fan_out'] == 3
+    assert data['tag posts']['round_trips'] == 2
+    assert data['tag user:*']['fan_out'] == '1.0'
+
+
+def test_delete_by_prefix(cache):
+    with pytest.raises(RuntimeError):
+        cache.delete_by_prefix('user/')
+    cache.init_app(cache.app, config={'CACHE_STATS_KEY_INDEX': True})
+
+    for key in ['user/1', 'user/10', 'user/2', 'users', 'post/1']:
+        cache.set(key, key)
+    cache.delete('user/2')
+    cache.get('user/10')
+
+    assert cache.delete_by_prefix('user/') == 2
+    assert cache.get('user/1') is None
+    assert cache.get('users') == 'users'
+    assert cache.get('post/1') == 'post/1'
+
+    # Keys found missing are dropped from the index.
+    cache.cache.delete('users')
+    assert cache.get('users') is None
+    assert cache.delete_by_prefix('') == 1
+    assert cache.get_invalidation_log()['prefix user/']['fan_out'] == '2.0'
+
+
+def test_api_bulk(app_login):
+    app, cache = app_login
+    stats_bp = CacheStats(cache, enable_clear_api=True, protect_api=False)
+    app.register_blueprint(stats_bp)
+    cache.set('user/1', 'a', tags=['user/1'])
+    cache.set('user/1/posts', 'b', tags=['user/1'])
+
+    with app.test_client() as c:
+        result = c.delete('cache_stats/tag/user/1')
+        assert result.status_code == 200
+        assert json.loads(result.data.decode('utf-8'))['deleted'] == 2
+
+        result = c.delete('cache_stats/tag/user/1')
+        assert result.status_code == 404
+
+        cache.set('post/1', 'c')
+        result = c.delete('cache_stats/prefix/post/')
+        assert result.status_code == 200
+
+
+def test_log_changes(cache):
+    cache.set('user/1', 'a')
+    changes = cache.get_log_changes()
+    assert changes['reset']
+    assert list(changes['log']) == ['user/1']
+    version = changes['version']
+
+    # Nothing changed yet.
+    changes = cache.get_log_changes(version)
+    assert not changes['reset']
+    assert changes['log'] == {}
+    assert changes['version'] == version
+
+    cache.set('user/2', 'b')
+    cache.get('user/1')
+    cache.get('user/1')
+    changes = cache.get_log_changes(version)
+    assert sorted(changes['log']) == ['user/1', 'user/2']
+    assert changes['log']['user/1']['hit'] == 2
+    version = changes['version']
+
+    # Waits for the next change.
+    timer = threading.Timer(0.1, cache.delete, ['user/2'])
+    timer.start()
+    start = time.time()
+    changes = cache.get_log_changes(version, wait=5)
+    timer.join()
+    assert time.time() - start < 5
+    assert changes['log'] == {'user/2': cache.get_log()['user/2']}
+    assert not changes['log']['user/2']['hot']
+
+    start = time.time()
+    assert cache.get_log_changes(changes['version'], wait=0.1)['log'] == {}
+    assert time.time() - start >= 0.1
+
+    # A version from before a restart.
+    assert cache.get_log_changes(changes['version'] + 100)['reset']
+
+
+def test_api_changes(app_login):
+    app, cache = app_login
+    app.register_blueprint(CacheStats(cache, max_wait=1))
+    cache.set('hi', 'hello')
+
+    with app.test_client() as c:
+        changes = json.loads(c.get('cache_stats/changes').data.decode('utf-8'))
+        assert changes['reset']
+        assert list(changes['log']) == ['hi']
+
+        cache.get('hi')
+        result = c.get('cache_stats/changes?wait=1&since={}'
+                       .format(changes['version']))
+        changes = json.loads(result.data.decode('utf-8'))
+        assert not changes['reset']
+        assert changes['log']['hi']['hit'] == 1
+        assert b'data-wait="1"' in c.get('cache_stats').data
+
+
+def test_api_changes_no_wait(app_login):
+    # Long-polling is opt-in, waiting holds a worker.
+    app, cache = app_login
+    app.register_blueprint(CacheStats(cache))
+
+    with app.test_client() as c:
+        assert b'data-wait="0"' in c.get('cache_stats').data
+        changes = json.loads(c.get('cache_stats/changes').data.decode('utf-8'))
+        start_time = time.time()
+        result = c.get('cache_stats/changes?wait=5&since={}'
+                       .format(changes['version']))
+        assert time.time() - start_time < 1
+        assert json.loads(result.data.decode('utf-8'))['log'] == {}
+
+
+def test_totals():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_NAMESPACES'] = {'users': 'user/', 'posts': 'post/'}
+    cache = Cache(app)
+
+    cache.set('user/1', 'a')
+    cache.set('user/2', 'b')
+    cache.set('post/1', 'c')
+    cache.get('user/1')
+    cache.get('user/3')
+    cache.get('post/1')
+    cache.delete('user/2')
+
+    totals = cache.get_totals()
+    assert totals['keys'] == 4
+    assert (totals['hit'], totals['miss'], totals['writes'], totals['deletes']) == \
+        (2, 1, 3, 1)
+    assert totals['hit_ratio'] == '0.667'
+    users = totals['namespaces']['users']
+    assert (users['hit'], users['miss'], users['writes'], users['deletes']) == \
+        (1, 1, 2, 1)
+    assert totals['namespaces']['posts']['hit_ratio'] == '1.000'
+
+    # Only the live values count towards the size.
+    log = cache.get_log()
+    assert users['size'] == log['user/1']['size']
+    cache.delete('user/1')
+    assert cache.get_totals()['namespaces']['users']['size'] == '0.000'
+
+
+def test_totals_raw_keys():
+    # Key groups replace digits, namespaces match the keys themselves.
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_NAMESPACES'] = {'v1api': 'api/v1/',
+                                            'v1users': 'api/v1/users/',
+                                            'find': __name__ + '.'}
+    cache = Cache(app)
+
+    @cache.memoize()
+    def find(name):
+        return name
+
+    cache.set('api/v1/items', 'a')
+    cache.get('api/v1/items')
+    cache.get('api/v1/users/1')
+    cache.get('api/v2/items')
+    with app.app_context():
+        find('a')
+        find('a')
+
+    namespaces = cache.get_totals()['namespaces']
+    assert (namespaces['v1api']['hit'], namespaces['v1api']['miss']) == (1, 0)
+    assert namespaces['v1users']['miss'] == 1
+    # Memoized keys match by their function name.
+    assert namespaces['find']['hit'] == 1
+
+
+def test_api_caches(app_login):
+    app, cache = app_login
+    other = Cache(app, config={'CACHE_TYPE': 'simple'})
+    app.register_blueprint(CacheStats(dict(views=cache, api=other),
+                                      enable_clear_api=True, protect_api=False))
+    cache.set('hi', 'hello')
+    other.set('hi', 'there')
+    other.get('hi')
+
+    with app.test_client() as c:
+        caches = json.loads(c.get('cache_stats/caches').data.decode('utf-8'))
+        assert sorted(caches) == ['api', 'views']
+        assert caches['api']['hit'] == 1
+        assert caches['views']['hit'] == 0
+
+        result = c.get('cache_stats/cache/views/changes')
+        assert list(json.loads(result.data.decode('utf-8'))['log']) == ['hi']
+        assert c.get('cache_stats/cache/missing/changes').status_code == 404
+
+        # The first cache by name is the default.
+        assert c.delete('cache_stats/cache/views/hi').status_code == 200
+        assert other.get('hi') == 'there'
+        assert c.delete('cache_stats/hi').status_code == 200
+        assert other.get('hi') is None
+
+
+def test_snapshot_diff(cache):
+    cache.set('user/1', 'a')
+    cache.set('user/2', 'b')
+    cache.get('user/1')
+    start = cache.snapshot()
+    assert start.data()['keys'] == 2
+
+    cache.get('user/1')
+    cache.get('user/1')
+    cache.get('user/3')
+    cache.set('user/4', 'd')
+    cache.delete('user/2')
+    # Neither new nor evicted.
+    cache.set('user/5', 'e')
+    cache.delete('user/5')
+
+    diff = cache.diff(start)
+    assert diff['start'] == start.id
+    assert diff['end'] == start.id + 1
+    totals = diff['totals']
+    assert (totals['hit'], totals['miss'], totals['writes'], totals['deletes']) == \
+        (2, 1, 2, 2)
+    assert totals['hit_ratio'] == '0.667'
+    # Calls too fast for the clock are not timed.
+    assert sum(totals['latency']) <= 7
+    assert len(totals['latency']) == len(diff['latency_buckets']) + 1
+    assert diff['new_keys'] == ['user/4']
+    assert diff['evicted_keys'] == ['user/2']
+    assert (diff['new_key_count'], diff['evicted_key_count']) == (1, 1)
+
+    # Snapshots do not change with the cache.
+    end = cache.get_snapshot(diff['end'])
+    cache.get('user/1')
+    assert cache.diff(start, end) == diff
+    assert cache.diff(end)['totals']['hit'] == 1
+
+
+def test_snapshot_keys_capped(cache):
+    cache.snapshot_keys = 2
+    start = cache.snapshot()
+    for idx in range(5):
+        cache.set('user/{}'.format(idx), idx)
+    diff = cache.diff(start)
+    assert diff['new_keys'] == ['user/0', 'user/1']
+    assert diff['new_key_count'] == 5
+    assert cache.get_snapshot(diff['end']).keys == 5
+
+
+def test_snapshots_kept(cache):
+    cache.max_snapshots = 2
+    first, second, third = [cache.snapshot() for _ in range(3)]
+    assert cache.get_snapshot(first.id) is None
+    assert cache.get_snapshot(third.id) is third
+
+
+def test_api_snapshots(app_login):
+    app, cache = app_login
+    app.register_blueprint(CacheStats(cache))
+
+    with app.test_client() as c:
+        start = json.loads(c.post('cache_stats/snapshots').data.decode('utf-8'))
+        cache.set('hi', 'hello')
+        cache.get('hi')
+        end = json.loads(c.post('cache_stats/snapshots').data.decode('utf-8'))
+        cache.get('hi')
+
+        result = c.get('cache_stats/snapshots/{}?end={}'
+                       .format(start['id'], end['id']))
+        diff = json.loads(result.data.decode('utf-8'))
+        assert diff['totals']['hit'] == 1
+        assert diff['new_keys'] == ['hi']
+
+        # Until now.
+        result = c.get('cache_stats/snapshots/{}'.format(start['id']))
+        assert json.loads(result.data.decode('utf-8'))['totals']['hit'] == 2
+
+        assert c.get('cache_stats/snapshots/100').status_code == 404
+        result = c.get('cache_stats/snapshots/{}?end=100'.format(start['id']))
+        assert result.status_code == 404
+
+
+def test_disabled():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_ENABLED'] = False
+    cache = Cache(app)
+    backend = app.extensions['cache'][cache]
+    assert cache.delete == backend.delete
+
+    calls = []
+
+    @cache.memoize(negative_timeout=60)
+    def find(name):
+        calls.append(name)
+
+    @cache.memoize_many()
+    def get_users(ids):
+        return dict((user_id, user_id) for user_id in ids)
+
+    @app.route('/page')
+    @cache.cached(etag=True)
+    def page():
+        return 'page'
+
+    with app.test_client() as c:
+        tag = c.get('/page').headers['ETag']
+        assert c.get('/page', headers={'If-None-Match': tag}).status_code == 304
+        # Nothing to delete the ETag along with the view.
+        assert cache.get('view//page:etag') is None
+
+    with app.test_request_context():
+        assert cache.set('user/1', 'a', tags=['user'])
+        assert cache.get('user/1') == 'a'
+        assert cache.get_many('user/1', 'user/2') == ['a', None]
+        find('a')
+        find('a')
+        assert calls == ['a']
+        # Negative results read as None, as with stats enabled.
+        key = find.make_cache_key(find.uncached, 'a')
+        assert backend.get(key) is NEGATIVE
+        assert cache.get(key) is None
+        assert cache.get_many(key) == [None]
+        assert get_users([1, 2]) == get_users([2, 1]) == {1: 1, 2: 2}
+
+    assert cache._log == {}
+    assert cache._ttl_log == {}
+    assert cache.delete_by_tag('user') == 0
+
+
+def test_lazy_login_import():
+    code = 'import sys, flask_cache_stats; print("flask_login" in sys.modules)'
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.strip() == b'False'
+
+
+class SlowCache(SimpleCache):
+    def get(self, key):
+        time.sleep(0.002)
+        return super(SlowCache, self).get(key)
+
+
+def slow_cache(app, config, args, kwargs):
+    return SlowCache(*args, **kwargs)
+
+
+def test_overhead():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = __name__ + '.slow_cache'
+    app.config['CACHE_STATS_OVERHEAD_SAMPLE'] = 3
+    cache = Cache(app)
+    app.register_blueprint(CacheStats(cache))
+
+    for idx in range(8):
+        cache.set('user/{}'.format(idx), idx)
+        cache.get('user/{}'.format(idx))
+
+    data = cache.get_overhead_log()
+    assert data['calls'] == 16
+    assert data['samples'] == 5
+    assert data['operations']['set']['samples'] == 3
+    assert data['operations']['get']['samples'] == 2
+    get = data['operations']['get']
+    assert float(get['backend_time']) >= 2
+    assert 0 < float(get['overhead']) < float(get['backend_time'])
+    assert float(get['relative']) < 1
+
+    with app.test_client() as c:
+        result = json.loads(c.get('/cache_stats/overhead').data.decode('utf-8'))
+        assert result['calls'] == 16
+        assert b'Instrumentation overhead' in c.get('/cache_stats').data
@@ -0,0 +1,61 @@
+import pytest
+from flask import Flask
+from flask_cache_stats import Cache
+from flask_cache_stats.codec import ValueCodec, MAGIC
+
+
+@pytest.mark.parametrize('serializer', ['pickle', 'marshal', 'json'])
+def test_round_trip(serializer):
+    codec = ValueCodec(serializer=serializer)
+    for value in [0, '', 'hello', [1, 2, 3], {'a': 1}, None, 1.5]:
+        data, _ = codec.encode(value)
+        assert data.startswith(MAGIC)
+        assert codec.decode(data) == value
+
+
+def test_fallback_to_pickle():
+    codec = ValueCodec(serializer='json')
+    value = set([1, 2])
+    data, _ = codec.encode(value)
+    assert codec.decode(data) == value
+
+
+def test_compression():
+    codec = ValueCodec(compress_threshold=100)
+    value = 'x' * 10000
+    data, size = codec.encode(value)
+    assert size > 10000
+    assert len(data) < 1000
+    assert codec.decode(data) == value
+
+    data, size = codec.encode('small')
+    assert len(data) > size
+
+
+def test_decode_passthrough():
+    codec = ValueCodec()
+    assert codec.decode('plain') == 'plain'
+    assert codec.decode(b'raw bytes') == b'raw bytes'
+    assert codec.decode(None) is None
+
+
+def test_cache_codec():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_CODEC'] = {'compress_threshold': 100}
+    cache = Cache(app)
+
+    page = '<html>' + 'content ' * 1000 + '</html>'
+    cache.set('page/1', page)
+    cache.add('page/2', page)
+    cache.set_many({'page/3': page, 'page/4': 'short'})
+
+    assert cache.cache.get('page/1').startswith(MAGIC)
+    assert cache.get('page/1') == page
+    assert cache.get_many('page/2', 'page/3', 'page/4', 'page/5') == \
+        [page, page, 'short', None]
+
+    data = cache.get_codec_log()['page/*']
+    assert data['encoded'] == 4
+    assert data['decoded'] == 4
+    assert float(data['ratio']) < 0.5
@@ -0,0 +1,80 @@
+import csv
+import json
+
+import pytest
+from flask import Flask
+from flask_cache_stats import Cache, CacheStats
+from flask_cache_stats.stats import LogData
+from flask_cache_stats.export import FIELDS
+
+
+@pytest.yield_fixture()
+def app():
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    cache = Cache(app)
+    app.register_blueprint(CacheStats(cache))
+    yield app, cache
+
+
+def test_export(app):
+    app, cache = app
+    cache.set('user/1', 'a')
+    cache.get('user/1')
+    cache.get('a,"b"')
+
+    with app.test_client() as c:
+        result = c.get('cache_stats/export.ndjson')
+        assert result.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in result.data.decode('utf-8').splitlines()]
+        assert [row['key'] for row in rows] == ['user/1', 'a,"b"']
+        assert rows[0]['group'] == 'user/*'
+        assert rows[0]['hit'] == 1
+        assert rows[1]['miss'] == 1
+
+        result = c.get('cache_stats/export.csv')
+        assert result.mimetype == 'text/csv'
+        rows = list(csv.reader(result.data.decode('utf-8').splitlines()))
+        assert rows[0] == list(FIELDS)
+        assert rows[1][:5] == ['user/1', 'user/*', 'True', '1', '0']
+        assert rows[2][0] == 'a,"b"'
+
+        assert c.get('cache_stats/export.xml').status_code == 404
+
+
+def test_export_while_adding(app):
+    app, cache = app
+    cache.get('a')
+    rows = cache.iter_log()
+    assert next(rows)[0] == 'a'
+    cache.get('b')
+    assert [key for key, _ in rows] == ['b']
+
+
+def test_export_million_keys(app):
+    tracemalloc = pytest.importorskip('tracemalloc')
+    app, cache = app
+    count = 1000000
+    for idx in range(count):
+        key = 'user/{}'.format(idx)
+        cache._log[key] = LogData(group='user/*')
+        cache._log_keys.append(key)
+
+    with app.test_client() as c:
+        # Only what is allocated while streaming is traced.
+        tracemalloc.start()
+        try:
+            result = c.get('cache_stats/export.ndjson', buffered=False)
+            rows = 0
+            for chunk in result.response:
+                rows += chunk.count(b'\n')
+            result.close()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    assert rows == count
+    # A copy of the formatted log would take hundreds of mb, and none of
+    # the rows is kept once sent.
+    assert peak < 20 * 1024 * 1024
+    assert current < 5 * 1024 * 1024
@@ -0,0 +1,48 @@
+from flask_cache_stats.index import KeyIndex
+
+
+def test_prefixed():
+    index = KeyIndex(keys=True)
+    for key in ['b/2', 'a/1', 'b/1', 'b', 'c/1', 'b/1']:
+        index.add(key)
+
+    assert len(index) == 5
+    assert index.keys() == frozenset(['a/1', 'b', 'b/1', 'b/2', 'c/1'])
+    assert index.prefixed('b/') == ['b/1', 'b/2']
+    assert index.prefixed('b') == ['b', 'b/1', 'b/2']
+    assert index.prefixed('d') == []
+
+    index.discard('b/1')
+    index.discard('missing')
+    assert index.prefixed('b/') == ['b/2']
+    assert 'b/1' not in index
+
+    # Sorted again once keys were added.
+    index.add('b/0')
+    assert index.prefixed('b/') == ['b/0', 'b/2']
+
+
+def test_tagged():
+    index = KeyIndex()
+    index.add('a', ['x'])
+    index.add('b', ['x', 'y'])
+    index.add('a', ['y'])
+
+    assert index.tagged('x') == ['a', 'b']
+    assert index.tagged('y') == ['a', 'b']
+
+    index.discard('a')
+    assert index.tagged('x') == ['b']
+    index.discard('b')
+    assert index.tagged('y') == []
+    assert index._tags == {}
+
+    # Untagged keys are not kept without ``keys``.
+    index.add('d')
+    assert 'd' not in index
+    assert index.keys() == frozenset()
+
+    index.add('c', ['x'])
+    index.clear()
+    assert len(index) == 0
+    assert index.tagged('x') == []
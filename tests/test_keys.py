@@ -0,0 +1,148 @@
+from flask import Flask
+from flask_cache_stats import Cache, CacheStats
+from flask_cache_stats.keys import HashedKeys, digest, key_length
+from werkzeug.contrib.cache import SimpleCache
+import time
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config.update(config)
+    cache = Cache(app)
+    app.register_blueprint(CacheStats(cache, enable_clear_api=True,
+                                      protect_api=False))
+    return app, cache
+
+
+def test_key_length():
+    assert key_length('abc') == 3
+    assert key_length(u'\xe9') == 2
+    assert len(digest('a' * 1000)) == 40
+
+
+def test_hashed_keys():
+    backend = SimpleCache()
+    keys = HashedKeys(backend, min_length=5, max_keys=2)
+    keys.set('short', 1)
+    keys.set_many({'long/1': 2, 'long/2': 3})
+    assert backend.get('short') == 1
+    assert backend.get('long/1') is None
+    assert backend.get(digest('long/1')) == 2
+    assert keys.get_many('short', 'long/1', 'long/2') == [1, 2, 3]
+    assert keys.get_dict('long/1', 'long/2') == {'long/1': 2, 'long/2': 3}
+    assert keys.has('long/2')
+    assert keys.inc('long/3') == 1
+
+    # Only the last two digests are kept.
+    assert keys.readable_key(digest('long/3')) == 'long/3'
+    assert keys.readable_key(digest('long/2')) == 'long/2'
+    assert keys.readable_key(digest('long/1')) == digest('long/1')
+    assert keys.data() == dict(min_length=5, mapped=2, max_keys=2)
+
+    keys.delete('long/1')
+    assert backend.get(digest('long/1')) is None
+
+
+def test_key_log():
+    app, cache = make_app()
+
+    @app.route('/page/<name>')
+    @cache.cached()
+    def view(name):
+        return name
+
+    @cache.memoize()
+    def get_user(user_id):
+        return user_id
+
+    with app.test_client() as c:
+        c.get('/page/a')
+        c.get('/page/' + 'b' * 300)
+        c.get('/page/a')
+        get_user(1)
+        get_user(1)
+
+    key_log = cache.get_key_log()
+    data = key_log['view//page/a']
+    assert data == dict(keys=1, length='12.0', max_length=12, long_keys=0,
+                        hashed=0, makes=2, make_time=data['make_time'])
+    group = 'view//page/' + 'b' * 300
+    assert key_log[group]['long_keys'] == 1
+    assert key_log[group]['max_length'] == 311
+    assert key_log[get_user.cache_group]['keys'] == 1
+    assert key_log[get_user.cache_group]['makes'] == 2
+
+    with app.test_client() as c:
+        result = c.get('cache_stats')
+        assert b'Avg Build Time (ms)' in result.data
+
+
+class SlowVersions(SimpleCache):
+    def get_many(self, *keys):
+        time.sleep(0.02)
+        return super(SlowVersions, self).get_many(*keys)
+
+
+def slow_versions(app, config, args, kwargs):
+    return SlowVersions(*args, **kwargs)
+
+
+def test_key_make_time():
+    app, cache = make_app(CACHE_TYPE=__name__ + '.slow_versions',
+                          CACHE_STATS_VERSION_TTL=0)
+
+    @cache.memoize()
+    def get_user(user_id):
+        return user_id
+
+    @cache.memoize_many()
+    def get_users(ids):
+        return dict((user_id, user_id) for user_id in ids)
+
+    with app.app_context():
+        get_user(1)
+        get_users([1, 2])
+
+    # The version round trips are left out, and shown per function.
+    key_log = cache.get_key_log()
+    assert float(key_log[get_user.cache_group]['make_time']) < 10
+    assert float(key_log[get_users.cache_group]['make_time']) < 10
+    version_log = cache.get_version_log()
+    # Per round trip, a get_many and a set_many.
+    assert float(version_log[get_user.cache_group]['time']) >= 10
+
+
+def test_hash_keys():
+    app, cache = make_app(CACHE_STATS_HASH_KEYS=dict(min_length=10))
+    backend = cache.hashed_keys.backend
+    long_key = 'user/' + 'x' * 20
+
+    with app.app_context():
+        cache.set('user/1', 'a')
+        cache.set(long_key, 'b')
+        assert cache.get(long_key) == 'b'
+        assert backend.get(digest(long_key)) == 'b'
+        assert backend.get(long_key) is None
+        assert backend.get('user/1') == 'a'
+
+    # Stats keep the readable keys.
+    assert long_key in cache.get_log()
+    key_log = cache.get_key_log()
+    assert key_log[long_key]['hashed'] == 1
+    assert key_log['user/*']['hashed'] == 0
+
+    assert cache.readable_key(digest(long_key)) == long_key
+    with app.test_client() as c:
+        result = c.delete('cache_stats/' + digest(long_key))
+        assert result.status_code == 200
+    assert backend.get(digest(long_key)) is None
+
+
+def test_hash_keys_disabled():
+    app, cache = make_app(CACHE_STATS_HASH_KEYS=True,
+                          CACHE_STATS_ENABLED=False)
+    with app.app_context():
+        cache.set('user/1', 'a')
+        assert cache.get('user/1') == 'a'
+    assert cache.hashed_keys.backend.get(digest('user/1')) == 'a'
@@ -0,0 +1,134 @@
+import socket
+import time
+
+from flask import Flask
+from flask_cache_stats import Cache
+from flask_cache_stats.statsd import StatsdExporter, metric_name
+
+
+def listener():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(2)
+    return sock
+
+
+def receive(sock):
+    "Returns the packets waiting on ``sock``."
+    packets = [sock.recv(65536).decode('utf-8')]
+    sock.settimeout(0.05)
+    try:
+        while True:
+            packets.append(sock.recv(65536).decode('utf-8'))
+    except socket.timeout:
+        pass
+    sock.settimeout(2)
+    return packets
+
+
+def metrics(packets):
+    return dict(line.split(':', 1) for packet in packets
+                for line in packet.split('\n'))
+
+
+def test_metric_name():
+    assert metric_name('flask_cache', 'user/*', 'hit') == 'flask_cache.user__.hit'
+    assert metric_name('', 'a b', 'c:d') == 'a_b.c_d'
+
+
+def test_aggregate():
+    sock = listener()
+    exporter = StatsdExporter(port=sock.getsockname()[1], prefix='app')
+    for _ in range(3):
+        exporter.incr('user/*', 'hit')
+    exporter.incr('user/*', 'miss', 2)
+    exporter.timing('user/*', 'access_time', 1.0)
+    exporter.timing('user/*', 'access_time', 3.0)
+    exporter.timing('page', 'access_time', 5.0)
+    exporter.gauges = lambda: dict(keys=7)
+    exporter.flush()
+
+    packets = receive(sock)
+    assert len(packets) == 1
+    assert metrics(packets) == {
+        'app.user__.hit': '3|c',
+        'app.user__.miss': '2|c',
+        'app.user__.access_time': '2.000|ms|@0.5',
+        'app.page.access_time': '5.000|ms',
+        'app.keys': '7|g',
+    }
+    assert exporter.data() == dict(packets=1, sent=5, dropped=0)
+
+    # Counters start over after a flush.
+    exporter.incr('user/*', 'hit')
+    exporter.flush()
+    assert metrics(receive(sock))['app.user__.hit'] == '1|c'
+
+
+def test_packets():
+    sock = listener()
+    exporter = StatsdExporter(port=sock.getsockname()[1], max_packet=100)
+    for idx in range(20):
+        exporter.incr('group{}'.format(idx), 'hit')
+    exporter.flush()
+
+    packets = receive(sock)
+    assert len(packets) > 1
+    assert all(len(packet) <= 100 for packet in packets)
+    assert len(metrics(packets)) == 20
+
+
+def test_dropped():
+    sock = listener()
+    exporter = StatsdExporter(port=sock.getsockname()[1], max_metrics=2)
+    exporter.incr('a', 'hit')
+    exporter.timing('a', 'access_time', 1.0)
+    exporter.incr('b', 'hit')
+    exporter.timing('b', 'access_time', 1.0)
+    # Buffered metrics keep counting.
+    exporter.incr('a', 'hit')
+    assert exporter.dropped == 2
+    exporter.flush()
+
+    assert metrics(receive(sock)) == {
+        'flask_cache.a.hit': '2|c',
+        'flask_cache.a.access_time': '1.000|ms',
+        'flask_cache.exporter.dropped': '2|c',
+    }
+    assert exporter.dropped == 0
+
+
+def test_cache():
+    sock = listener()
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_STATSD'] = dict(port=sock.getsockname()[1],
+                                            interval=0.05)
+    cache = Cache(app)
+
+    with app.app_context():
+        cache.set('user/1', 'a')
+        cache.get('user/1')
+        cache.get('user/2')
+        cache.get_many('user/1', 'user/3')
+        cache.delete('user/1')
+
+    # Sent by the flush thread, possibly over several flushes.
+    counts = {}
+    found = {}
+    deadline = time.time() + 2
+    while 'flask_cache.user__.delete' not in counts and time.time() < deadline:
+        for name, value in metrics(receive(sock)).items():
+            found[name] = value
+            if value.endswith('|c'):
+                counts[name] = counts.get(name, 0) + int(value[:-2])
+    cache.exporter.close()
+
+    assert counts == {
+        'flask_cache.user__.write': 1,
+        'flask_cache.user__.hit': 2,
+        'flask_cache.user__.miss': 2,
+        'flask_cache.user__.delete': 1,
+    }
+    assert '|ms' in found['flask_cache.user__.access_time']
+    assert found['flask_cache.keys'] == '3|g'
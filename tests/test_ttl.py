@@ -0,0 +1,117 @@
+import json
+import random
+
+import pytest
+import werkzeug.contrib.cache
+from flask import Flask
+from flask_cache_stats import Cache, CacheStats, stats, ttl
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.yield_fixture()
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(stats, 'time', clock)
+    monkeypatch.setattr(werkzeug.contrib.cache, 'time', clock.time)
+    yield clock
+
+
+def make_cache(**config):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config.update(config)
+    return Cache(app)
+
+
+def test_timeout_for():
+    assert ttl.timeout_for(0.1, 0.9) == pytest.approx(90)
+    assert ttl.hit_ratio(0.1, 90) == pytest.approx(0.9)
+
+
+def test_recommend_memory_budget():
+    profiles = {
+        'cheap': ttl.Profile(keys=100, rate=0.1, cost=1, size=1000),
+        'costly': ttl.Profile(keys=100, rate=0.1, cost=100, size=1000),
+    }
+    timeouts = ttl.recommend(profiles, 1, 3600)
+    assert timeouts['cheap'] == pytest.approx(90)
+    assert timeouts['costly'] == pytest.approx(90)
+
+    # Room for the costly group only.
+    timeouts = ttl.recommend(profiles, 1, 3600, memory_budget=100 * 1000)
+    assert timeouts['cheap'] < 2
+    assert timeouts['costly'] > 60
+
+
+def simulate(cache, decorator, clock, seconds=4000, keys=30, rate=0.05):
+    """Reads ``keys`` keys at ``rate`` reads per second each, returns the hit
+       ratio seen by a memoized function.
+    """
+    rnd = random.Random(42)
+    events = []
+    for key in range(keys):
+        now = 0
+        while now < seconds:
+            now += rnd.expovariate(rate)
+            events.append((now, key))
+    events.sort()
+
+    calls = []
+
+    @decorator
+    def load(key):
+        calls.append(key)
+        return 'value {}'.format(key)
+
+    start = clock.now
+    with cache.app.app_context():
+        for now, key in events:
+            clock.now = start + now
+            load(key)
+
+    return 1 - len(calls) / float(len(events))
+
+
+def test_adaptive_timeout_simulation(clock):
+    cache = make_cache()
+    fixed = simulate(cache, cache.memoize(5), clock)
+
+    cache = make_cache()
+    adaptive = simulate(cache, cache.memoize(5, adaptive_timeout=(5, 3600)),
+                        clock)
+
+    assert fixed < 0.3
+    assert adaptive > 0.8
+
+    groups = cache.recommend_timeouts()
+    assert len(groups) == 1
+    data = list(groups.values())[0]
+    assert 150 <= data['timeout'] <= 210
+    assert float(data['hit_ratio']) > 0.8
+
+
+def test_recommendation_api(clock):
+    cache = make_cache(CACHE_STATS_TTL_MIN_SAMPLES=3)
+    cache.app.register_blueprint(CacheStats(cache))
+
+    for _ in range(5):
+        clock.now += 10
+        cache.get('page/1')
+        cache.get('page/2')
+    cache.get('other')
+
+    with cache.app.test_client() as c:
+        data = json.loads(c.get('/cache_stats/ttl').data.decode('utf-8'))
+    assert data['page/*']['timeout'] == 90
+    assert data['page/*']['predicted_hit_ratio'] == '0.900'
+    assert data['other']['timeout'] is None
+
+    with cache.app.test_client() as c:
+        assert c.get('/cache_stats').status_code == 200
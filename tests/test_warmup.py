@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+
+from flask import Flask
+from flask_cache_stats import Cache, CacheStats
+from flask_cache_stats import warmup
+from werkzeug.contrib.cache import SimpleCache
+
+
+def test_run_bounded():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def task():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.01)
+        with lock:
+            active.pop()
+        return warmup.WARMED
+
+    assert warmup.run([task] * 20, workers=3) == [warmup.WARMED] * 20
+    assert max(peak) <= 3
+
+
+def test_run_rate():
+    start_time = time.time()
+    warmup.run([lambda: None] * 6, workers=6, rate=50)
+    assert time.time() - start_time >= 0.1
+
+
+class SlowCache(SimpleCache):
+    def get_many(self, *keys):
+        values = super(SlowCache, self).get_many(*keys)
+        time.sleep(0.01)
+        return values
+
+
+def slow_cache(app, config, args, kwargs):
+    return SlowCache(*args, **kwargs)
+
+
+def make_app(path, **config):
+    app = Flask(__name__)
+    app.config['CACHE_TYPE'] = 'simple'
+    app.config['CACHE_STATS_WARMUP_FILE'] = path
+    app.config.update(config)
+    cache = Cache(app)
+    computed = []
+
+    @cache.memoize(timeout=60)
+    def square(x):
+        computed.append(x)
+        return x * x
+
+    @app.route('/page/<int:page>')
+    @cache.cached(timeout=60)
+    def page(page):
+        computed.append('page/{}'.format(page))
+        return str(page)
+
+    return app, cache, square, computed
+
+
+def test_warm_up(tmpdir):
+    path = str(tmpdir.join('warmup.json'))
+    app, cache, square, computed = make_app(path)
+    with app.test_request_context():
+        for x in [1, 2, 2, 2, 3, 3]:
+            square(x)
+    with app.test_client() as c:
+        c.get('/page/1')
+        c.get('/page/1')
+
+    assert cache.save_hot_calls() == 4
+    with open(path) as f:
+        calls = json.load(f)
+    assert [call['args'] for call in calls
+            if call['function'] == square.cache_group] == [[2], [3], [1]]
+
+    # A fresh process with an empty cache.
+    app, cache, square, computed = make_app(path)
+    app.register_blueprint(CacheStats(cache))
+    with app.app_context():
+        data = cache.warm_up()
+    assert data['calls'] == 4
+    assert data['warmed'] == 4
+    assert data['coverage'] == '1.000'
+    assert sorted(map(str, computed)) == ['1', '2', '3', 'page/1']
+
+    with app.test_request_context():
+        assert square(2) == 4
+    with app.test_client() as c:
+        assert c.get('/page/1').data == b'1'
+        assert b'Last warm-up' in c.get('/cache_stats').data
+    assert len(computed) == 4
+
+    with app.app_context():
+        data = cache.warm_up(rate=100)
+    assert data['present'] == 4
+    assert len(computed) == 4
+
+
+def test_warm_up_failures(tmpdir):
+    app, cache, square, computed = make_app(str(tmpdir.join('missing.json')))
+    with app.app_context():
+        assert cache.warm_up()['calls'] == 0
+
+        data = cache.warm_up([
+            dict(function='unknown', args=[]),
+            dict(function=square.cache_group, args=['a', 'b']),
+        ])
+    assert data['skipped'] == 1
+    assert data['failed'] == 1
+    assert data['coverage'] == '0.000'
+
+
+def test_warm_up_first_calls(tmpdir):
+    # Concurrent first calls on a cold cache must share one version key.
+    app, cache, square, computed = make_app(
+        str(tmpdir.join('warmup.json')),
+        CACHE_TYPE=__name__ + '.slow_cache')
+    with app.app_context():
+        data = cache.warm_up([dict(function=square.cache_group, args=[x])
+                              for x in range(8)], workers=4)
+    assert data['warmed'] == 8
+
+    with app.test_request_context():
+        for x in range(8):
+            assert square(x) == x * x
+    assert len(computed) == 8
+
+
+def test_record_call(tmpdir):
+    app, cache, square, computed = make_app(str(tmpdir.join('warmup.json')),
+                                            CACHE_STATS_WARMUP_CALLS=2)
+
+    @cache.memoize(timeout=60)
+    def total(values):
+        return sum(values)
+
+    values = [1, 2]
+    with app.test_request_context():
+        total(values)
+        total(set([1]))
+        for x in range(30):
+            square(x)
+        total(values)
+
+    # At most CACHE_STATS_WARMUP_CALLS * 10, the least recently made dropped.
+    assert len(cache._calls) == 20
+    calls = cache.hot_calls()
+    assert len(calls) == 20
+    assert [call['args'] for call in calls
+            if call['function'] == total.cache_group] == [[[1, 2]]]
+    # Plain copies are kept, not the arguments themselves.
+    values.append(3)
+    assert [1, 2, 3] not in [call['args'][0] for call in calls]